@@ -0,0 +1,12 @@
+"""
+Benchmarks for the game's hot paths: the rules, rendering and startup. Run them from the repository root with
+python -m benchmarks; see python -m benchmarks --help.
+
+The benchmarks run headless, with SDL's dummy video and audio drivers, so they need no display or sound device. The
+drivers are chosen here, before pygame is first imported.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
@@ -0,0 +1,60 @@
+import argparse
+import datetime
+import json
+import platform
+from pathlib import Path
+from . import compare, render, rules, startup
+from .timing import MIN_TIME
+
+GROUPS = {
+    "rules": rules.run,
+    "render": render.run,
+    "startup": startup.run,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Times the game's hot paths headless, and writes the results as JSON that can be compared.")
+    parser.add_argument("groups", nargs="*", metavar="GROUP",
+                        help=f"Groups of benchmarks to run, out of {', '.join(GROUPS)}; by default, all of them.")
+    parser.add_argument("-q", "--quick", action="store_true",
+                        help="Runs fewer layouts and scales, for a quick check.")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="File to write the results to, as JSON.")
+    parser.add_argument("-c", "--compare", type=Path, default=None,
+                        help="Results file to compare the new results against.")
+    args = parser.parse_args()
+    for group in args.groups:
+        if group not in GROUPS:
+            parser.error(f"unknown group: {group}")
+    # Imported only now, so that the dummy drivers are chosen first (see __init__.py).
+    import pygame
+    from pegsolitaire.graphics import Graphics
+    gfx = Graphics("en", 1)
+    results = {}
+    for group in args.groups or GROUPS:
+        for name, result in GROUPS[group](gfx, args.quick).items():
+            results[name] = result
+            print(f"{name:<48} {result['us_per_call']:>12.2f} us", flush=True)
+    data = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "quick": args.quick,
+            "min_time": MIN_TIME,
+        },
+        "results": results,
+    }
+    if args.output is not None:
+        with args.output.open("w") as out_file:
+            json.dump(data, out_file, indent=2)
+    if args.compare is not None:
+        compare.print_comparison(compare.compare(compare.load_results(args.compare), results))
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
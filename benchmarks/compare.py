@@ -0,0 +1,54 @@
+import argparse
+import json
+from pathlib import Path
+
+# Changes in time smaller than this share are reported as unchanged.
+DEFAULT_THRESHOLD = 0.10
+
+
+def load_results(path: Path) -> dict:
+    """Returns the results in a JSON file written by python -m benchmarks, by benchmark name."""
+    with Path(path).open() as in_file:
+        return json.load(in_file)["results"]
+
+
+def compare(old: dict, new: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Compares two sets of results. Returns (name, old time, new time, ratio, verdict) tuples for the benchmarks found in
+    both, where the times are per call in microseconds and the verdict is "slower", "faster" or "" (unchanged).
+    """
+    rows = []
+    for name in sorted(old.keys() & new.keys()):
+        old_time, new_time = old[name]["us_per_call"], new[name]["us_per_call"]
+        ratio = new_time / old_time if old_time else float("inf")
+        verdict = "slower" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else ""
+        rows.append((name, old_time, new_time, ratio, verdict))
+    return rows
+
+
+def print_comparison(rows: list) -> None:
+    """Prints the rows made by compare() as a table."""
+    width = max([len(name) for name, *_ in rows] + [9])
+    print(f"{'Benchmark':<{width}} {'Old (us)':>12} {'New (us)':>12} {'Ratio':>7}")
+    for name, old_time, new_time, ratio, verdict in rows:
+        print(f"{name:<{width}} {old_time:>12.2f} {new_time:>12.2f} {ratio:>7.2f} {verdict}")
+    slower = sum(verdict == "slower" for *_, verdict in rows)
+    faster = sum(verdict == "faster" for *_, verdict in rows)
+    print(f"{slower} slower, {faster} faster, {len(rows) - slower - faster} unchanged")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares two benchmark result files.")
+    parser.add_argument("old", type=Path, help="Results to compare against, such as those of the main branch.")
+    parser.add_argument("new", type=Path, help="New results.")
+    parser.add_argument("-t", "--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Share of change in time below which a benchmark counts as unchanged.")
+    args = parser.parse_args()
+    rows = compare(load_results(args.old), load_results(args.new), args.threshold)
+    print_comparison(rows)
+    # Fails if anything got slower, so that the comparison can be used in scripts.
+    raise SystemExit(1 if any(verdict == "slower" for *_, verdict in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
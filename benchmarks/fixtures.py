@@ -0,0 +1,44 @@
+import random
+from pegsolitaire import layouts
+from pegsolitaire.compiled_layout import CompiledLayout
+from pegsolitaire.rules_engine import RulesEngine
+
+# Names of the built-in layouts, in the order of layouts.layouts.
+LAYOUT_NAMES = ("english", "german", "french", "diamond", "asymmetrical")
+# Synthetic cross-shaped layouts, as (size, arm width), for stress testing.
+LARGE_LAYOUTS = ((15, 5), (25, 9), (45, 15))
+# Number of positions sampled from random games for the rules benchmarks.
+SAMPLE_POSITIONS = 200
+
+
+def benchmark_layouts(quick: bool = False) -> dict:
+    """Returns the layouts to benchmark by name: the built-in ones and large synthetic ones (fewer of both if quick)."""
+    named = dict(zip(LAYOUT_NAMES, layouts.layouts))
+    large = {f"cross{size}": layouts.cross_layout(size, arm_width) for size, arm_width in LARGE_LAYOUTS}
+    if quick:
+        return {"english": named["english"], "cross15": large["cross15"]}
+    return {**named, **large}
+
+
+def sample_positions(layout: CompiledLayout, count: int = SAMPLE_POSITIONS, seed: int = 0) -> list:
+    """Returns positions met in random games from the layout's starting position, the same ones every time."""
+    rng = random.Random(seed)
+    engine = RulesEngine(layout)
+    positions = []
+    while len(positions) < count:
+        engine.reset()
+        legal_jumps = engine.legal_jumps()
+        while legal_jumps and len(positions) < count:
+            engine.apply(rng.choice(legal_jumps))
+            positions.append(engine.position)
+            legal_jumps = engine.legal_jumps()
+    return positions
+
+
+def make_board(gfx, layout: dict):
+    """Returns a Board for the layout drawn with the given Graphics, with sounds and highlights turned off."""
+    from pegsolitaire.board_class import Board
+    from pegsolitaire.options import Options
+    return Board(layout, gfx.BOARD_DIMENSIONS, gfx.display, gfx.BOARD_POS, gfx.scaling_factor, gfx.tile_smooth,
+                 gfx.tile_hole, gfx.peg, gfx.highlight, gfx.highlight_full, options=Options("en", False, False),
+                 animation_frames=gfx.animation_frames)
@@ -0,0 +1,54 @@
+import pygame
+from .fixtures import benchmark_layouts, make_board
+from .timing import measure
+
+# Scales to benchmark whole frames at: every value --scale accepts, or a few of them if quick.
+SCALES = tuple(range(1, 11))
+QUICK_SCALES = (1, 3, 10)
+
+
+def _drag_a_peg(board) -> None:
+    """Lifts a peg, so that the frame draws a dragged peg (Peg.update's busiest path), and starts another fading out."""
+    pegs = list(board._static_pegs)
+    dragged, fading = pegs[0], pegs[-1]
+    dragged.is_being_dragged = True
+    dragged.mouse_offset = (0, 0)
+    board._static_pegs.remove(dragged)
+    board._dragged_peg.add(dragged)
+    fading.fade_out()
+    board._static_pegs.remove(fading)
+    board._fading_out_pegs.add(fading)
+
+
+def run(gfx, quick: bool = False) -> dict:
+    """
+    Times Board.draw_board() on every benchmark layout, and whole frames as the game loop draws them (background,
+    board, upscale to the screen and display update) at each scale. The Graphics object is remade for each scale.
+    """
+    from pegsolitaire.graphics import Graphics
+    results = {}
+    for name, layout in benchmark_layouts(quick).items():
+        board = make_board(gfx, layout)
+        # Only what changed is redrawn, so an idle board costs next to nothing; the full redraw is timed as well.
+        results[f"render.draw_board[{name}]"] = measure(board.draw_board)
+        results[f"render.draw_board_full[{name}]"] = measure(lambda: (board.redraw(), board.draw_board()))
+        _drag_a_peg(board)
+        # The fading peg goes away after a few frames, so it is brought back before each repeat.
+        results[f"render.draw_board_dragging[{name}]"] = measure(
+            board.draw_board, setup=lambda: (board.reset_pegs(), _drag_a_peg(board)))
+    for scale in QUICK_SCALES if quick else SCALES:
+        scaled_gfx = Graphics("en", scale)
+        board = make_board(scaled_gfx, benchmark_layouts(quick)["english"])
+
+        def frame():
+            scaled_gfx.display.blit(scaled_gfx.background, (0, 0))
+            board.draw_board()
+            pygame.display.update(scaled_gfx.upscale())
+
+        results[f"render.upscale[scale={scale}]"] = measure(scaled_gfx.upscale)
+        # A typical frame while a peg is dragged: two tiles' worth of the display changed.
+        dragged_rects = [pygame.Rect(150, 60, 48, 24), pygame.Rect(200, 120, 24, 48)]
+        results[f"render.upscale_dirty[scale={scale}]"] = measure(lambda: scaled_gfx.upscale(dragged_rects))
+        results[f"render.display_update[scale={scale}]"] = measure(pygame.display.update)
+        results[f"render.frame[scale={scale}]"] = measure(frame)
+    return results
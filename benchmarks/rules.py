@@ -0,0 +1,67 @@
+import random
+from pegsolitaire.compiled_layout import compile_layout
+from pegsolitaire.rules_engine import IncrementalRulesEngine, RulesEngine
+from .fixtures import benchmark_layouts, make_board, sample_positions
+from .timing import measure
+
+
+def _move_checks(layout, positions: list, rng: random.Random) -> list:
+    """
+    Returns (position, from, to) coordinates of moves the player might try in the sampled positions: from a peg to
+    any hole two tiles away in a line, legal or not, as Board._get_legal_jump() would be asked to check them.
+    """
+    checks = []
+    for position in positions:
+        pegs = [layout.holes[hole] for hole in range(layout.hole_count) if position >> hole & 1]
+        x, y = rng.choice(pegs)
+        for dx, dy in ((0, 2), (0, -2), (2, 0), (-2, 0)):
+            if (x + dx, y + dy) in layout.hole_index:
+                checks.append((position, (x, y), (x + dx, y + dy)))
+    return checks
+
+
+def run(gfx, quick: bool = False) -> dict:
+    """Times move legality, legal move generation and defeat detection on every benchmark layout."""
+    results = {}
+    for name, layout_data in benchmark_layouts(quick).items():
+        layout = compile_layout(layout_data)
+        positions = sample_positions(layout)
+        # Legality of dropped pegs, the way the board checks them: find the jump, then check it on the engine.
+        engine = IncrementalRulesEngine(layout)
+        checks = _move_checks(layout, positions, random.Random(0))
+        check_positions = sorted({position for position, _, _ in checks})
+
+        def check_moves():
+            for position, from_coords, to_coords in checks:
+                if engine.position != position:
+                    engine.set_position(position)
+                jump = engine.find_jump(from_coords, to_coords)
+                if jump is not None:
+                    engine.is_legal(jump)
+
+        def set_positions():
+            for position in check_positions:
+                engine.set_position(position)
+
+        # Setting the positions is part of the loop above, so it is timed on its own as well.
+        results[f"rules.move_legality[{name}]"] = measure(check_moves, operations=len(checks))
+        results[f"rules.set_position[{name}]"] = measure(set_positions, operations=len(check_positions))
+        # All legal jumps of a position, on the shift-based engine.
+        plain_engine = RulesEngine(layout)
+
+        def legal_jumps():
+            for position in positions:
+                plain_engine.set_position(position)
+                plain_engine.legal_jumps()
+
+        results[f"rules.legal_jumps[{name}]"] = measure(legal_jumps, operations=len(positions))
+        # Defeat detection, through the board.
+        board = make_board(gfx, layout_data)
+
+        def check_for_defeat():
+            for position in positions:
+                board.engine.set_position(position)
+                board._check_for_defeat()
+
+        results[f"rules.check_for_defeat[{name}]"] = measure(check_for_defeat, operations=len(positions))
+    return results
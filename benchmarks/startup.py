@@ -0,0 +1,33 @@
+import subprocess
+import sys
+from .timing import measure, measure_once
+
+# Starts a fresh interpreter that imports the game and sets it up, as the pegsolitaire command does, then closes it.
+_COLD_START = """
+import argparse, benchmarks
+from pegsolitaire.game import Game
+Game(argparse.Namespace(scale={scale}, sdl_scaling=False, hud=False, trace=None, trace_memory=False)).hints.close()
+"""
+# Starts a fresh interpreter that only imports the game's modules.
+_IMPORT = """
+import benchmarks
+import pegsolitaire.game
+"""
+
+
+def _run_python(code: str) -> None:
+    """Runs code in a new interpreter, from the current directory, and fails if it fails."""
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def run(gfx, quick: bool = False) -> dict:
+    """Times cold startup in new processes, and Graphics.__init__ (loading and building all graphics) in this one."""
+    from pegsolitaire.graphics import Graphics
+    repeat = 3 if quick else 5
+    results = {
+        "startup.import": measure_once(lambda: _run_python(_IMPORT), repeat),
+        "startup.cold_start": measure_once(lambda: _run_python(_COLD_START.format(scale=3)), repeat),
+    }
+    for scale in (1, 3, 10):
+        results[f"startup.graphics_init[scale={scale}]"] = measure(lambda: Graphics("en", scale), repeat=repeat)
+    return results
@@ -0,0 +1,52 @@
+import time
+
+# Each measurement calls the function in a loop for at least this long, in seconds...
+MIN_TIME = 0.05
+# ...and is repeated this many times; the median of the repeats is reported.
+REPEAT = 5
+
+
+def measure(function, min_time: float = MIN_TIME, repeat: int = REPEAT, setup=None, operations: int = 1) -> dict:
+    """
+    Times a function that takes no arguments. The number of calls per repeat is chosen so that each repeat takes at
+    least min_time seconds, like timeit's autorange. Returns a dictionary of results that can be written as JSON: the
+    median and fastest time per call, in microseconds, and the number of calls per repeat.
+
+    :param setup: Function to call before each repeat, outside of the timed loop; optional.
+    :param operations: Number of operations each call of the function makes; times are given per operation.
+    """
+    calls = 1
+    while True:
+        if setup is not None:
+            setup()
+        start_time = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start_time
+        if elapsed >= min_time:
+            break
+        calls *= 2
+    times = [elapsed / calls]
+    for _ in range(repeat - 1):
+        if setup is not None:
+            setup()
+        start_time = time.perf_counter()
+        for _ in range(calls):
+            function()
+        times.append((time.perf_counter() - start_time) / calls)
+    times.sort()
+    return {"us_per_call": times[len(times) // 2] / operations * 1e6, "best_us_per_call": times[0] / operations * 1e6,
+            "calls": calls * operations}
+
+
+def measure_once(function, repeat: int = REPEAT) -> dict:
+    """
+    Times a slow function (such as starting a process) by calling it once per repeat. Returns results like measure().
+    """
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    times.sort()
+    return {"us_per_call": times[len(times) // 2] * 1e6, "best_us_per_call": times[0] * 1e6, "calls": 1}
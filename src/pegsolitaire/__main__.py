@@ -1,18 +1,8 @@
-import pickle
 import argparse
-from sys import exit
-from enum import Enum, auto
-from importlib import resources
-from platformdirs import user_data_dir
 from pathlib import Path
 from . import layouts
-from .sounds import *
-from .board_class import Board
-from .graphics import *
-from .options import Options
-from .ui_elements import InitializeButtons, InitializeDialogWindows, InitializeToggles
-
-APP_NAME = "pegsolitaire"
+from .compiled_layout import compile_layout
+from .simulation import POLICIES, print_report, simulate as run_simulation
 
 
 def main():
@@ -20,225 +10,55 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-s", "--scale", type=int, choices=range(1, 11), default=3,
                         help="Sets the scaling factor. Must be a value between 1 and 10.")
+    parser.add_argument("--sdl-scaling", action="store_true",
+                        help="Lets SDL scale the game up to a window size of its choosing, on the GPU where there is "
+                             "one, instead of scaling it in software. --scale is then ignored.")
+    parser.add_argument("--hud", action="store_true",
+                        help="Shows the performance overlay from the start. F3 shows or hides it in the game.")
+    parser.add_argument("--trace", type=Path, default=None, metavar="FILE",
+                        help="Records every frame to the given file, as a trace that chrome://tracing or Perfetto "
+                             "can open.")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Traces memory allocations too, with --trace. The game runs slower while it does.")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("play", help="Starts the game (the default).")
+    simulate_parser = subparsers.add_parser(
+        "simulate", help="Plays games without a display, through the rules engine only, and reports the results.")
+    simulate_parser.add_argument("-l", "--layout", type=int, choices=range(len(layouts.layouts)), default=0,
+                                 help="Number of the layout to play on (0 is the English board).")
+    simulate_parser.add_argument("-c", "--cross", type=int, default=None, metavar="SIZE",
+                                 help="Plays on a cross-shaped board of the given odd size instead of one of the "
+                                      "layouts, like the English board scaled up (for stress testing).")
+    simulate_parser.add_argument("-g", "--games", type=int, default=1000, help="Number of games to play.")
+    simulate_parser.add_argument("-p", "--policy", choices=POLICIES, default="random",
+                                 help="How the next jump is chosen.")
+    simulate_parser.add_argument("--seed", type=int, default=None, help="Seed for the random number generator.")
     args = parser.parse_args()
+    if args.command == "simulate" and args.cross is not None and (args.cross < 3 or args.cross % 2 == 0):
+        parser.error("the size of a cross-shaped board must be an odd number, 3 or more")
+    if args.command == "simulate":
+        simulate(args)
+    else:
+        play(args)
+
+
+def play(args):
+    # Imports the game only when it's needed, since importing the graphics module starts pygame.
+    from .game import Game
     # Instantiates a Game object.
     game = Game(args)
     # Starts the game.
     game.game_loop()
 
 
-class Game:
-    class GameStates(Enum):
-        """Enumerates game states."""
-        GAME = auto()
-        MAIN_MENU = auto()
-        LAYOUT_MENU = auto()
-        SETTINGS_MENU = auto()
-        REALLY_QUIT = auto()
-        REALLY_RESET = auto()
-
-    def __init__(self, args):
-        # Instantiates a clock.
-        self.clock = pygame.time.Clock()
-        # Loads settings from options.dat; If not successful, loads defaults.
-        try:
-            with self.get_options_file().open("rb") as in_file:
-                self.options = pickle.load(in_file)
-        except (OSError, pickle.UnpicklingError):
-            self.options = Options("en", True, True)
-        # Loads graphics.
-        self.gfx = Graphics(self.options.lang, args.scale)
-        # Loads sounds.
-        self.snd = Sounds()
-        # Sets default state to MAIN_MENU.
-        self.state = self.GameStates.MAIN_MENU
-        # Instantiates a board object, which controls and displays all actual gameplay.
-        self.board = Board(layouts.layouts[0],
-                           self.gfx.board_surface,
-                           self.gfx.display,
-                           self.gfx.BOARD_POS,
-                           self.gfx.scaling_factor,
-                           self.gfx.tile_smooth,
-                           self.gfx.tile_hole,
-                           self.gfx.peg,
-                           self.gfx.highlight,
-                           self.gfx.highlight_full,
-                           peg_move_snd=self.snd.peg_move,
-                           snap_back_snd=self.snd.snap_back,
-                           victory_snd=self.snd.victory,
-                           defeat_snd=self.snd.defeat,
-                           options=self.options)
-        # Assigns methods to states; When game state changes, its corresponding method will be called.
-        self.game_state_methods = {
-            self.GameStates.GAME: self.gameplay,
-            self.GameStates.MAIN_MENU: self.main_menu,
-            self.GameStates.LAYOUT_MENU: self.layout_menu,
-            self.GameStates.SETTINGS_MENU: self.settings_menu,
-            self.GameStates.REALLY_QUIT: self.really_quit,
-            self.GameStates.REALLY_RESET: self.really_reset
-        }
-        # Assigns methods and arguments to buttons. When a button gets clicked, the assigned method will be called.
-        self.button_methods = {
-            "play": {"method": self.switch_state, "args": (self.GameStates.LAYOUT_MENU,)},
-            "settings": {"method": self.switch_state, "args": (self.GameStates.SETTINGS_MENU,)},
-            "quit_game": {"method": exit, "args": (0,)},
-            "layout_1": {"method": self.set_layout_and_start, "args": (0,)},
-            "layout_2": {"method": self.set_layout_and_start, "args": (1,)},
-            "layout_3": {"method": self.set_layout_and_start, "args": (2,)},
-            "layout_4": {"method": self.set_layout_and_start, "args": (3,)},
-            "layout_5": {"method": self.set_layout_and_start, "args": (4,)},
-            "layout_back": {"method": self.switch_state, "args": (self.GameStates.MAIN_MENU,)},
-            "undo": {"method": self.board.undo, "args": None,
-                     "active_condition": self.board.undo_stack},
-            "restart": {"method": self.switch_state, "args": (self.GameStates.REALLY_RESET,),
-                        "active_condition": self.board.undo_stack},
-            "exit_game": {"method": self.switch_state, "args": (self.GameStates.REALLY_QUIT,)},
-            "dialog_quit_yes": {"method": self.switch_state, "args": (self.GameStates.MAIN_MENU,)},
-            "dialog_quit_no": {"method": self.switch_state, "args": (self.GameStates.GAME,)},
-            "dialog_restart_yes": {"method": self.reset_board, "args": None},
-            "dialog_restart_no": {"method": self.switch_state, "args": (self.GameStates.GAME,)},
-            "cancel": {"method": self.cancel_settings, "args": None},
-            "apply": {"method": self.apply_settings, "args": None}
-        }
-        # Assigns methods and arguments to toggles. When a toggle gets switched, the assigned method will be called.
-        self.toggle_methods = {
-            "english_toggle_pressed": self.english_toggle_pressed,
-            "polski_toggle_pressed": self.polski_toggle_pressed
-        }
-        # Initializes UI elements.
-        self.buttons = InitializeButtons(self.gfx, self.snd, self.options, self.button_methods)
-        self.dialog_windows = InitializeDialogWindows(self.gfx, self.options)
-        self.toggles = InitializeToggles(self.gfx, self.snd, self.options, self.toggle_methods)
-    
-    def get_options_file(self) -> Path:
-        """
-        Checks if there is an options file in the user data path; if not, creates a new file with default values.
-        Returns the path to that file.
-        """
-        options_file_path = Path(user_data_dir(APP_NAME)) / "options.dat"
-        if not options_file_path.exists():
-            options_file_path.parent.mkdir(parents=True, exist_ok=True)
-            self.options = Options("en", True, True)
-            with options_file_path.open("wb") as out_file:
-                pickle.dump(self.options, out_file)
-        return options_file_path
-
-    def switch_state(self, state: GameStates) -> None:
-        """Changes the game state."""
-        self.state = state
-
-    def set_layout_and_start(self, layout: int) -> None:
-        """Loads a chosen layout into the board and changes game state to GAME."""
-        self.board.load_layout(layouts.layouts[layout])
-        self.switch_state(self.GameStates.GAME)
-
-    def reset_board(self) -> None:
-        """Moves all pegs to their starting positions, resets move count and clears the undo stack."""
-        self.board.reset_pegs()
-        self.state = self.GameStates.GAME
-
-    def apply_settings(self) -> None:
-        """
-        Applies settings changes according to the state of their corresposing switches, saves the settings
-        to options.dat, and changes the game state to MAIN_MENU.
-        """
-        # Reads the state of toggle switches.
-        self.board.play_sounds = self.options.play_sounds = self.toggles.sound.is_on
-        self.board.show_highlights = self.options.show_highlights = self.toggles.highlight.is_on
-        self.options.lang = "en" if self.toggles.english.is_on else "pl"
-        # Updates options.dat with the new settings.
-        try:
-            with self.get_options_file().open("wb") as out_file:
-                pickle.dump(self.options, out_file)
-        except (OSError, pickle.PicklingError):
-            pass
-        self.switch_state(self.GameStates.MAIN_MENU)
-
-    def cancel_settings(self) -> None:
-        """Goes back to the main menu without saving the changes made to Settings; Resets the switches."""
-        self.toggles.sound.is_on = self.options.play_sounds
-        self.toggles.highlight.is_on = self.options.play_sounds
-        self.switch_state(self.GameStates.MAIN_MENU)
-
-    def english_toggle_pressed(self) -> None:
-        """Radio button behavior: deactivates Polski if English has been activated."""
-        self.toggles.polski.is_on = False
-
-    def polski_toggle_pressed(self) -> None:
-        """Radio button behavior: deactivates English if Polski has been activated."""
-        self.toggles.english.is_on = False
-
-    def main_menu(self, events) -> None:
-        """Runs when self.state is MAIN_MENU."""
-        self.gfx.display.blit(self.gfx.main_menu_bg, (0, 0))
-        for button in self.buttons.main_menu_btns:
-            button.update(events)
-
-    def layout_menu(self, events) -> None:
-        """Runs when self.state is LAYOUT_MENU."""
-        self.gfx.display.blit(self.gfx.layout_menu_bg, (0, 0))
-        for button in self.buttons.layout_menu_btns:
-            button.update(events)
-
-    def settings_menu(self, events) -> None:
-        """Runs when self.state is LAYOUT_MENU."""
-        self.gfx.display.blit(self.gfx.settings_menu_bg, (0, 0))
-        self.toggles.sound.update(events)
-        self.toggles.highlight.update(events)
-        self.toggles.english.update(events)
-        self.toggles.polski.update(events)
-        for button in self.buttons.settings_btns:
-            button.update(events)
-
-    def really_quit(self, events) -> None:
-        """Runs when self.state is REALLY_QUIT. Pops up the "Really quit?" dialog window."""
-        self.dialog_windows.really_quit.update()
-        for button in self.buttons.really_quit_btns:
-            button.update(events)
-
-    def really_reset(self, events) -> None:
-        """Runs when self.state is REALLY_RESET. Pops up the "Really reset?" dialog window."""
-        self.dialog_windows.really_reset.update()
-        for button in self.buttons.really_restart_btns:
-            button.update(events)
-
-    def gameplay(self, events) -> None:
-        """Runs when self.state is GAME. Actual gameplay."""
-        self.gfx.display.blit(self.gfx.background, (0, 0))
-        # Updates the move counter on the screen.
-        gfx_move_count = self.gfx.small_font.render(
-            f"{langs.move[self.options.lang]} {self.board.move_count}", False, "#DDDDDD")
-        self.gfx.display.blit(gfx_move_count, (16, 50))
-        # Updates the board - actual gameplay happens here.
-        self.board.process_input(events)
-        self.board.draw_board()
-        for button in self.buttons.in_game_btns:
-            button.update(events)
-        # Draws labels on the screen if the game is lost or won.
-        if self.board.is_victorious:
-            self.gfx.display.blit(self.gfx.victory_label, ({"en": 19, "pl": 20}[self.options.lang], 150))
-        elif self.board.is_defeated:
-            self.gfx.display.blit(self.gfx.defeat_label, ({"en": 15, "pl": 21}[self.options.lang], 150))
-
-    def game_loop(self) -> None:
-        """Main gameplay loop. Calls the relevant method depending on the game state."""
-        # Collects events.
-        while True:
-            events = pygame.event.get()
-            for event in events:
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit()
-            # Calls the method assigned to the current game state and passes events to it.
-            if self.state in self.GameStates:
-                game_state_method = self.game_state_methods[self.state]
-                game_state_method(events)
-            # Scales "display" up and blits it onto "screen".
-            self.gfx.screen.blit(pygame.transform.scale(self.gfx.display, self.gfx.screen_res), (0, 0))
-            # Redraws the screen.
-            pygame.display.update()
-            # Updates the clock.
-            self.clock.tick(self.gfx.FPS)
+def simulate(args):
+    # Never imports the game, so no display or sound device is needed.
+    if args.cross is not None:
+        # Arms about a third of the board wide, like the English board's.
+        layout = layouts.cross_layout(args.cross, args.cross // 3 | 1)
+    else:
+        layout = layouts.layouts[args.layout]
+    print_report(run_simulation(compile_layout(layout), args.games, args.policy, args.seed))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,42 @@
+import pygame
+
+# Number of frames a peg takes to fade out, and how much its alpha value drops each frame.
+FADE_STEPS = 32
+FADE_STEP_ALPHA = 8
+
+
+class AnimationFrameCache:
+    """
+    Holds the pre-rendered frames of animations, so that they're rendered once and shared by every sprite that plays
+    them, rather than drawn again on each frame. Frames are kept by key, e.g. the name of the effect and the graphic it
+    is made from; graphics are compared by identity, so a scaled copy of a graphic gets frames of its own.
+    """
+    def __init__(self):
+        self._frames = {}
+
+    def get(self, key, make_frames) -> tuple:
+        """Returns the frames kept under the key; the first time, calls make_frames() to render them."""
+        if key not in self._frames:
+            self._frames[key] = tuple(make_frames())
+        return self._frames[key]
+
+    def fade_frames(self, graphic: pygame.Surface) -> tuple[pygame.Surface, ...]:
+        """Returns the frames of the graphic fading out, fully opaque first; see make_fade_frames()."""
+        return self.get(("fade", graphic), lambda: make_fade_frames(graphic))
+
+    def clear(self) -> None:
+        """Drops all frames, e.g. after the graphics they were made from have changed."""
+        self._frames.clear()
+
+
+def make_fade_frames(graphic: pygame.Surface) -> list[pygame.Surface]:
+    """
+    Renders the graphic at each of the FADE_STEPS alpha values of a fade out: frame n is at an alpha of
+    255 - n * FADE_STEP_ALPHA.
+    """
+    frames = []
+    for step in range(FADE_STEPS):
+        frame = graphic.copy()
+        frame.fill((255, 255, 255, 255 - step * FADE_STEP_ALPHA), special_flags=pygame.BLEND_RGBA_MULT)
+        frames.append(frame)
+    return frames
@@ -0,0 +1,117 @@
+from .compiled_layout import CompiledLayout
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is an optional dependency (pip install pegsolitaire[batch]); BatchMoveGenerator can't be used without it.
+    np = None
+
+
+class BatchMoveGenerator:
+    """
+    Vectorized move generation for many positions of one layout at once, using NumPy.
+
+    Positions are rows of a 2-D uint8 array, in one of two forms: unpacked, with one byte per hole (1 for a peg), or
+    packed, with one bit per hole in the same order as the engine's bitboards (as made by np.packbits(...,
+    bitorder="little")). Successors are returned in the same form as the positions they were made from.
+    On layouts with up to 64 holes, positions are handled internally as one 64-bit bitboard each, so checking a jump
+    is two ANDs and two compares over the whole batch.
+    """
+    def __init__(self, layout: CompiledLayout):
+        """:param layout: Compiled layout the positions belong to."""
+        if np is None:
+            raise ImportError("batch move generation requires NumPy; install it with pip install pegsolitaire[batch]")
+        self.layout = layout
+        self.hole_count = layout.hole_count
+        self.packed_width = (self.hole_count + 7) // 8
+        jumps = np.array(layout.jumps, dtype=np.intp).reshape(-1, 3)
+        self._from, self._over, self._to = jumps[:, 0], jumps[:, 1], jumps[:, 2]
+        # For each jump, the holes whose contents it flips, one byte per hole.
+        self._jump_deltas = np.zeros((len(layout.jumps), self.hole_count), dtype=np.uint8)
+        self._jump_deltas[np.arange(len(layout.jumps))[:, None], jumps] = 1
+        self._use_bitboards = self.hole_count <= 64
+        if self._use_bitboards:
+            self._from_over_masks = np.array(layout.from_over_masks, dtype=np.uint64)
+            self._to_masks = np.array(layout.to_masks, dtype=np.uint64)
+            self._jump_masks = np.array(layout.jump_masks, dtype=np.uint64)
+
+    def _is_packed(self, positions) -> bool:
+        """Returns True if the positions are packed, or False if unpacked; raises ValueError if they are neither."""
+        if positions.ndim != 2 or positions.shape[1] not in (self.hole_count, self.packed_width):
+            raise ValueError(f"positions must have shape (N, {self.hole_count}) or (N, {self.packed_width})")
+        return positions.shape[1] != self.hole_count
+
+    def pack(self, positions):
+        """Returns unpacked positions in packed form."""
+        return np.packbits(np.asarray(positions, dtype=np.uint8), axis=1, bitorder="little")
+
+    def unpack(self, positions):
+        """Returns packed positions in unpacked form."""
+        return np.unpackbits(np.asarray(positions, dtype=np.uint8), axis=1, count=self.hole_count, bitorder="little")
+
+    def to_bitboards(self, positions):
+        """Returns the positions (packed or unpacked) as a 1-D array of 64-bit bitboards. Needs at most 64 holes."""
+        if not self._use_bitboards:
+            raise ValueError("only layouts with up to 64 holes fit in 64-bit bitboards")
+        positions = np.asarray(positions, dtype=np.uint8)
+        if not self._is_packed(positions):
+            positions = self.pack(positions)
+        padded = np.zeros((len(positions), 8), dtype=np.uint8)
+        padded[:, :self.packed_width] = positions
+        return padded.view("<u8").ravel().astype(np.uint64)
+
+    def from_bitboards(self, bitboards, packed: bool = False):
+        """Returns a 1-D array of 64-bit bitboards as packed or unpacked positions."""
+        as_bytes = np.ascontiguousarray(bitboards, dtype="<u8").view(np.uint8).reshape(-1, 8)[:, :self.packed_width]
+        return as_bytes.copy() if packed else self.unpack(as_bytes)
+
+    def from_ints(self, positions, packed: bool = False):
+        """Returns engine positions (Python ints) as packed or unpacked positions."""
+        as_bytes = b"".join(position.to_bytes(self.packed_width, "little") for position in positions)
+        packed_positions = np.frombuffer(as_bytes, dtype=np.uint8).reshape(-1, self.packed_width)
+        return packed_positions.copy() if packed else self.unpack(packed_positions)
+
+    def legal_mask(self, positions):
+        """
+        Returns an (N, jumps) boolean array that is True where the jump (numbered as in the compiled layout) can be made
+        in the position.
+        """
+        positions = np.asarray(positions, dtype=np.uint8)
+        packed = self._is_packed(positions)
+        if self._use_bitboards:
+            return self.bitboard_legal_mask(self.to_bitboards(positions))
+        if packed:
+            positions = self.unpack(positions)
+        return (positions[:, self._from] & positions[:, self._over] & (positions[:, self._to] ^ 1)).astype(bool)
+
+    def bitboard_legal_mask(self, bitboards):
+        """Returns the legal jump mask of a 1-D array of 64-bit bitboards."""
+        bitboards = bitboards[:, None]
+        return ((bitboards & self._from_over_masks) == self._from_over_masks) & ((bitboards & self._to_masks) == 0)
+
+    def successors(self, positions, mask=None):
+        """
+        Returns the positions reached by every legal jump, as a tuple of three arrays: the successor positions (in the
+        same form as the given positions), and for each of them the row of the position it came from and the jump made.
+        Successors are ordered by position, then by jump.
+
+        :param positions: Positions to expand.
+        :param mask: Their legal jump mask, if it has already been computed by legal_mask().
+        """
+        positions = np.asarray(positions, dtype=np.uint8)
+        packed = self._is_packed(positions)
+        bitboards = self.to_bitboards(positions) if self._use_bitboards else None
+        if mask is None:
+            mask = self.bitboard_legal_mask(bitboards) if bitboards is not None else self.legal_mask(positions)
+        parents, jumps = np.nonzero(mask)
+        if bitboards is not None:
+            return self.from_bitboards(bitboards[parents] ^ self._jump_masks[jumps], packed), parents, jumps
+        if packed:
+            positions = self.unpack(positions)
+        successors = positions[parents] ^ self._jump_deltas[jumps]
+        return (self.pack(successors) if packed else successors), parents, jumps
+
+    def expand(self, positions):
+        """Returns the legal jump mask of the positions and their successors, as (mask, successors, parents, jumps)."""
+        mask = self.legal_mask(positions)
+        return (mask,) + self.successors(positions, mask)
@@ -1,12 +1,22 @@
 import pygame.surface
+from collections import OrderedDict
+from .animation_frames import AnimationFrameCache
 from .board_tiles_class import *
+from .compiled_layout import compile_layout
+from .dirty_rects import merge_rects
+from .layouts import layout_size
+from .move_log import MoveLog
+from .rules_engine import IncrementalRulesEngine
+
+# Number of tile layers kept, so that going back to a recently played layout doesn't draw its tiles again.
+TILE_LAYER_CACHE_SIZE = 8
 
 
 class Board:
     """Represents the Peg Solitaire board and runs the actual game logic."""
     def __init__(self,
                  layout: dict,
-                 board_surface: pygame.surface.Surface,
+                 board_area: tuple[int, int],
                  target_surface: pygame.surface.Surface,
                  board_pos: tuple[int, int],
                  res_multi: int,
@@ -15,18 +25,20 @@ class Board:
                  peg_gfx: pygame.surface.Surface,
                  highlight_gfx: pygame.surface.Surface,
                  highlight_full_gfx: pygame.surface.Surface,
-                 board_size: int = 9,
                  peg_move_snd: pygame.mixer.Sound = None,
                  snap_back_snd: pygame.mixer.Sound = None,
                  victory_snd: pygame.mixer.Sound = None,
                  defeat_snd: pygame.mixer.Sound = None,
-                 options=None):
+                 options=None,
+                 on_position_change=None,
+                 on_game_over=None,
+                 animation_frames: AnimationFrameCache = None):
         """
         :param layout: Board layout to use (a dictionary).
-        :param board_surface: The surface the board elements will be drawn on.
-        :param target_surface: The surface board_surface will be drawn on.
-        :param board_size: The length of the side of the board, in tiles.
-        :param board_pos: Where to draw the board_surface on target_surface.
+        :param board_area: The largest size of the board on target_surface, in pixels. Each layout's board is made to
+            fit in it, with tiles scaled down if needed, and centred in it.
+        :param target_surface: The surface the board will be drawn on.
+        :param board_pos: The position of board_area on target_surface.
         :param res_multi: Resolution multiplier, needed for correcting mouse cursor position values.
         :param smooth_tile_gfx: Smooth board tile graphics.
         :param hole_tile_gfx: Holed board tile graphics.
@@ -37,158 +49,255 @@ class Board:
         :param victory_snd: Sound to play when the player is victorious.
         :param defeat_snd: Sound to play when there are no more valid moves.
         :param options: Options object holding game settings; optional.
+        :param on_position_change: Function to call whenever a move is made or taken back, or the board is reset.
+        :param on_game_over: Function to call when the game becomes won or lost.
+        :param animation_frames: Cache of pre-rendered animation frames to share, e.g. Graphics.animation_frames; if
+            None, the board keeps its own.
         """
-        self._surface = board_surface
         self.target_surface = target_surface
-        self._tile_grid = layout["layout"]
-        self._start_hole = layout["start"]
-        self._board_size = board_size
-        self.board_pos = board_pos
+        self._board_area = board_area
+        self._area_pos = board_pos
         self._res_multiplier = res_multi
-        self._smooth_gfx = smooth_tile_gfx
-        self._hole_gfx = hole_tile_gfx
-        self._peg_gfx = peg_gfx
-        self._highlight_gfx = highlight_gfx
-        self._highlight_full_gfx = highlight_full_gfx
+        # Tile graphics at their own size, and scaled to the tile sizes used so far.
+        self._tile_gfx = {}
+        self._full_size_gfx = (smooth_tile_gfx, hole_tile_gfx, peg_gfx, highlight_gfx, highlight_full_gfx)
+        self._animation_frames = animation_frames if animation_frames is not None else AnimationFrameCache()
         self._peg_move_snd = peg_move_snd
         self._snap_back_snd = snap_back_snd
         self._victory_snd = victory_snd
         self._defeat_snd = defeat_snd
-        self._grid_tiles = pygame.sprite.Group()
+        # Images of the tiles of whole boards, by (layout key, board size, tile size), least recently used first.
+        self._tile_layers = OrderedDict()
         self._static_pegs = pygame.sprite.Group()
         self._highlights = pygame.sprite.Group()
         self._fading_out_pegs = pygame.sprite.Group()
         self._dragged_peg = pygame.sprite.GroupSingle()
-        self.undo_stack = []
-        self.move_count = 0
+        self._hint_highlights = pygame.sprite.Group()
+        # Pegs that were dropped outside a valid destination and are moving back; they're in _static_pegs as well.
+        self._snapping_pegs = pygame.sprite.Group()
+        # Only the parts of the board that change are drawn again: these rects of the board surface are redrawn on the
+        # next draw_board(), unless everything is, and only they are blitted on the target surface, unless it all is.
+        self._dirty_rects = []
+        self._redraw_all = True
+        self._blit_all = True
+        self.move_log = None
         self._game_is_lost = False
         self._game_is_won = False
         self._options = options
-        # Assigns graphics to the board tiles according to their type and adds them to self.grid_tiles sprite group.
-        self._reset_tiles()
-        self.reset_pegs()
+        self._on_position_change = None
+        self._on_game_over = on_game_over
+        self._shown_hint = None
+        # Holds the current position and answers all rule questions; the sprites only handle drawing. Keeps the peg
+        # count and the set of legal jumps up to date, so victory, defeat and valid destinations are simple lookups.
+        self._set_layout(layout)
+        # Only set now, so that the board doesn't report changes before it has been fully set up.
+        self._on_position_change = on_position_change
+
+    @property
+    def engine(self) -> IncrementalRulesEngine:
+        """Returns the rules engine holding the board's current position."""
+        return self._engine
+
+    @property
+    def target_hole(self):
+        """
+        Returns the coordinates of the hole the last peg should end up in: the one that was empty at the start. Puzzles
+        have no target hole, so None is returned for them.
+        """
+        return self._target_hole
+
+    @property
+    def start_position(self) -> int:
+        """Returns the position the game started from: the layout's starting position, or the puzzle."""
+        return self._start_position
+
+    @property
+    def is_puzzle(self) -> bool:
+        """Returns True if the game started from a puzzle rather than from the layout's starting position."""
+        return self._start_position != self._engine.layout.start_position
+
+    @property
+    def target_hole_reachable(self) -> bool:
+        """
+        Returns False if the last peg can no longer end up in the target hole (or, for puzzles, in any hole). Instant:
+        the engine knows the class of the position, which no jump changes.
+        """
+        if self._target_hole is None:
+            return bool(self._engine.layout.possible_targets(self._engine.position))
+        return self._engine.can_finish_in(self._engine.hole_index[self._target_hole])
 
     def _add_peg(self, coords: tuple[int, int], group: pygame.sprite.Group) -> None:
         """Adds an Peg object with the given grid coords to the given sprite group."""
-        group.add(Peg(self._surface, coords, self._board_size, self.board_pos, self._res_multiplier, self._peg_gfx))
-
-    def _reset_tiles(self) -> None:
-        """Creates the game board according to the loaded layout."""
-        self._grid_tiles.empty()
-        for x in range(self._board_size):
-            for y in range(self._board_size):
-                if self._tile_grid[x][y] == 0:
-                    self._grid_tiles.add(Tile(self._surface, (x, y), self._smooth_gfx))
-                else:
-                    self._grid_tiles.add(Tile(self._surface, (x, y), self._hole_gfx))
+        peg = Peg(self._surface, coords, self._board_size, self.board_pos, self._res_multiplier, self._peg_gfx,
+                  self._peg_fade_frames)
+        group.add(peg)
+        self._dirty_rects.append(peg.rect.copy())
 
-    def reset_pegs(self) -> None:
-        """Resets all pegs to their starting positions and repopulates the self.static_pegs sprite group"""
+    def _invalidate_sprites(self, group: pygame.sprite.Group) -> None:
+        """Marks the places of the sprites in the group to be redrawn; called before they are removed or changed."""
+        self._dirty_rects.extend(sprite.rect.copy() for sprite in group)
+
+    def redraw(self) -> None:
+        """Makes the next draw_board() redraw every tile, highlight and peg, rather than just the parts that changed."""
+        self._redraw_all = True
+
+    def invalidate(self) -> None:
+        """
+        Makes the next draw_board() blit the whole board on the target surface again, e.g. after something else was
+        drawn over it, rather than just the parts that changed.
+        """
+        self._blit_all = True
+
+    def _fit_to_layout(self) -> None:
+        """
+        Picks the tile size that fits the whole board in the board area (never larger than the tile graphics), and
+        makes a board surface of just the right size, centred in the area.
+        """
+        full_size = self._full_size_gfx[0].get_width()
+        width, height = self._board_size
+        tile_size = max(1, min(full_size, self._board_area[0] // width, self._board_area[1] // height))
+        if tile_size not in self._tile_gfx:
+            self._tile_gfx[tile_size] = tuple(
+                gfx if tile_size == full_size else pygame.transform.scale(gfx, (tile_size, tile_size))
+                for gfx in self._full_size_gfx)
+        (self._smooth_gfx, self._hole_gfx, self._peg_gfx,
+         self._highlight_gfx, self._highlight_full_gfx) = self._tile_gfx[tile_size]
+        # Rendered once per peg graphic, and shared by every peg that fades out.
+        self._peg_fade_frames = self._animation_frames.fade_frames(self._peg_gfx)
+        self._surface = pygame.Surface((width * tile_size, height * tile_size))
+        self._tile_size = tile_size
+        self.board_pos = (self._area_pos[0] + (self._board_area[0] - width * tile_size) // 2,
+                          self._area_pos[1] + (self._board_area[1] - height * tile_size) // 2)
+
+    def _load_tile_layer(self) -> None:
+        """
+        Gets the tile layer of the loaded layout: an image of all of its tiles, smooth or holed, which never change.
+        It's drawn once per layout and tile size, and the most recently used layers are kept.
+        """
+        key = (self._engine.layout.key, self._board_size, self._tile_size)
+        if key in self._tile_layers:
+            self._tile_layers.move_to_end(key)
+        else:
+            layer = pygame.Surface(self._surface.get_size())
+            width, height = self._board_size
+            layer.fblits([(self._hole_gfx if self._engine.is_hole((x, y)) else self._smooth_gfx,
+                           (x * self._tile_size, y * self._tile_size)) for x in range(width) for y in range(height)])
+            self._tile_layers[key] = layer
+            if len(self._tile_layers) > TILE_LAYER_CACHE_SIZE:
+                self._tile_layers.popitem(last=False)
+        self._tile_layer = self._tile_layers[key]
+        self.redraw()
+
+    @property
+    def move_count(self) -> int:
+        """Returns the number of moves made (not counting the ones that were undone)."""
+        return len(self.move_log)
+
+    def _rebuild_pegs(self) -> None:
+        """Repopulates the self.static_pegs sprite group with the pegs of the engine's current position."""
         self._static_pegs.empty()
         self._dragged_peg.empty()
-        for x in range(self._board_size):
-            for y in range(self._board_size):
-                if self._tile_grid[x][y] and (x, y) != self._start_hole:
-                    self._add_peg((x, y), self._static_pegs)
-        self.undo_stack.clear()
-        self.move_count = 0
+        self._fading_out_pegs.empty()
+        self._snapping_pegs.empty()
+        self._highlights.empty()
+        for coords in self._engine.pegs():
+            self._add_peg(coords, self._static_pegs)
+        self.redraw()
+
+    def reset_pegs(self) -> None:
+        """Resets all pegs to their starting positions and clears the move log."""
+        self._engine.set_position(self._start_position)
+        self._rebuild_pegs()
+        self.move_log.clear()
         self._game_is_won = self._game_is_lost = False
+        self._position_changed()
+
+    def jump_to_move(self, move: int) -> None:
+        """
+        Shows the position after the given number of moves, keeping the later moves for redo. The position is worked
+        out from the move log's nearest checkpoint, and the pegs are rebuilt once, however far away the move is.
+        """
+        if self._dragged_peg or move == self.move_count:
+            return
+        self._engine.set_position(self.move_log.go_to(move))
+        self._rebuild_pegs()
+        self._game_is_lost = self._game_is_won = False
+        self._check_for_victory_and_defeat()
+        self._position_changed()
 
     def load_layout(self, layout: dict) -> None:
         """Loads a new layout and resets the board and all pegs."""
-        self._tile_grid = layout["layout"]
-        self._start_hole = layout["start"]
-        self._reset_tiles()
-        self.reset_pegs()
+        self._set_layout(layout)
 
-    def _tile_is_hole(self, grid_coords: tuple[int, int]) -> bool:
-        """Returns true if the tile at the given coordinates is a hole"""
-        pos_x, pos_y = grid_coords
-        if self._tile_grid[pos_x][pos_y] == 1:
-            return True
-        return False
+    def load_puzzle(self, layout: dict, position: int) -> None:
+        """Loads a layout with a puzzle (see puzzles.py): a position to start from instead of the layout's own."""
+        self._set_layout(layout, position)
 
-    def _tile_is_occupied(self, grid_coords: tuple[int, int]) -> bool:
-        """Returns True if there is a peg at the given coordinates"""
-        for peg in self._static_pegs:
-            if peg.grid_coords == grid_coords:
-                return True
-        return False
-
-    @staticmethod
-    def _get_potential_destinations(this_peg: Peg) -> tuple:
-        """Returns a tuple containing the coords of the tiles 2 tiles away from the Peg (horizontaly and vertically)"""
-        start_pos_x, start_pos_y = this_peg.old_grid_coords
-        return ((start_pos_x - 2, start_pos_y), (start_pos_x + 2, start_pos_y),
-                (start_pos_x, start_pos_y - 2), (start_pos_x, start_pos_y + 2))
+    def _set_layout(self, layout: dict, start_position: int = None) -> None:
+        """Sets up the engine, the board surface and the tiles for the layout, and resets all pegs."""
+        self._board_size = layout_size(layout)
+        self._engine = IncrementalRulesEngine(compile_layout(layout))
+        if start_position is None:
+            self._start_position = self._engine.layout.start_position
+            self._target_hole = tuple(layout["start"])
+        else:
+            self._start_position = start_position
+            self._target_hole = None
+        # Kept as the same object from layout to layout, so that buttons can hold on to it.
+        if self.move_log is None:
+            self.move_log = MoveLog(self._engine.layout)
+        self.move_log.clear(self._engine.layout, self._start_position)
+        self._fit_to_layout()
+        # Draws the board tiles according to their type, or reuses the ones drawn the last time the layout was played.
+        self._load_tile_layer()
+        self.reset_pegs()
 
     def _highlight_valid_destinations(self, this_peg: Peg) -> None:
         """Highlights the tiles that the peg can be moved to."""
         if self._options is not None and self._options.show_highlights:
-            potential_destinations = self._get_potential_destinations(this_peg)
-            for destination in potential_destinations:
-                if self._potential_move_is_legal(this_peg, destination):
-                    self._highlights.add(Tile(self._surface, destination, self._highlight_gfx))
+            for jump in self._engine.legal_jumps_from(this_peg.old_grid_coords):
+                _, _, destination = self._engine.jump_coords(jump)
+                self._highlights.add(Tile(self._surface, destination, self._highlight_gfx))
+            self._invalidate_sprites(self._highlights)
+
+    def show_hint(self, jump: int) -> None:
+        """Highlights the start and the destination of the given jump."""
+        if jump == self._shown_hint:
+            return
+        self._shown_hint = jump
+        self._invalidate_sprites(self._hint_highlights)
+        self._hint_highlights.empty()
+        from_coords, _, to_coords = self._engine.jump_coords(jump)
+        self._hint_highlights.add(Tile(self._surface, from_coords, self._highlight_gfx),
+                                  Tile(self._surface, to_coords, self._highlight_gfx))
+        self._invalidate_sprites(self._hint_highlights)
+
+    def _position_changed(self) -> None:
+        """Clears the hint highlights and lets the owner of the board know that the position has changed."""
+        self._invalidate_sprites(self._hint_highlights)
+        self._hint_highlights.empty()
+        self._shown_hint = None
+        if self._on_position_change is not None:
+            self._on_position_change()
 
     def check_highlight_hover(self) -> None:
         """Checks if a peg is hovering above a highlighted tile. If yes, highlights it fully."""
         if self._dragged_peg:
             for highlight in self._highlights:
                 if highlight.coords == self._dragged_peg.sprite.grid_coords:
-                    highlight.graphic = self._highlight_full_gfx
+                    graphic = self._highlight_full_gfx
                 else:
-                    highlight.graphic = self._highlight_gfx
-
-    @staticmethod
-    def _destination_is_valid(this_peg: Peg) -> bool:
-        """Returns True if the destination is two tiles horizontally or vertically from the starting position"""
-        new_peg_x, new_peg_y = this_peg.grid_coords
-        old_peg_x, old_peg_y = this_peg.old_grid_coords
-        if (new_peg_x == old_peg_x + 2
-                or new_peg_x == old_peg_x - 2
-                or new_peg_y == old_peg_y + 2
-                or new_peg_y == old_peg_y - 2):
-            return True
-        return False
+                    graphic = self._highlight_gfx
+                if highlight.graphic is not graphic:
+                    highlight.graphic = graphic
+                    self._dirty_rects.append(highlight.rect.copy())
 
-    def _is_jumping_over(self, this_peg: Peg, new_coords=None) -> bool:
-        """Returns True if the peg is jumping over another peg to reach its new position"""
-        new_peg_x, new_peg_y = new_coords if new_coords is not None else this_peg.grid_coords
-        old_peg_x, old_peg_y = this_peg.old_grid_coords
-        if new_peg_x == old_peg_x:
-            if new_peg_y > old_peg_y and self._tile_is_occupied((new_peg_x, old_peg_y + 1)):
-                return True
-            elif new_peg_y < old_peg_y and self._tile_is_occupied((new_peg_x, old_peg_y - 1)):
-                return True
-        elif new_peg_y == old_peg_y:
-            if new_peg_x > old_peg_x and self._tile_is_occupied((old_peg_x + 1, new_peg_y)):
-                return True
-            elif new_peg_x < old_peg_x and self._tile_is_occupied((old_peg_x - 1, new_peg_y)):
-                return True
-        return False
-
-    def _move_is_legal(self, this_peg: Peg) -> bool:
-        """
-        Returns True if moving the peg to a new position satisfies all game rule requirements.
-        The target tile must be a hole, be empty, be two tiles away horizontally or vertically from the starting
-        position and the tile between the starting position and the target position must be occupied.
-        """
-        if (self._tile_is_hole(this_peg.grid_coords)
-                and not self._tile_is_occupied(this_peg.grid_coords)
-                and self._destination_is_valid(this_peg)
-                and self._is_jumping_over(this_peg)):
-            return True
-        return False
-
-    def _potential_move_is_legal(self, this_peg: Peg, destination: tuple[int, int]) -> bool:
-        """Returns True if Peg can potentially be moved to the given destination."""
-        pot_x, pot_y = destination
-        if self._board_size > pot_x >= 0 and self._board_size > pot_y >= 0:
-            if (self._tile_is_hole(destination)
-                    and not self._tile_is_occupied(destination)
-                    and self._is_jumping_over(this_peg, destination)):
-                return True
-        return False
+    def _get_legal_jump(self, this_peg: Peg):
+        """Returns the jump made by moving the peg from its old position to its current one, or None if illegal."""
+        jump = self._engine.find_jump(this_peg.old_grid_coords, this_peg.grid_coords)
+        if jump is not None and self._engine.is_legal(jump):
+            return jump
+        return None
 
     def _remove_peg(self, remove_xy: tuple[int, int]) -> None:
         """Moves a peg from _static_pegs to _fading_out_pegs. It will kill() itself when its alpha reaches 0."""
@@ -200,30 +309,42 @@ class Board:
                 self._static_pegs.remove(checked_peg)
                 self._fading_out_pegs.add(checked_peg)
 
-    @staticmethod
-    def _get_jumped_peg_coords(this_peg: Peg) -> tuple[int, int]:
-        """After jumping over a peg, identifies the peg to be removed and removes it"""
-        new_peg_x, new_peg_y = this_peg.grid_coords
-        old_peg_x, old_peg_y = this_peg.old_grid_coords
-        remove_x = (new_peg_x + old_peg_x) // 2
-        remove_y = (new_peg_y + old_peg_y) // 2
-        return remove_x, remove_y
-
     def undo(self) -> None:
         """Resets the board to the state before the last move. Resets defeat/victory state."""
-        if self.undo_stack:
-            last_move = self.undo_stack.pop()
-            self._remove_peg(last_move["new_pos"])
-            self._add_peg(last_move["old_pos"], self._static_pegs)
-            self._add_peg(last_move["jumped_peg_pos"], self._static_pegs)
-            self._check_for_victory_and_defeat()
-            self.move_count -= 1
+        if self._dragged_peg:
+            return
+        jump = self.move_log.undo()
+        if jump is not None:
+            old_pos, jumped_peg_pos, new_pos = self._engine.jump_coords(jump)
+            self._engine.revert(jump)
+            self._remove_peg(new_pos)
+            self._add_peg(old_pos, self._static_pegs)
+            self._add_peg(jumped_peg_pos, self._static_pegs)
             self._game_is_lost = False
             self._game_is_won = False
+            self._position_changed()
+
+    def redo(self) -> None:
+        """Makes the last undone move again."""
+        if self._dragged_peg:
+            return
+        jump = self.move_log.redo()
+        if jump is not None:
+            old_pos, jumped_peg_pos, new_pos = self._engine.jump_coords(jump)
+            self._engine.apply(jump)
+            self._remove_peg(jumped_peg_pos)
+            for peg in self._static_pegs:
+                if peg.grid_coords == old_pos:
+                    self._dirty_rects.append(peg.rect.copy())
+                    peg.kill()
+            self._add_peg(new_pos, self._static_pegs)
+            self._play_sound(self._peg_move_snd)
+            self._check_for_victory_and_defeat()
+            self._position_changed()
 
     def _check_for_victory(self) -> bool:
         """Returns True if the game is won."""
-        if len(self._static_pegs.sprites()) + int(bool(self._dragged_peg)) == 1:
+        if self._engine.peg_count == 1:
             if not self.is_victorious:
                 self._play_sound(self._victory_snd)
             return True
@@ -231,26 +352,24 @@ class Board:
 
     def _check_for_defeat(self) -> bool:
         """Returns True if there are no more valid moves, and the game is lost."""
-        all_pegs = [peg for peg in self._static_pegs]
-        if self._dragged_peg:
-            all_pegs.append(self._dragged_peg.sprite)
-        if len(all_pegs) == 1:
+        if self._engine.peg_count == 1 or self._engine.has_legal_jump():
             return False
-        for peg in all_pegs:
-            potential_destinations = self._get_potential_destinations(peg)
-            for destination in potential_destinations:
-                if self._potential_move_is_legal(peg, destination):
-                    return False
         if not self.is_defeated:
             self._play_sound(self._defeat_snd)
         return True
 
     def _check_for_victory_and_defeat(self) -> None:
-        """Unless the result is already known, checks if the game has been won or lost."""
+        """
+        Unless the result is already known, checks if the game has been won or lost. Calls on_game_over if it has just
+        become either.
+        """
+        was_over = self.is_victorious or self.is_defeated
         if not self.is_victorious:
             self._game_is_won = self._check_for_victory()
         if not self.is_defeated:
             self._game_is_lost = self._check_for_defeat()
+        if not was_over and (self.is_victorious or self.is_defeated) and self._on_game_over is not None:
+            self._on_game_over()
 
     @property
     def is_victorious(self) -> bool:
@@ -270,6 +389,17 @@ class Board:
     def process_input(self, events: pygame.event) -> None:
         """Runs the actual game logic."""
         for event in events:
+            # The arrow keys step back and forth through the moves; Home and End go to the start and the last move.
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_LEFT:
+                    self.undo()
+                elif event.key == pygame.K_RIGHT:
+                    self.redo()
+                elif event.key == pygame.K_HOME:
+                    self.jump_to_move(0)
+                elif event.key == pygame.K_END:
+                    self.jump_to_move(self.move_log.total)
+
             if event.type == pygame.MOUSEBUTTONDOWN:
                 # Divides the mouse coords by the resolution multiplier to get actual mouse position in terms of display
                 mouse_coords = tuple((coord // self._res_multiplier for coord in pygame.mouse.get_pos()))
@@ -289,44 +419,83 @@ class Board:
                     if peg.is_being_dragged:
                         # When the user lets go of the mouse button, updates the peg's status
                         peg.is_being_dragged = False
-                        if self._move_is_legal(peg):
+                        # Where the peg was last drawn; it's either moved to its new tile or snaps back from there.
+                        self._dirty_rects.append(peg.rect.copy())
+                        jump = self._get_legal_jump(peg)
+                        if jump is not None:
                             # Gets the coordinates of the peg between the dragged peg's old and new location.
-                            jumped_peg_coords = self._get_jumped_peg_coords(peg)
-                            # Adds the move info to the undo stack
-                            self.undo_stack.append(
-                                {"new_pos": peg.grid_coords,
-                                 "old_pos": peg.old_grid_coords,
-                                 "jumped_peg_pos": jumped_peg_coords}
-                            )
+                            _, jumped_peg_coords, _ = self._engine.jump_coords(jump)
                             # Moves the peg and removes the peg that was jumped over.
+                            self._engine.apply(jump)
+                            # Adds the move to the move log.
+                            self.move_log.record(jump, self._engine.position)
                             self._remove_peg(jumped_peg_coords)
                             peg.move_to_new_pos()
+                            self._dirty_rects.append(peg.rect.copy())
                             self._play_sound(self._peg_move_snd)
-                            self.move_count += 1
+                            self._position_changed()
                         else:
                             # If the peg's position when dropped is not a valid destination, puts it back.
                             if peg.grid_coords != peg.old_grid_coords:
                                 self._play_sound(self._snap_back_snd)
                             peg.snap_back()
+                            if peg.is_snapping_back:
+                                self._snapping_pegs.add(peg)
                         # Updates sprite groups and checks victory conditions.
                         self._dragged_peg.remove(peg)
                         self._static_pegs.add(peg)
+                        self._invalidate_sprites(self._highlights)
                         self._highlights.empty()
                         self._check_for_victory_and_defeat()
 
-    def draw_board(self) -> None:
-        """Updates all the sprite groups and blits them onto the board surface"""
-        # Draws board tiles.
-        self._grid_tiles.update()
+    def _draw_sprites(self, rect: pygame.Rect = None) -> None:
+        """
+        Draws the highlights and pegs on the board surface, all of them or just the ones touching the rect, in a single
+        batch; fading pegs show their current fade frame, and the dragged peg goes on top.
+        """
+        sprites = [*self._highlights, *self._hint_highlights, *self._static_pegs, *self._fading_out_pegs,
+                   *self._dragged_peg]
+        if rect is not None:
+            sprites = [sprite for sprite in sprites if sprite.rect.colliderect(rect)]
+        self._surface.fblits([(sprite.graphic, sprite.rect) for sprite in sprites])
+
+    def _redraw_rect(self, rect: pygame.Rect) -> None:
+        """Redraws the tiles, highlights and pegs in the given rect of the board surface, and nothing outside it."""
+        self._surface.set_clip(rect)
+        self._surface.blit(self._tile_layer, rect, rect)
+        self._draw_sprites(rect)
+        self._surface.set_clip(None)
+
+    def draw_board(self) -> list[pygame.Rect]:
+        """
+        Moves the pegs that are being dragged, snapping back or fading out, redraws the parts of the board surface that
+        changed, and blits them onto the target surface. Returns the rects of the target surface that were drawn on;
+        when nothing on the board changes, nothing is drawn.
+        """
         # If a peg is hovering above a highlighted tile, highlights it fully.
         self.check_highlight_hover()
-        # Draws highlights.
-        self._highlights.update()
-        # Draws pegs on the board.
-        self._static_pegs.update()
-        # Draws pegs that are fading out.
-        self._fading_out_pegs.update()
-        # Draws the peg that is being dragged by the player (if any).
-        self._dragged_peg.update()
-        # Draws everything on the target surface.
-        self.target_surface.blit(self._surface, self.board_pos)
+        # Moves the pegs in motion; both the places they were drawn in and the ones they move to are redrawn.
+        for peg in (*self._dragged_peg, *self._fading_out_pegs, *self._snapping_pegs):
+            self._dirty_rects.append(peg.rect.copy())
+            peg.animate()
+            self._dirty_rects.append(peg.rect.copy())
+            if not peg.is_snapping_back:
+                self._snapping_pegs.remove(peg)
+        surface_rect = self._surface.get_rect()
+        if self._redraw_all:
+            # Draws board tiles, highlights, pegs, pegs that are fading out and the dragged peg, in that order.
+            self._surface.blit(self._tile_layer, (0, 0))
+            self._draw_sprites()
+            dirty_rects = [surface_rect]
+            self._blit_all = True
+        else:
+            dirty_rects = [rect.clip(surface_rect) for rect in merge_rects(self._dirty_rects)]
+            for rect in dirty_rects:
+                self._redraw_rect(rect)
+        self._dirty_rects = []
+        self._redraw_all = False
+        # Draws the changed parts (or everything) on the target surface.
+        if self._blit_all:
+            self._blit_all = False
+            return [self.target_surface.blit(self._surface, self.board_pos)]
+        return [self.target_surface.blit(self._surface, rect.move(self.board_pos), rect) for rect in dirty_rects]
@@ -1,4 +1,5 @@
 import pygame
+from .animation_frames import make_fade_frames
 
 
 class Tile(pygame.sprite.Sprite):
@@ -33,14 +34,17 @@ class Peg(Tile):
     def __init__(self,
                  target_surface: pygame.surface.Surface,
                  pos: tuple[int, int],
-                 board_size: int,
+                 board_size: tuple[int, int],
                  board_pos: tuple[int, int],
                  res_multi: int,
-                 tile_type: pygame.surface.Surface):
+                 tile_type: pygame.surface.Surface,
+                 fade_frames: tuple = None):
         """
-        :param board_size: The length of the side of the board that this element will be placed on, in tiles.
+        :param board_size: The (width, height) of the board that this element will be placed on, in tiles.
         :param board_pos: The position of the board's surface on the target surface, in pixels.
         :param res_multi: Resolution multiplier, needed for correcting mouse cursor position values.
+        :param fade_frames: The peg graphic at each step of fading out, shared by all pegs (see AnimationFrameCache).
+            If None, the peg renders its own when it starts fading out.
         """
         super().__init__(target_surface, pos, tile_type)
         self.is_being_dragged = False
@@ -49,9 +53,11 @@ class Peg(Tile):
         self._res_multiplier = res_multi
         self._mouse_offset = (0, 0)
         self._old_rect = self.rect.copy()
-        # Set to True when the peg is being deleted and is fading out. It's alpha value will decrease each cycle.
+        # Set to True when the peg is being deleted and is fading out. Each cycle, it's shown one frame further into
+        # the fade.
         self._fading_out = False
-        self._alpha = 255
+        self._fade_frames = fade_frames
+        self._fade_step = 0
         # Set to True when the peg has been released outside of a valid destination and is being moved back to where it
         # was taken from.
         self.is_snapping_back = False
@@ -69,8 +75,8 @@ class Peg(Tile):
         Returns the x position of the peg within the grid (in terms of tiles).
         Return value is limited to board size, in case user drags peg outside.
         """
-        return (int(min(self.rect.centerx // self.rect.width, self._board_size - 1)),
-                int(min(self.rect.centery // self.rect.height, self._board_size - 1)))
+        return (int(min(self.rect.centerx // self.rect.width, self._board_size[0] - 1)),
+                int(min(self.rect.centery // self.rect.height, self._board_size[1] - 1)))
 
     @property
     def old_grid_coords(self) -> tuple[int, int]:
@@ -94,6 +100,8 @@ class Peg(Tile):
 
     def fade_out(self) -> None:
         """Begins to fade the button out. When done, it will be removed."""
+        if self._fade_frames is None:
+            self._fade_frames = make_fade_frames(self.graphic)
         self._fading_out = True
 
     def snap_back(self) -> None:
@@ -119,23 +127,22 @@ class Peg(Tile):
         self.rect.x, self.rect.y = new_x * self.rect.width, new_y * self.rect.height
         self._old_rect = self.rect.copy()
 
-    def update(self) -> None:
-        """Draws the peg on the board surface."""
+    def animate(self) -> None:
+        """Moves the peg along with the cursor or back to where it was taken from, and fades it out, as needed."""
         # If the peg is being dragged, updates its coords every frame to keep a constant position relative to the cursor
         if self.is_being_dragged:
             mouse_x, mouse_y = tuple((coord // self._res_multiplier for coord in pygame.mouse.get_pos()))
             x_offset, y_offset = self.mouse_offset
             self.rect.x = min(max(0, mouse_x + x_offset), self._target_surface.get_width() - int(self.rect.width))
             self.rect.y = min(max(0, mouse_y + y_offset), self._target_surface.get_height() - int(self.rect.height))
-        # If self._fading_out is set to true (which happens when the peg gets jumped over), reduces it's alpha
-        # value by 8 every frame. Once it reaches 0, kill()s it.
+        # If self._fading_out is set to true (which happens when the peg gets jumped over), shows the next, more
+        # transparent, fade frame every frame. Once it's gone past the last one, kill()s it.
         if self._fading_out:
-            self._alpha = max(0, self._alpha - 8)
-            alpha_image = self.graphic.copy()
-            alpha_image.fill((255, 255, 255, self._alpha), special_flags=pygame.BLEND_RGBA_MULT)
-            self._target_surface.blit(alpha_image, self.rect)
-            if self._alpha <= 0:
+            self._fade_step += 1
+            if self._fade_step >= len(self._fade_frames):
                 self.kill()
+            else:
+                self.graphic = self._fade_frames[self._fade_step]
         # If self._is_snapping_back is set to True, changes self._position by the value of self._velocity every frame.
         # self._velocity is the normalized direction vector multiplied by the value of self._speed.
         # If the peg is within the number is pixels defined in self._speed, stops moving and sets the peg's position
@@ -147,6 +154,8 @@ class Peg(Tile):
             else:
                 self._position += self._velocity
                 self.rect.topleft = self._position
-        # Draws the peg.
-        if not self._fading_out:
-            self.display()
+
+    def update(self) -> None:
+        """Moves the peg as needed and draws it on the board surface."""
+        self.animate()
+        self.display()
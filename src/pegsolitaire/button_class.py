@@ -1,4 +1,5 @@
 import pygame
+from typing import Optional
 from .asset_loader import load_font
 
 
@@ -45,6 +46,7 @@ class Button(pygame.sprite.Sprite):
         :param text_x_offset: How much to shift the button text in the x axis.
         :param text_y_offset: How much to shift the button text in the y axis.
         :param active_condition: If not None, the button will be active if the condition is True, and inactive if False.
+            If it is a function, it is called each time to get the condition.
 
         """
         super().__init__()
@@ -75,6 +77,8 @@ class Button(pygame.sprite.Sprite):
         self._font = load_font(font_type, size=font_size)
         self._is_pressed = False
         self.active_condition = active_condition
+        # How the button looked when it was last drawn (pressed, active), or None if it has to be drawn again anyway.
+        self._drawn_look = None
 
     @property
     def is_active(self) -> bool:
@@ -91,7 +95,9 @@ class Button(pygame.sprite.Sprite):
 
     def update_active_state(self) -> None:
         """Evaluates the condition and sets the button's active status accordingly."""
-        if self.active_condition is not None:
+        if callable(self.active_condition):
+            self.is_active = bool(self.active_condition())
+        elif self.active_condition is not None:
             self.is_active = bool(self.active_condition)
 
     def is_mouseover(self) -> bool:
@@ -120,15 +126,20 @@ class Button(pygame.sprite.Sprite):
         text_pos_y = self.rect.y + self._y_offset + shift_pos
         self._surface.blit(button_text, (text_pos_x, text_pos_y))
 
+    def invalidate(self) -> None:
+        """Makes the next update() draw the button, e.g. after something else was drawn over it."""
+        self._drawn_look = None
+
     def play_sound(self) -> None:
         """Plays a sound if a sound has been passed as an argument and an options object exists and is set to play."""
         if self._options is not None and self._options.play_sounds and self._click_sound is not None:
             self._click_sound.play()
 
-    def update(self, events) -> None:
+    def update(self, events) -> Optional[pygame.Rect]:
         """
         Checks for mouse button presses and draws the button accordingly.
         If the left mouse button is released when the cursor is hovering above the button, executes command.
+        The button is only drawn if it looks different than when it was last drawn; returns its rect if it was drawn.
         """
         self.update_active_state()
         if self.is_active:
@@ -147,4 +158,9 @@ class Button(pygame.sprite.Sprite):
             # Sets the button to not pressed if the user moves the mouse cursor away
             if self._is_pressed and not self.is_mouseover():
                 self._is_pressed = False
+        look = (self._is_pressed and self._is_active, self._is_active)
+        if look == self._drawn_look:
+            return None
+        self._drawn_look = look
         self.display()
+        return self.rect
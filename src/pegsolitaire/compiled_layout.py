@@ -0,0 +1,273 @@
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass
+from .user_data import get_user_data_path
+
+# Bumped whenever the contents of CompiledLayout change, so that stale files in the on-disk cache are not loaded.
+FORMAT_VERSION = 4
+
+# Unit steps along the four jump directions, in the order used by CompiledLayout: +y, -y, +x, -x.
+DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+# Two bits for each of the three colours of a three-colouring of the diagonals, chosen so that the three colours
+# cancel out: a jump empties two holes and fills one, covering all three colours, so it leaves the XOR of the codes of
+# all pegs unchanged. That XOR tells the parity of the peg counts of colours 0 and 1 together and of colours 1 and 2
+# together.
+_COLOUR_CODES = (0b01, 0b11, 0b10)
+
+# The eight symmetries of a square, as functions of coordinates relative to the centre of the board.
+_DIHEDRAL = (
+    lambda u, v: (u, v),
+    lambda u, v: (-v, u),
+    lambda u, v: (-u, -v),
+    lambda u, v: (v, -u),
+    lambda u, v: (-u, v),
+    lambda u, v: (u, -v),
+    lambda u, v: (v, u),
+    lambda u, v: (-v, -u),
+)
+
+# Layouts compiled during this session, by key.
+_compiled = {}
+
+
+@dataclass(frozen=True, eq=False)
+class CompiledLayout:
+    """
+    Immutable, precomputed geometry of a board layout, shared by the rules engine and any analysis tools.
+
+    Holes are numbered in (x, y) order; bit i of a position bitboard stands for hole i. transposed_index gives each
+    hole's number in (y, x) order, which is used to generate jumps along the x axis with shifts.
+    """
+    key: str
+    holes: tuple
+    hole_index: dict
+    start: int
+    transposed_index: tuple
+    # Every jump, as a (from, over, to) triple of hole numbers.
+    jumps: tuple
+    jumps_by_ends: dict
+    # For each hole: the jumps that start at it, and all the jumps it takes part in (as the start, middle or end).
+    jumps_from: tuple
+    jumps_by_hole: tuple
+    # For each jump: the jumps whose legality can change when it is made, i.e. all jumps sharing a hole with it.
+    affected_jumps: tuple
+    # For each jump direction: a mask of the holes a jump in that direction can start from (in (x, y) order for
+    # the y axis and in (y, x) order for the x axis), and the jump that starts at each of those holes.
+    jump_starts: tuple
+    jump_at: tuple
+    # Masks used to check, apply and revert each jump.
+    from_over_masks: tuple
+    to_masks: tuple
+    jump_masks: tuple
+    transposed_jump_masks: tuple
+    # Permutations of the hole numbers that map the layout onto itself, the identity first.
+    symmetries: tuple
+    # For each symmetry, lookup tables that map each byte of a bitboard to the permuted bits, used to apply
+    # the symmetry to a whole position a byte at a time.
+    symmetry_tables: tuple
+    # For each hole, its share of the position class: the colour codes of its two diagonals, in 4 bits.
+    hole_classes: tuple
+
+    @property
+    def hole_count(self) -> int:
+        """Returns the number of holes in the layout."""
+        return len(self.holes)
+
+    @property
+    def full_mask(self) -> int:
+        """Returns the position with a peg in every hole."""
+        return (1 << len(self.holes)) - 1
+
+    @property
+    def start_position(self) -> int:
+        """Returns the layout's starting position: every hole filled, except the start hole."""
+        return self.full_mask ^ (1 << self.start)
+
+    def position_class(self, position: int) -> int:
+        """
+        Returns the class of the position, one of 16, which no jump can change: the XOR of the classes of the holes
+        with a peg in them.
+        """
+        position_class = 0
+        hole_classes = self.hole_classes
+        while position:
+            lowest = position & -position
+            position_class ^= hole_classes[lowest.bit_length() - 1]
+            position ^= lowest
+        return position_class
+
+    def can_finish_in(self, position: int, hole: int) -> bool:
+        """
+        Returns False if the position can never be turned into a single peg in the given hole, because they belong to
+        different classes. True means it might be, not that it can.
+        """
+        return self.position_class(position) == self.hole_classes[hole]
+
+    def possible_targets(self, position: int) -> list:
+        """Returns the holes that the position's last peg might end up in, as far as its class tells."""
+        position_class = self.position_class(position)
+        return [hole for hole, hole_class in enumerate(self.hole_classes) if hole_class == position_class]
+
+    def symmetries_fixing(self, hole) -> tuple:
+        """Returns the numbers of the symmetries that leave the given hole in place (all of them if hole is None)."""
+        return tuple(index for index, symmetry in enumerate(self.symmetries) if hole is None or symmetry[hole] == hole)
+
+    def transform(self, position: int, symmetry: int) -> int:
+        """Returns the position mapped through the given symmetry."""
+        transformed = 0
+        for table in self.symmetry_tables[symmetry]:
+            transformed |= table[position & 0xFF]
+            position >>= 8
+        return transformed
+
+    def canonical(self, position: int, symmetries: tuple = None) -> int:
+        """
+        Returns the smallest of the position's images under the given symmetries (all of them by default), which is the
+        same for every position that is symmetric to it.
+        """
+        all_tables = self.symmetry_tables
+        canonical = position
+        for symmetry in range(1, len(all_tables)) if symmetries is None else symmetries:
+            transformed, rest = 0, position
+            for table in all_tables[symmetry]:
+                transformed |= table[rest & 0xFF]
+                rest >>= 8
+            if transformed < canonical:
+                canonical = transformed
+        return canonical
+
+
+def layout_key(layout: dict) -> str:
+    """Returns a hash that identifies the given layout by its holes and start, whatever order the holes are in."""
+    data = repr((FORMAT_VERSION, tuple(sorted(map(tuple, layout["holes"]))), tuple(layout["start"])))
+    return hashlib.sha256(data.encode()).hexdigest()[:24]
+
+
+def layout_id(layout: dict) -> str:
+    """
+    Returns a hash that identifies the given layout by its holes and start alone. Unlike layout_key(), it stays the
+    same when FORMAT_VERSION is bumped, so it can be kept in files that have to outlive the cache, like game records.
+    """
+    data = repr((tuple(sorted(map(tuple, layout["holes"]))), tuple(layout["start"])))
+    return hashlib.sha256(data.encode()).hexdigest()[:24]
+
+
+def _find_symmetries(holes: tuple, hole_index: dict) -> tuple:
+    """Returns the permutations of the holes under which the set of holes stays the same."""
+    # Coordinates are doubled so that the centre of the board has integer coordinates.
+    x_sum = min(x for x, _ in holes) + max(x for x, _ in holes)
+    y_sum = min(y for _, y in holes) + max(y for _, y in holes)
+    symmetries = []
+    for transform in _DIHEDRAL:
+        permutation = []
+        for x, y in holes:
+            u, v = transform(2 * x - x_sum, 2 * y - y_sum)
+            image = hole_index.get(((u + x_sum) // 2, (v + y_sum) // 2))
+            if image is None or (u + x_sum) % 2 or (v + y_sum) % 2:
+                break
+            permutation.append(image)
+        else:
+            permutation = tuple(permutation)
+            if permutation not in symmetries:
+                symmetries.append(permutation)
+    return tuple(symmetries)
+
+
+def _build_symmetry_tables(symmetry: tuple) -> tuple:
+    """Returns the byte lookup tables that apply the given permutation of the holes to a bitboard."""
+    tables = []
+    for first_hole in range(0, len(symmetry), 8):
+        images = symmetry[first_hole:first_hole + 8]
+        table = []
+        for byte in range(256):
+            table.append(sum(1 << image for bit, image in enumerate(images) if byte >> bit & 1))
+        tables.append(tuple(table))
+    return tuple(tables)
+
+
+def _compile(layout: dict, key: str) -> CompiledLayout:
+    """
+    Works out the geometry of the given layout. Only the holes are looked at, never the whole board, so the work and
+    the size of the result grow with the number of holes and jumps.
+    """
+    holes = tuple(sorted(map(tuple, layout["holes"])))
+    hole_index = {coords: index for index, coords in enumerate(holes)}
+    transposed_index = [0] * len(holes)
+    for transposed, index in enumerate(sorted(range(len(holes)), key=lambda index: holes[index][::-1])):
+        transposed_index[index] = transposed
+    jumps = []
+    jumps_by_ends = {}
+    jumps_from = [[] for _ in holes]
+    jumps_by_hole = [[] for _ in holes]
+    jump_starts = [0, 0, 0, 0]
+    jump_at = [[None] * len(holes) for _ in DIRECTIONS]
+    for index, (x, y) in enumerate(holes):
+        for direction, (dx, dy) in enumerate(DIRECTIONS):
+            over = hole_index.get((x + dx, y + dy))
+            to = hole_index.get((x + 2 * dx, y + 2 * dy))
+            if over is None or to is None:
+                continue
+            jump = len(jumps)
+            jumps.append((index, over, to))
+            jumps_by_ends[(index, to)] = jump
+            jumps_from[index].append(jump)
+            for hole in (index, over, to):
+                jumps_by_hole[hole].append(jump)
+            start = index if dx == 0 else transposed_index[index]
+            jump_starts[direction] |= 1 << start
+            jump_at[direction][start] = jump
+    from_over_masks = tuple((1 << src) | (1 << over) for src, over, _ in jumps)
+    to_masks = tuple(1 << to for _, _, to in jumps)
+    symmetries = _find_symmetries(holes, hole_index)
+    return CompiledLayout(
+        key=key,
+        holes=holes,
+        hole_index=hole_index,
+        start=hole_index[tuple(layout["start"])],
+        transposed_index=tuple(transposed_index),
+        jumps=tuple(jumps),
+        jumps_by_ends=jumps_by_ends,
+        jumps_from=tuple(map(tuple, jumps_from)),
+        jumps_by_hole=tuple(map(tuple, jumps_by_hole)),
+        affected_jumps=tuple(tuple(sorted(set().union(*(jumps_by_hole[hole] for hole in jump)))) for jump in jumps),
+        jump_starts=tuple(jump_starts),
+        jump_at=tuple(map(tuple, jump_at)),
+        from_over_masks=from_over_masks,
+        to_masks=to_masks,
+        jump_masks=tuple(from_over | to for from_over, to in zip(from_over_masks, to_masks)),
+        transposed_jump_masks=tuple(sum(1 << transposed_index[hole] for hole in jump) for jump in jumps),
+        symmetries=symmetries,
+        symmetry_tables=tuple(_build_symmetry_tables(symmetry) for symmetry in symmetries),
+        hole_classes=tuple(_COLOUR_CODES[(x + y) % 3] | _COLOUR_CODES[(x - y) % 3] << 2 for x, y in holes),
+    )
+
+
+def compile_layout(layout: dict) -> CompiledLayout:
+    """
+    Returns the compiled form of the given layout. Compiled layouts are cached in memory and on disk, in the user
+    data directory, so each layout is only ever compiled once.
+    """
+    key = layout_key(layout)
+    if key in _compiled:
+        return _compiled[key]
+    cache_file_path = get_user_data_path() / "layouts" / f"{key}.dat"
+    try:
+        with cache_file_path.open("rb") as in_file:
+            compiled = pickle.load(in_file)
+        if not isinstance(compiled, CompiledLayout) or compiled.key != key:
+            raise pickle.UnpicklingError
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError):
+        compiled = _compile(layout, key)
+        try:
+            cache_file_path.parent.mkdir(parents=True, exist_ok=True)
+            # Writes to a temporary file first, so that other processes never read a half-written file.
+            temp_file_path = cache_file_path.with_suffix(f".{os.getpid()}.tmp")
+            with temp_file_path.open("wb") as out_file:
+                pickle.dump(compiled, out_file)
+            os.replace(temp_file_path, cache_file_path)
+        except (OSError, pickle.PicklingError):
+            pass
+    _compiled[key] = compiled
+    return compiled
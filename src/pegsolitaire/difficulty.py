@@ -0,0 +1,169 @@
+import argparse
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import NamedTuple
+from . import layouts
+from .compiled_layout import CompiledLayout, compile_layout
+from .puzzles import load_puzzles, puzzle_file_path, random_puzzle
+from .rules_engine import RulesEngine
+from .simulation import play_out, random_policy
+from .solvability_db import SolvabilityDatabase
+from .solver import Solver
+
+# Number of random games played from each position to measure how easily it is won by chance.
+PLAYOUTS = 200
+# Levels the puzzles are split into, from easiest to hardest; each gets the same share of the rated puzzles.
+LEVELS = ("easy", "medium", "hard")
+
+# Solvers of the worker processes, by layout key.
+_solvers = {}
+
+
+class Rating(NamedTuple):
+    """How hard a starting position is, and the measurements it is worked out from."""
+    position: int
+    # From 0 (easiest) to 1 (hardest, or unsolvable): one minus the average of the three shares below.
+    difficulty: float
+    # Share of the legal first jumps that keep the position winnable.
+    winning_first_moves: float
+    # Share of the legal jumps that keep the game winnable, on average along a winning line: how wide the tree of
+    # winning moves is.
+    tree_width: float
+    # Share of random games from the position that were won.
+    playout_win_rate: float
+
+
+def _solver(layout: CompiledLayout) -> Solver:
+    """Returns the worker process's solver for the layout, aiming for a single peg in any hole."""
+    if layout.key not in _solvers:
+        _solvers[layout.key] = Solver(layout, database=SolvabilityDatabase(layout))
+    return _solvers[layout.key]
+
+
+def _winning_share(solver: Solver, engine: RulesEngine, position: int):
+    """Returns the share of the position's legal jumps that keep it winnable, and one of those jumps (or None)."""
+    engine.set_position(position)
+    legal_jumps = engine.legal_jumps()
+    winning_jumps = [jump for jump in legal_jumps
+                     if solver.solve(position ^ solver.layout.jump_masks[jump]) is not None]
+    return len(winning_jumps) / max(len(legal_jumps), 1), winning_jumps[0] if winning_jumps else None
+
+
+def rate_position(layout: CompiledLayout, position: int, playouts: int = PLAYOUTS) -> Rating:
+    """
+    Rates a starting position by solving every legal jump along a winning line, and by random playouts. The same
+    position always gets the same rating.
+    """
+    solver = _solver(layout)
+    engine = RulesEngine(layout)
+    wins = 0
+    rng = random.Random(position)
+    for _ in range(playouts):
+        engine.set_position(position)
+        wins += play_out(engine, random_policy, rng) == 1
+    playout_win_rate = wins / playouts
+    if bin(position).count("1") == 1:
+        return Rating(position, 0.0, 1.0, 1.0, 1.0)
+    winning_first_moves, jump = _winning_share(solver, engine, position)
+    if jump is None:
+        return Rating(position, 1.0, 0.0, 0.0, playout_win_rate)
+    shares = [winning_first_moves]
+    current = position ^ layout.jump_masks[jump]
+    while bin(current).count("1") > 1:
+        share, jump = _winning_share(solver, engine, current)
+        shares.append(share)
+        current ^= layout.jump_masks[jump]
+    tree_width = sum(shares) / len(shares)
+    difficulty = 1 - (winning_first_moves + tree_width + playout_win_rate) / 3
+    return Rating(position, difficulty, winning_first_moves, tree_width, playout_win_rate)
+
+
+def rate_positions(layout: CompiledLayout, positions: list, workers: int = None) -> list:
+    """Rates positions in a pool of worker processes. Returns their Ratings, easiest first."""
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        ratings = list(executor.map(partial(rate_position, layout), positions,
+                                    chunksize=max(1, len(positions) // (workers * 8))))
+    ratings.sort(key=lambda rating: rating.difficulty)
+    return ratings
+
+
+def index_file_path(layout: CompiledLayout) -> Path:
+    """Returns the path of the file the ratings of the layout's puzzles are kept in, next to the puzzles."""
+    return puzzle_file_path(layout).with_name(f"{layout.key}_difficulty.txt")
+
+
+def save_index(layout: CompiledLayout, ratings: list) -> None:
+    """Writes the ratings to the layout's difficulty index, easiest first, one position per line."""
+    path = index_file_path(layout)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Writes to a temporary file first, so that the game never reads a half-written file.
+    temp_file_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with temp_file_path.open("w") as out_file:
+        out_file.write("# difficulty winning_first_moves tree_width playout_win_rate position\n")
+        for rating in sorted(ratings, key=lambda rating: rating.difficulty):
+            out_file.write(f"{rating.difficulty:.4f} {rating.winning_first_moves:.4f} {rating.tree_width:.4f} "
+                           f"{rating.playout_win_rate:.4f} {rating.position:x}\n")
+    os.replace(temp_file_path, path)
+
+
+def load_index(layout: CompiledLayout) -> list:
+    """Returns the Ratings in the layout's difficulty index, easiest first, or an empty list if there is none."""
+    ratings = []
+    try:
+        with index_file_path(layout).open() as in_file:
+            for line in in_file:
+                if line.strip() and not line.startswith("#"):
+                    difficulty, first_moves, tree_width, win_rate, position = line.split()
+                    ratings.append(Rating(int(position, 16), float(difficulty), float(first_moves), float(tree_width),
+                                          float(win_rate)))
+    except (OSError, ValueError):
+        return []
+    return ratings
+
+
+def level_ratings(ratings: list, level: str) -> list:
+    """Returns the share of the ratings (sorted easiest first) that belongs to the given level, one of LEVELS."""
+    index = LEVELS.index(level)
+    return ratings[index * len(ratings) // len(LEVELS):(index + 1) * len(ratings) // len(LEVELS)]
+
+
+def puzzle_of_level(layout: CompiledLayout, level: str, rng=random) -> int:
+    """
+    Returns a random puzzle of the given level (one of LEVELS), looked up in the layout's difficulty index. Without an
+    index, any puzzle is returned.
+    """
+    ratings = load_index(layout)
+    if not ratings:
+        return random_puzzle(layout, rng)
+    return rng.choice(level_ratings(ratings, level) or ratings).position
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rates the puzzles of a layout and writes the difficulty index the game picks puzzles from.")
+    parser.add_argument("-l", "--layout", type=int, choices=range(len(layouts.layouts)), default=0,
+                        help="Number of the layout whose puzzles to rate (0 is the English board).")
+    parser.add_argument("-n", "--count", type=int, default=None,
+                        help="Number of puzzles to rate, from the start of the puzzle file; by default, all of them.")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Number of worker processes; by default, the number of CPUs.")
+    args = parser.parse_args()
+    layout = compile_layout(layouts.layouts[args.layout])
+    puzzles = load_puzzles(layout)[:args.count]
+    if not puzzles:
+        parser.error(f"no puzzles in {puzzle_file_path(layout)}; make some with python -m pegsolitaire.puzzles")
+    ratings = rate_positions(layout, puzzles, args.workers)
+    save_index(layout, ratings)
+    for level in LEVELS:
+        share = level_ratings(ratings, level)
+        if share:
+            print(f"{level}: {len(share)} puzzles, difficulty {share[0].difficulty:.3f} to {share[-1].difficulty:.3f}")
+    print(f"Wrote {index_file_path(layout)}")
+
+
+if __name__ == "__main__":
+    main()
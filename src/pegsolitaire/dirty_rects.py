@@ -0,0 +1,18 @@
+import pygame
+
+
+def merge_rects(rects: list) -> list[pygame.Rect]:
+    """
+    Returns the rects with every group of overlapping ones replaced by their union, so that no area is redrawn or
+    updated twice. Frames have only a few changed rects, so the simple quadratic merge is plenty fast.
+    """
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        # A union can overlap rects that were kept before, so merging goes on until it doesn't.
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
@@ -0,0 +1,433 @@
+import pickle
+from sys import exit
+from enum import Enum, auto
+from pathlib import Path
+from . import layouts
+from .sounds import *
+from .board_class import Board
+from .compiled_layout import compile_layout
+from .game_records import GameRecordWriter, make_record
+from .hint_service import HintService
+from .hud import PerformanceHud
+from .graphics import *
+from .options import Options
+from .profiler import NULL_PROFILER, ProfilerGroup
+from .trace import TraceRecorder
+from .difficulty import puzzle_of_level
+from .dirty_rects import merge_rects
+from .ui_elements import InitializeButtons, InitializeDialogWindows, InitializeToggles
+from .user_data import get_user_data_path
+
+
+class Game:
+    class GameStates(Enum):
+        """Enumerates game states."""
+        GAME = auto()
+        MAIN_MENU = auto()
+        LAYOUT_MENU = auto()
+        SETTINGS_MENU = auto()
+        REALLY_QUIT = auto()
+        REALLY_RESET = auto()
+
+    def __init__(self, args):
+        # Instantiates a clock.
+        self.clock = pygame.time.Clock()
+        # Loads settings from options.dat; If not successful, loads defaults.
+        try:
+            with self.get_options_file().open("rb") as in_file:
+                self.options = pickle.load(in_file)
+        except (OSError, pickle.UnpicklingError):
+            self.options = Options("en", True, True)
+        # Loads graphics.
+        self.gfx = Graphics(self.options.lang, args.scale, args.sdl_scaling)
+        # Loads sounds.
+        self.snd = Sounds()
+        # Performance overlay, toggled with F3 or shown from the start with --hud, and with --trace, a recording of
+        # every frame. While neither is on, the frames are timed by a profiler that does nothing.
+        self.hud = PerformanceHud(self.gfx.display, self.gfx.hud_font, self.clock)
+        self.trace = TraceRecorder(args.trace, args.trace_memory) if args.trace is not None else None
+        self.profiler = NULL_PROFILER
+        if args.hud:
+            self.hud.toggle()
+        self.update_profiler()
+        # Sets default state to MAIN_MENU.
+        self.state = self.GameStates.MAIN_MENU
+        # Only the parts of the display that change are drawn, scaled up and updated on the screen. The rects of the
+        # display changed during a frame are collected here; the whole display is drawn again on the first frame of a
+        # state (self._redraw), or when something else asks for it (self._redraw_all) and the next frame starts.
+        self._dirty_rects = []
+        self._redraw = True
+        self._redraw_all = True
+        # Labels drawn in the column left of the board during the last frame, as (surface, position) pairs.
+        self._drawn_labels = []
+        self._move_label_text = None
+        self._move_label = None
+        # Number of the last chosen layout; puzzles are picked for it.
+        self.layout_number = 0
+        # Analyses the board in a background process; shows its answer when the player asks for a hint.
+        self.hints = HintService()
+        self.show_hint = False
+        # Every finished game is appended to a file of game records in the user data directory, for later analysis.
+        self.game_records = GameRecordWriter(get_user_data_path() / "games.rec")
+        self._archived_game = None
+        # Instantiates a board object, which controls and displays all actual gameplay.
+        self.board = Board(layouts.layouts[0],
+                           self.gfx.BOARD_DIMENSIONS,
+                           self.gfx.display,
+                           self.gfx.BOARD_POS,
+                           self.gfx.scaling_factor,
+                           self.gfx.tile_smooth,
+                           self.gfx.tile_hole,
+                           self.gfx.peg,
+                           self.gfx.highlight,
+                           self.gfx.highlight_full,
+                           peg_move_snd=self.snd.peg_move,
+                           snap_back_snd=self.snd.snap_back,
+                           victory_snd=self.snd.victory,
+                           defeat_snd=self.snd.defeat,
+                           options=self.options,
+                           on_position_change=self.position_changed,
+                           on_game_over=self.archive_game,
+                           animation_frames=self.gfx.animation_frames)
+        # Assigns methods to states; When game state changes, its corresponding method will be called.
+        self.game_state_methods = {
+            self.GameStates.GAME: self.gameplay,
+            self.GameStates.MAIN_MENU: self.main_menu,
+            self.GameStates.LAYOUT_MENU: self.layout_menu,
+            self.GameStates.SETTINGS_MENU: self.settings_menu,
+            self.GameStates.REALLY_QUIT: self.really_quit,
+            self.GameStates.REALLY_RESET: self.really_reset
+        }
+        # Assigns methods and arguments to buttons. When a button gets clicked, the assigned method will be called.
+        self.button_methods = {
+            "play": {"method": self.switch_state, "args": (self.GameStates.LAYOUT_MENU,)},
+            "settings": {"method": self.switch_state, "args": (self.GameStates.SETTINGS_MENU,)},
+            "quit_game": {"method": self.quit_game, "args": None},
+            "layout_1": {"method": self.set_layout_and_start, "args": (0,)},
+            "layout_2": {"method": self.set_layout_and_start, "args": (1,)},
+            "layout_3": {"method": self.set_layout_and_start, "args": (2,)},
+            "layout_4": {"method": self.set_layout_and_start, "args": (3,)},
+            "layout_5": {"method": self.set_layout_and_start, "args": (4,)},
+            "puzzle_easy": {"method": self.start_puzzle, "args": ("easy",)},
+            "puzzle_medium": {"method": self.start_puzzle, "args": ("medium",)},
+            "puzzle_hard": {"method": self.start_puzzle, "args": ("hard",)},
+            "layout_back": {"method": self.switch_state, "args": (self.GameStates.MAIN_MENU,)},
+            "undo": {"method": self.board.undo, "args": None,
+                     "active_condition": self.board.move_log},
+            "redo": {"method": self.board.redo, "args": None,
+                     "active_condition": self.board.move_log.can_redo},
+            "hint": {"method": self.request_hint, "args": None},
+            "restart": {"method": self.switch_state, "args": (self.GameStates.REALLY_RESET,),
+                        "active_condition": self.board.move_log},
+            "exit_game": {"method": self.switch_state, "args": (self.GameStates.REALLY_QUIT,)},
+            "dialog_quit_yes": {"method": self.switch_state, "args": (self.GameStates.MAIN_MENU,)},
+            "dialog_quit_no": {"method": self.switch_state, "args": (self.GameStates.GAME,)},
+            "dialog_restart_yes": {"method": self.reset_board, "args": None},
+            "dialog_restart_no": {"method": self.switch_state, "args": (self.GameStates.GAME,)},
+            "cancel": {"method": self.cancel_settings, "args": None},
+            "apply": {"method": self.apply_settings, "args": None}
+        }
+        # Assigns methods and arguments to toggles. When a toggle gets switched, the assigned method will be called.
+        self.toggle_methods = {
+            "english_toggle_pressed": self.english_toggle_pressed,
+            "polski_toggle_pressed": self.polski_toggle_pressed
+        }
+        # Initializes UI elements.
+        self.buttons = InitializeButtons(self.gfx, self.snd, self.options, self.button_methods)
+        self.dialog_windows = InitializeDialogWindows(self.gfx, self.options)
+        self.toggles = InitializeToggles(self.gfx, self.snd, self.options, self.toggle_methods)
+    
+    def get_options_file(self) -> Path:
+        """
+        Checks if there is an options file in the user data path; if not, creates a new file with default values.
+        Returns the path to that file.
+        """
+        options_file_path = get_user_data_path() / "options.dat"
+        if not options_file_path.exists():
+            options_file_path.parent.mkdir(parents=True, exist_ok=True)
+            self.options = Options("en", True, True)
+            with options_file_path.open("wb") as out_file:
+                pickle.dump(self.options, out_file)
+        return options_file_path
+
+    def toggle_hud(self) -> None:
+        """Shows or hides the performance overlay, and starts or stops timing the frames with it."""
+        self.hud.toggle()
+        self.update_profiler()
+        # Whatever the overlay covered has to be drawn again.
+        if not self.hud.is_on:
+            self._redraw_all = True
+
+    def update_profiler(self) -> None:
+        """Times the frames with the overlay's profiler and the trace recorder, whichever are on."""
+        profilers = [profiler for profiler in (self.hud.profiler if self.hud.is_on else None, self.trace)
+                     if profiler is not None]
+        if not profilers:
+            self.profiler = NULL_PROFILER
+        elif len(profilers) == 1:
+            self.profiler = profilers[0]
+        else:
+            self.profiler = ProfilerGroup(profilers)
+
+    def switch_state(self, state: GameStates) -> None:
+        """Changes the game state, drawing the whole display anew from the next frame."""
+        self.state = state
+        self._redraw_all = True
+
+    def set_layout_and_start(self, layout: int) -> None:
+        """Loads a chosen layout into the board and changes game state to GAME."""
+        self.layout_number = layout
+        self.board.load_layout(layouts.layouts[layout])
+        self.switch_state(self.GameStates.GAME)
+
+    def start_puzzle(self, level: str) -> None:
+        """
+        Loads a random puzzle of the given level ("easy", "medium" or "hard") for the last chosen layout (English by
+        default) and changes game state to GAME. The level is looked up in the difficulty index made offline.
+        """
+        layout = layouts.layouts[self.layout_number]
+        self.board.load_puzzle(layout, puzzle_of_level(compile_layout(layout), level))
+        self.switch_state(self.GameStates.GAME)
+
+    def position_changed(self) -> None:
+        """Called by the board after every change of position. Starts analysing the new position in the background."""
+        self.show_hint = False
+        self.hints.request(self.board.engine.layout, self.board.engine.position)
+
+    def archive_game(self) -> None:
+        """
+        Called by the board when the game becomes won or lost. Appends the finished game to the game records, unless it
+        was just archived (e.g. redone after an undo).
+        """
+        record = make_record(self.board.engine.layout, self.board.move_log.jumps,
+                             self.board.start_position if self.board.is_puzzle else None)
+        if record == self._archived_game:
+            return
+        self._archived_game = record
+        try:
+            self.game_records.write(record)
+        except OSError:
+            pass
+
+    def request_hint(self) -> None:
+        """Shows the hint for the current position; it will be displayed as soon as the analysis is done."""
+        self.show_hint = True
+
+    def quit_game(self) -> None:
+        """Stops the background analysis, finishes the trace, if one is being recorded, and quits the game."""
+        self.hints.close()
+        if self.trace is not None:
+            self.trace.close()
+        pygame.quit()
+        # The window is closed by now, so waiting for the worker processes to stop doesn't hold anything up.
+        self.hints.join()
+        exit(0)
+
+    def reset_board(self) -> None:
+        """Moves all pegs to their starting positions and clears the move log."""
+        self.board.reset_pegs()
+        self.switch_state(self.GameStates.GAME)
+
+    def apply_settings(self) -> None:
+        """
+        Applies settings changes according to the state of their corresposing switches, saves the settings
+        to options.dat, and changes the game state to MAIN_MENU.
+        """
+        # Reads the state of toggle switches.
+        self.board.play_sounds = self.options.play_sounds = self.toggles.sound.is_on
+        self.board.show_highlights = self.options.show_highlights = self.toggles.highlight.is_on
+        self.options.lang = "en" if self.toggles.english.is_on else "pl"
+        # Updates options.dat with the new settings.
+        try:
+            with self.get_options_file().open("wb") as out_file:
+                pickle.dump(self.options, out_file)
+        except (OSError, pickle.PicklingError):
+            pass
+        self.switch_state(self.GameStates.MAIN_MENU)
+
+    def cancel_settings(self) -> None:
+        """Goes back to the main menu without saving the changes made to Settings; Resets the switches."""
+        self.toggles.sound.is_on = self.options.play_sounds
+        self.toggles.highlight.is_on = self.options.play_sounds
+        self.switch_state(self.GameStates.MAIN_MENU)
+
+    def english_toggle_pressed(self) -> None:
+        """Radio button behavior: deactivates Polski if English has been activated."""
+        self.toggles.polski.is_on = False
+
+    def polski_toggle_pressed(self) -> None:
+        """Radio button behavior: deactivates English if Polski has been activated."""
+        self.toggles.english.is_on = False
+
+    def update_buttons(self, buttons: list, events) -> None:
+        """Updates the buttons or toggles, and collects the rects of the ones that were drawn."""
+        for button in buttons:
+            if self._redraw:
+                button.invalidate()
+            rect = button.update(events)
+            if rect is not None:
+                self._dirty_rects.append(rect)
+        self.profiler.mark("buttons")
+
+    def draw_background(self, background: pygame.Surface) -> None:
+        """On the first frame of a state, draws the background, and lets the whole display be updated."""
+        if self._redraw:
+            self.gfx.display.blit(background, (0, 0))
+            self._dirty_rects.append(self.gfx.display.get_rect())
+        self.profiler.mark("other")
+
+    def draw_labels(self, labels: list) -> None:
+        """
+        Draws the labels, given as (surface, position) pairs, in the column left of the board, unless they're the ones
+        drawn in the last frame. The labels of the last frame are covered with the background first.
+        """
+        if labels == self._drawn_labels and not self._redraw:
+            return
+        if not self._redraw:
+            for label, pos in self._drawn_labels:
+                rect = label.get_rect(topleft=pos)
+                self.gfx.display.blit(self.gfx.background, rect, rect)
+                self._dirty_rects.append(rect)
+        for label, pos in labels:
+            self._dirty_rects.append(self.gfx.display.blit(label, pos))
+        self._drawn_labels = labels
+
+    def move_count_label(self) -> pygame.Surface:
+        """Returns the move counter, rendered again only when the count changes."""
+        text = f"{langs.move[self.options.lang]} {self.board.move_count}"
+        if text != self._move_label_text:
+            self._move_label_text = text
+            self._move_label = self.gfx.small_font.render(text, False, "#DDDDDD")
+        return self._move_label
+
+    def main_menu(self, events) -> None:
+        """Runs when self.state is MAIN_MENU."""
+        self.draw_background(self.gfx.main_menu_bg)
+        self.update_buttons(self.buttons.main_menu_btns, events)
+
+    def layout_menu(self, events) -> None:
+        """Runs when self.state is LAYOUT_MENU."""
+        self.draw_background(self.gfx.layout_menu_bg)
+        self.update_buttons(self.buttons.layout_menu_btns, events)
+
+    def settings_menu(self, events) -> None:
+        """Runs when self.state is LAYOUT_MENU."""
+        self.draw_background(self.gfx.settings_menu_bg)
+        self.update_buttons([self.toggles.sound, self.toggles.highlight, self.toggles.english, self.toggles.polski],
+                            events)
+        self.update_buttons(self.buttons.settings_btns, events)
+
+    def really_quit(self, events) -> None:
+        """Runs when self.state is REALLY_QUIT. Pops up the "Really quit?" dialog window."""
+        if self._redraw:
+            self.dialog_windows.really_quit.update()
+            self._dirty_rects.append(self.gfx.display.get_rect())
+        self.profiler.mark("other")
+        self.update_buttons(self.buttons.really_quit_btns, events)
+
+    def really_reset(self, events) -> None:
+        """Runs when self.state is REALLY_RESET. Pops up the "Really reset?" dialog window."""
+        if self._redraw:
+            self.dialog_windows.really_reset.update()
+            self._dirty_rects.append(self.gfx.display.get_rect())
+        self.profiler.mark("other")
+        self.update_buttons(self.buttons.really_restart_btns, events)
+
+    def gameplay(self, events) -> None:
+        """Runs when self.state is GAME. Actual gameplay."""
+        if self._redraw:
+            self.board.invalidate()
+        self.draw_background(self.gfx.background)
+        # Updates the board - actual gameplay happens here.
+        self.board.process_input(events)
+        self.profiler.mark("process_input")
+        # Updates the move counter on the screen.
+        labels = [(self.move_count_label(), (16, 60))]
+        # Collects the background analysis result and, if the player asked for a hint, shows it.
+        self.hints.poll()
+        if self.show_hint:
+            labels.append(self.hint_label())
+        # Warns as soon as the last peg can no longer end up in the hole that was empty at the start.
+        if not self.board.target_hole_reachable:
+            label = self.gfx.target_unreachable_label
+            labels.append((label, ((self.gfx.BOARD_POS[0] - label.get_width()) // 2, 128)))
+        # Draws labels on the screen if the game is lost or won.
+        if self.board.is_victorious:
+            labels.append((self.gfx.victory_label, ({"en": 19, "pl": 20}[self.options.lang], 150)))
+        elif self.board.is_defeated:
+            labels.append((self.gfx.defeat_label, ({"en": 15, "pl": 21}[self.options.lang], 150)))
+        self.draw_labels(labels)
+        self.profiler.mark("other")
+        self._dirty_rects += self.board.draw_board()
+        self.profiler.mark("draw_board")
+        self.update_buttons(self.buttons.in_game_btns, events)
+
+    def hint_label(self) -> tuple[pygame.Surface, tuple[int, int]]:
+        """
+        Shows whether the position can still be won and highlights the best jump. While the analysis is running,
+        highlights the most promising jump found by random playouts instead, once the playouts (which run in the
+        background) are done. Never waits for either. Returns the label to show, and where.
+        """
+        hint = self.hints.get_hint(self.board.engine.layout, self.board.engine.position)
+        if hint is None:
+            label = self.gfx.hint_thinking_label
+            estimate = self.hints.get_estimate(self.board.engine.layout, self.board.engine.position)
+            if estimate is not None:
+                self.board.show_hint(estimate.jump)
+                # A playout that ended with a single peg proves that the position can be won.
+                if estimate.win_probability > 0:
+                    label = self.gfx.hint_solvable_label
+        elif hint.winnable:
+            label = self.gfx.hint_solvable_label
+            if hint.best_jump is not None:
+                self.board.show_hint(hint.best_jump)
+        else:
+            label = self.gfx.hint_unsolvable_label
+        return label, ((self.gfx.BOARD_POS[0] - label.get_width()) // 2, 106)
+
+    def update_screen(self) -> None:
+        """
+        Scales the changed parts of "display" up onto "screen" and updates just those parts of the screen; on the first
+        frame of a state, all of it. Does nothing if nothing changed.
+        """
+        if self._redraw:
+            screen_rects = self.gfx.upscale()
+        elif self._dirty_rects:
+            screen_rects = self.gfx.upscale(merge_rects(self._dirty_rects))
+        else:
+            return
+        self.profiler.mark("upscale")
+        pygame.display.update(screen_rects)
+        self.profiler.mark("display_update")
+
+    def game_loop(self) -> None:
+        """Main gameplay loop. Calls the relevant method depending on the game state."""
+        while True:
+            # The profiler is looked up once per frame, since F3 may swap it.
+            profiler = self.profiler
+            profiler.start_frame(self.state.name)
+            self._redraw, self._redraw_all = self._redraw_all, False
+            self._dirty_rects = []
+            # Collects events.
+            events = pygame.event.get()
+            for event in events:
+                if event.type == pygame.QUIT:
+                    self.quit_game()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.toggle_hud()
+            profiler.mark("events")
+            # Calls the method assigned to the current game state and passes events to it.
+            if self.state in self.GameStates:
+                game_state_method = self.game_state_methods[self.state]
+                game_state_method(events)
+            # Draws the performance overlay on top of everything else.
+            hud_rect = self.hud.draw(self._redraw, self._dirty_rects)
+            if hud_rect is not None:
+                self._dirty_rects.append(hud_rect)
+            profiler.mark("other")
+            # Scales the changed parts of "display" up onto "screen" and redraws them.
+            self.update_screen()
+            # Updates the clock.
+            self.clock.tick(self.gfx.FPS)
+            profiler.mark("idle")
+            profiler.end_frame()
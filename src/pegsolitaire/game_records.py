@@ -0,0 +1,257 @@
+import argparse
+import os
+import sys
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
+from . import layouts
+from .compiled_layout import CompiledLayout, compile_layout, layout_id
+from .solvability_db import SolvabilityDatabase
+from .solver import Solver
+
+# Marks the start of every record; the digit is bumped whenever the format changes.
+RECORD_MAGIC = "PSR2"
+# Array type codes for each number of bytes per coordinate.
+_TYPECODES = {1: "B", 2: "H", 4: "L"}
+# Records sent to the worker processes at a time, per worker, so that only a bounded part of the file is ever in memory.
+_RECORDS_IN_FLIGHT = 16
+
+# Solvers of the worker processes, by layout key.
+_solvers = {}
+
+
+class GameRecord(NamedTuple):
+    """
+    A played game: the id of the layout it was played on (see compiled_layout.layout_id()), its starting hole and the
+    moves made, each as the coordinates of the hole the peg jumped from and of the hole it landed in. Nothing in a
+    record depends on how layouts are compiled, so records stay readable when the compiled form changes.
+    """
+    layout_id: str
+    start: tuple
+    moves: tuple
+    # For puzzles, the pegs the game started with, as a bit mask of the layout's holes in sorted order (the lowest bit
+    # for the first hole); None for games from the layout's starting position.
+    start_pegs: int = None
+
+
+class GameStats(NamedTuple):
+    """What the analyser found out about a game."""
+    record: GameRecord
+    moves: int
+    pegs_left: int
+    # Number of the first move after which the game could no longer be won, counting from 1; 0 if it couldn't be won
+    # from the start, and None if it never became lost.
+    first_losing_move: int = None
+    # A move that would have kept the game winnable instead of the first losing move, as the coordinates of the holes
+    # it jumps from and to.
+    better_move: tuple = None
+    # False if the layout of the game isn't known, or a move isn't one of its jumps, so the game couldn't be analysed.
+    analysed: bool = True
+
+
+def _number_width(count: int) -> int:
+    """Returns the number of bytes needed to store any number below count."""
+    return 1 if count <= 0x100 else 2 if count <= 0x10000 else 4
+
+
+def make_record(layout: CompiledLayout, jumps, start_position: int = None) -> GameRecord:
+    """
+    Returns the record of a game played on a compiled layout, given the jump numbers of its moves and, for puzzles,
+    the position it started from.
+    """
+    holes = layout.holes
+    moves = tuple((holes[layout.jumps[jump][0]], holes[layout.jumps[jump][2]]) for jump in jumps)
+    start_pegs = None
+    if start_position is not None:
+        start_pegs = sum(1 << index for index, hole in enumerate(sorted(holes))
+                         if start_position >> layout.hole_index[hole] & 1)
+    start = holes[layout.start]
+    return GameRecord(layout_id({"holes": holes, "start": start}), start, moves, start_pegs)
+
+
+def encode_record(record: GameRecord) -> bytes:
+    """
+    Returns a record as bytes: a line of text with the record marker, the layout id, the starting hole, the number of
+    moves, the bytes per coordinate and, for puzzles, the starting pegs in hexadecimal, followed by the packed moves,
+    little-endian: for each move, the x and y of the hole jumped from, then those of the hole landed in.
+    """
+    coords = [value for move in record.moves for hole in move for value in hole]
+    width = _number_width(max(coords, default=0) + 1)
+    packed = array(_TYPECODES[width], coords)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    x, y = record.start
+    puzzle = f" {record.start_pegs:x}" if record.start_pegs is not None else ""
+    header = f"{RECORD_MAGIC} {record.layout_id} {x},{y} {len(record.moves)} {width}{puzzle}\n"
+    return header.encode("ascii") + packed.tobytes()
+
+
+class GameRecordWriter:
+    """
+    Appends game records to a file. The file is only ever appended to, and each record is written with a single write,
+    so records written earlier are never touched, and several games can record to the same file.
+    """
+    def __init__(self, path: Path):
+        """
+        :param path: Path of the records file; it is created if it doesn't exist.
+        """
+        self.path = Path(path)
+
+    def write(self, record: GameRecord) -> None:
+        """Appends a record to the file."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = encode_record(record)
+        file_descriptor = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(file_descriptor, data)
+        finally:
+            os.close(file_descriptor)
+
+
+def read_records(path: Path):
+    """
+    Yields the records of a file one at a time, reading only as much of it as needed for each. A record cut short at
+    the end of the file (because it was still being written, for example) is left out.
+    """
+    with Path(path).open("rb") as in_file:
+        while True:
+            header = in_file.readline()
+            if not header.endswith(b"\n"):
+                return
+            magic, key, start, move_count, width, *puzzle = header.decode("ascii").split()
+            if magic != RECORD_MAGIC:
+                raise ValueError(f"not a game record: {header!r}")
+            move_count, width = int(move_count), int(width)
+            data = in_file.read(move_count * 4 * width)
+            if len(data) < move_count * 4 * width:
+                return
+            coords = array(_TYPECODES[width])
+            coords.frombytes(data)
+            if sys.byteorder == "big":
+                coords.byteswap()
+            moves = tuple(((coords[index], coords[index + 1]), (coords[index + 2], coords[index + 3]))
+                          for index in range(0, len(coords), 4))
+            yield GameRecord(key, tuple(map(int, start.split(","))), moves, int(puzzle[0], 16) if puzzle else None)
+
+
+def find_layout(record: GameRecord, known_layouts=layouts.layouts):
+    """
+    Returns the layout the game was played on, with its starting hole, or None if it isn't one of the known layouts.
+    Games that started from a different hole of one of the known layouts are found as well.
+    """
+    for layout in known_layouts:
+        layout = dict(layout, start=record.start)
+        if layout_id(layout) == record.layout_id:
+            return layout
+    return None
+
+
+def _replay(layout: CompiledLayout, record: GameRecord) -> Optional[list]:
+    """
+    Returns the positions of a game on the compiled layout, from the start to after the last move, or None if one of
+    its moves isn't a jump of the layout.
+    """
+    if record.start_pegs is None:
+        position = layout.start_position
+    else:
+        position = sum(1 << layout.hole_index[hole] for index, hole in enumerate(sorted(layout.holes))
+                       if record.start_pegs >> index & 1)
+    jump_numbers = {(layout.holes[src], layout.holes[to]): jump for jump, (src, _, to) in enumerate(layout.jumps)}
+    positions = [position]
+    for move in record.moves:
+        jump = jump_numbers.get(move)
+        if jump is None:
+            return None
+        positions.append(positions[-1] ^ layout.jump_masks[jump])
+    return positions
+
+
+def _solver(layout: dict) -> Solver:
+    """Returns the worker process's solver for the layout, aiming for a single peg in any hole."""
+    compiled = compile_layout(layout)
+    if compiled.key not in _solvers:
+        _solvers[compiled.key] = Solver(compiled, database=SolvabilityDatabase(compiled))
+    return _solvers[compiled.key]
+
+
+def analyse_record(record: GameRecord) -> GameStats:
+    """
+    Replays a game and finds the first move that made it impossible to win, along with a jump that would have kept it
+    winnable instead. Once a game can't be won, nothing can make it winnable again, so the first losing move is found
+    with a binary search over the positions of the game, solving only a few of them.
+    """
+    moves = len(record.moves)
+    layout = find_layout(record)
+    if layout is None:
+        return GameStats(record, moves, 0, analysed=False)
+    solver = _solver(layout)
+    compiled = solver.layout
+    positions = _replay(compiled, record)
+    if positions is None:
+        return GameStats(record, moves, 0, analysed=False)
+    pegs_left = bin(positions[-1]).count("1")
+    # Won games, and unfinished games that can still be won, were never lost.
+    if pegs_left == 1 or solver.solve(positions[-1]) is not None:
+        return GameStats(record, moves, pegs_left)
+    if solver.solve(positions[0]) is None:
+        return GameStats(record, moves, pegs_left, first_losing_move=0)
+    # The position after move low can be won, and the one after move high can't.
+    low, high = 0, moves
+    while high - low > 1:
+        middle = (low + high) // 2
+        if solver.solve(positions[middle]) is None:
+            high = middle
+        else:
+            low = middle
+    src, _, to = compiled.jumps[solver.solve(positions[low])[0]]
+    return GameStats(record, moves, pegs_left, first_losing_move=high,
+                     better_move=(compiled.holes[src], compiled.holes[to]))
+
+
+def analyse_records(records, workers: int = None):
+    """
+    Analyses records in a pool of worker processes and yields their GameStats, in the order of the records. Records
+    are handed out a few at a time, so the records can be streamed from a file of any size.
+    """
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for record in records:
+            in_flight.append(executor.submit(analyse_record, record))
+            if len(in_flight) >= workers * _RECORDS_IN_FLIGHT:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Analyses recorded games: for each game, finds the first move after which it could no longer be "
+                    "won, and a jump that would have kept it winnable.")
+    parser.add_argument("file", type=Path, help="File of game records, such as the one the game keeps.")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Number of worker processes; by default, the number of CPUs.")
+    args = parser.parse_args()
+    games = won = lost_from_start = 0
+    for index, stats in enumerate(analyse_records(read_records(args.file), args.workers)):
+        games += 1
+        won += stats.pegs_left == 1
+        if not stats.analysed:
+            print(f"Game {index}: {stats.moves} moves, not analysed: unknown layout {stats.record.layout_id} or "
+                  f"a move that isn't one of its jumps")
+        elif stats.first_losing_move is None:
+            print(f"Game {index}: {stats.moves} moves, {stats.pegs_left} pegs left, never lost")
+        elif stats.first_losing_move == 0:
+            lost_from_start += 1
+            print(f"Game {index}: {stats.moves} moves, {stats.pegs_left} pegs left, can't be won from the start")
+        else:
+            better = f"{stats.better_move[0]} -> {stats.better_move[1]}"
+            print(f"Game {index}: {stats.moves} moves, {stats.pegs_left} pegs left, lost at move "
+                  f"{stats.first_losing_move}; {better} would have kept it winnable")
+    print(f"Games: {games}, won: {won}, unwinnable from the start: {lost_from_start}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import pygame
 from . import languages as langs
+from .animation_frames import AnimationFrameCache
 from .asset_loader import load_image, load_font
 from .create_surface import create_simple_surface
 
@@ -9,10 +10,11 @@ class Graphics:
     pygame.init()
     # Game running speed.
     FPS = 60
-    # Dimensions of board_surface.
+    # Dimensions of the area the board is drawn in. Boards of up to 9x9 tiles fit in it as they are; larger boards are
+    # drawn with smaller tiles.
     BOARD_DIMENSIONS = (216, 216)
-    # The position of the upper left corner of the board, relative to the target surface.
-    # In practical terms, the position of board_surface on the "display" surface.
+    # The position of the upper left corner of the board area, relative to the target surface.
+    # In practical terms, the position of the board area on the "display" surface.
     BOARD_POS = (92, 12)
     # Effective resolution of the display.
     # Before blitting on screen, display will be scaled up by RES_MULTI.
@@ -23,20 +25,46 @@ class Graphics:
     TEXT_RED = "#11FF11"
     TEXT_GREEN = "#FF1916"
 
-    def __init__(self, lang, res_multi):
-        """Loads the graphics and initializes the graphics variables."""
+    def __init__(self, lang, res_multi, sdl_scaling=False):
+        """
+        Loads the graphics and initializes the graphics variables.
+
+        Everything is drawn on "display", at the game's own resolution, and scaled up onto "screen" by upscale(). With
+        sdl_scaling, SDL's SCALED mode is used instead, where it's available: the window is sized by SDL, which scales
+        it up itself (on the GPU, if there is one), and "display" is the screen. To the rest of the game, the scaling
+        factor is then 1, as the mouse coordinates SDL reports are already in the display's terms.
+        """
         # Display variables
+        self.sdl_scaling = False
+        if sdl_scaling:
+            try:
+                self.screen = pygame.display.set_mode((self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT), pygame.SCALED)
+                self.sdl_scaling = True
+                res_multi = 1
+            except pygame.error:
+                pass
         self.scaling_factor = res_multi
         self.screen_res = (self.DISPLAY_WIDTH * self.scaling_factor, self.DISPLAY_HEIGHT * self.scaling_factor)
-        self.screen = pygame.display.set_mode(self.screen_res)
-        self.display = pygame.Surface((self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT))
-        self.board_surface = pygame.Surface(self.BOARD_DIMENSIONS)
+        if not self.sdl_scaling:
+            self.screen = pygame.display.set_mode(self.screen_res)
+        # Unscaled, the screen itself is drawn on, and there's nothing to scale up.
+        if self.scaling_factor == 1:
+            self.display = self.screen
+        else:
+            self.display = pygame.Surface((self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT))
         pygame.display.set_caption("Peg Solitaire")
-        pygame.display.set_icon(load_image("Graphics/icon-32.png", convert_alpha=True))
+        # The window icon is optional: Graphics/icon-32.png isn't among the assets in this repository, so the game
+        # starts without an icon when the file is missing or can't be loaded.
+        try:
+            pygame.display.set_icon(load_image("Graphics/icon-32.png", convert_alpha=True))
+        except (OSError, pygame.error):
+            pass
         
         # Fonts
         self.large_font = load_font("Graphics/Retron2000.ttf", 27)
         self.small_font = load_font("Graphics/superstar_memesbruh03.ttf", 16)
+        # pygame's own font, which stays readable at the small size the performance overlay needs.
+        self.hud_font = pygame.font.Font(None, 12)
 
         # Game tiles
         self.tile_smooth = load_image("Graphics/tile_smooth.png")
@@ -44,6 +72,9 @@ class Graphics:
         self.peg = load_image("Graphics/peg.png", convert_alpha=True)
         self.highlight = load_image("Graphics/highlight.png", convert_alpha=True)
         self.highlight_full = load_image("Graphics/highlight_full.png", convert_alpha=True)
+        # Pre-rendered animation frames, shared by everything that plays them; the peg's fade out is rendered up front.
+        self.animation_frames = AnimationFrameCache()
+        self.peg_fade_frames = self.animation_frames.fade_frames(self.peg)
         
         # Game background
         self.background = load_image("Graphics/background.png")
@@ -58,6 +89,7 @@ class Graphics:
         self.main_menu_btn = create_simple_surface(200, 30)
         self.back_btn = create_simple_surface(130, 20)
         self.layout_menu_btn = create_simple_surface(160, 20)
+        self.puzzle_btn = create_simple_surface(48, 20)
         self.settings_menu_btn = create_simple_surface(80, 20)
         self.in_game_btn = create_simple_surface(68, 20)
 
@@ -90,6 +122,10 @@ class Graphics:
         self.choose_lt_label = self.large_font.render(langs.choose_layout[lang], False, self.TEXT_WHITE)
         self.victory_label = self.small_font.render(langs.victory[lang], False, self.TEXT_RED)
         self.defeat_label = self.small_font.render(langs.defeat[lang], False, self.TEXT_GREEN)
+        self.hint_thinking_label = self.small_font.render(langs.hint_thinking[lang], False, self.TEXT_WHITE)
+        self.hint_solvable_label = self.small_font.render(langs.hint_solvable[lang], False, self.TEXT_RED)
+        self.hint_unsolvable_label = self.small_font.render(langs.hint_unsolvable[lang], False, self.TEXT_GREEN)
+        self.target_unreachable_label = self.small_font.render(langs.target_unreachable[lang], False, self.TEXT_GREEN)
         self.settings_label = self.large_font.render(langs.settings[lang], False, self.TEXT_WHITE)
         self.sound_toggle_label = self.small_font.render(langs.sound_toggle[lang], False, self.TEXT_WHITE)
         self.highlight_toggle_label = self.small_font.render(langs.highlight_toggle[lang], False, self.TEXT_WHITE)
@@ -120,3 +156,26 @@ class Graphics:
         self.settings_menu_bg.blit(self.language_toggle_label, (38, 130))
         self.settings_menu_bg.blit(self.rest_req_label,
                                    ((self.DISPLAY_WIDTH - self.rest_req_label.get_width()) // 2, 154))
+
+    def upscale(self, rects: list = None) -> list:
+        """
+        Scales the given rects of "display" (all of it, if None) up onto "screen", and returns the rects of the screen
+        that changed, to be passed to pygame.display.update(). The display is scaled straight into the screen surface,
+        so no surface is made on the way. If the display is the screen (unscaled or scaled by SDL), returns the rects.
+        """
+        if self.display is self.screen:
+            return [self.screen.get_rect()] if rects is None else rects
+        if rects is None:
+            pygame.transform.scale(self.display, self.screen_res, self.screen)
+            return [self.screen.get_rect()]
+        multi = self.scaling_factor
+        display_rect = self.display.get_rect()
+        screen_rects = []
+        for rect in rects:
+            rect = rect.clip(display_rect)
+            if not rect:
+                continue
+            screen_rect = pygame.Rect(rect.x * multi, rect.y * multi, rect.width * multi, rect.height * multi)
+            pygame.transform.scale(self.display.subsurface(rect), screen_rect.size, self.screen.subsurface(screen_rect))
+            screen_rects.append(screen_rect)
+        return screen_rects
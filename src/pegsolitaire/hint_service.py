@@ -0,0 +1,193 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+from .compiled_layout import CompiledLayout
+from .monte_carlo import DEFAULT_TIME_BUDGET, MoveScore, rank_moves
+from .rules_engine import RulesEngine
+from .solvability_db import SolvabilityDatabase
+from .solver import SearchCancelled, Solver
+
+# State of the worker process, set up by _init_worker().
+_worker = {}
+
+
+class Hint(NamedTuple):
+    """The answer to a hint request: whether the position can still be won, and the jump to make if it can."""
+    winnable: bool
+    best_jump: Optional[int]
+
+
+class _Cancellation:
+    """Stop event for the worker's solver: set as soon as the main process starts a newer request."""
+    def __init__(self, generation_counter):
+        self._counter = generation_counter
+        self.generation = 0
+
+    def is_set(self) -> bool:
+        return self._counter.value != self.generation
+
+
+def _init_worker(generation_counter) -> None:
+    """Sets up the worker process."""
+    _worker["cancellation"] = _Cancellation(generation_counter)
+    # One solver per layout and target, so that dead positions are remembered between requests (and, through the
+    # solvability database, between games).
+    _worker["solvers"] = {}
+
+
+def _estimate(layout: CompiledLayout, target, position: int, time_budget: float) -> Optional[MoveScore]:
+    """
+    Runs in the estimate worker process. Returns the most promising jump in the position according to random
+    playouts, or None if there is no legal jump.
+    """
+    if target is not None:
+        # The playouts count any single peg as a win, so they can't tell a win in the target hole apart.
+        scores = [score._replace(win_probability=0.0) for score in rank_moves(layout, position, time_budget)]
+        scores.sort(key=lambda score: score.expected_pegs)
+    else:
+        scores = rank_moves(layout, position, time_budget)
+    return scores[0] if scores else None
+
+
+def _find_solution(layout: CompiledLayout, target, position: int, generation: int):
+    """Runs in the worker process. Returns a solution, None if there is none, or False if the request was cancelled."""
+    cancellation = _worker["cancellation"]
+    cancellation.generation = generation
+    if cancellation.is_set():
+        return False
+    solver = _worker["solvers"].get((layout.key, target))
+    if solver is None:
+        solver = _worker["solvers"][(layout.key, target)] = Solver(layout, target, stop_event=cancellation,
+                                                                    database=SolvabilityDatabase(layout, target))
+    try:
+        return solver.solve(position)
+    except SearchCancelled:
+        return False
+
+
+class HintService:
+    """
+    Answers "what is the best next move" and "can this position still be won" without blocking the game loop.
+
+    The solver runs in a separate worker process. Each new request cancels the search that is still running, and
+    every answer is cached per position, so going back to a position that has already been analysed (for example,
+    after undoing a move) gives an answer straight away. While the exact answer isn't known, a quick estimate from
+    random playouts can stand in for it; the playouts run in a second worker process, so that they neither wait for
+    the solver nor hold up the game loop.
+    """
+    def __init__(self, target=None, estimate_time_budget: float = DEFAULT_TIME_BUDGET):
+        """
+        :param target: Number of the hole the last peg must end up in; if None, it can end up in any hole.
+        :param estimate_time_budget: Time to spend on random playouts for an estimate, in seconds.
+        """
+        self._target = target
+        self._estimate_time_budget = estimate_time_budget
+        self._hints = {}
+        self._estimates = {}
+        self._context = multiprocessing.get_context()
+        self._generation = self._context.Value("i", 0, lock=False)
+        self._executor = None
+        self._job = None
+        self._job_layout = None
+        self._job_position = None
+        self._estimate_executor = None
+        # Estimates being worked out, by (layout key, position).
+        self._estimate_jobs = {}
+        # Worker pools that close() has started stopping, for join() to wait for.
+        self._closing_executors = []
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Starts the worker process the first time it is needed."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=self._context,
+                                                 initializer=_init_worker, initargs=(self._generation,))
+        return self._executor
+
+    def request(self, layout: CompiledLayout, position: int) -> None:
+        """Starts analysing the given position, unless it has been analysed already. Cancels any older request."""
+        if (layout, position) == (self._job_layout, self._job_position):
+            return
+        # Keeps the result of a search that has just finished, rather than cancelling it.
+        self.poll()
+        # Cancels the running search, which is for another position, even if this one's hint is already known, so
+        # that the worker is free for the next request; the worker notices within a few thousand positions.
+        if self._job is not None:
+            self._generation.value += 1
+            self._job = self._job_layout = self._job_position = None
+        if (layout.key, position) in self._hints:
+            return
+        engine = RulesEngine(layout)
+        engine.set_position(position)
+        if not engine.has_legal_jump():
+            won = engine.peg_count == 1 and (self._target is None or position == 1 << self._target)
+            self._hints[(layout.key, position)] = Hint(won, None)
+            return
+        # The position's class can rule out a win straight away, without any search.
+        if not (engine.can_finish_in(self._target) if self._target is not None else layout.possible_targets(position)):
+            self._hints[(layout.key, position)] = Hint(False, None)
+            return
+        self._job = self._get_executor().submit(_find_solution, layout, self._target, position, self._generation.value)
+        self._job_layout, self._job_position = layout, position
+
+    def poll(self) -> None:
+        """Collects the results of the running request and of the estimates, if they have finished. Never blocks."""
+        for key, job in list(self._estimate_jobs.items()):
+            if job.done():
+                del self._estimate_jobs[key]
+                if not job.cancelled():
+                    self._estimates[key] = job.result()
+        if self._job is None or not self._job.done():
+            return
+        solution = self._job.result()
+        layout, position = self._job_layout, self._job_position
+        self._job = self._job_layout = self._job_position = None
+        if solution is None:
+            self._hints[(layout.key, position)] = Hint(False, None)
+        elif solution is not False:
+            # Every position along the solution can be won too, by continuing with the same jumps.
+            for jump in solution:
+                self._hints[(layout.key, position)] = Hint(True, jump)
+                position ^= layout.jump_masks[jump]
+
+    def get_hint(self, layout: CompiledLayout, position: int) -> Optional[Hint]:
+        """Returns the hint for the given position, or None if it isn't known yet."""
+        return self._hints.get((layout.key, position))
+
+    def get_estimate(self, layout: CompiledLayout, position: int) -> Optional[MoveScore]:
+        """
+        Returns the most promising jump in the given position according to random playouts, or None if it isn't known
+        yet or there is no legal jump. The first time a position is asked about, starts the playouts in the estimate
+        worker process, within a fixed time budget; poll() collects the result. Never blocks. Only meant to be used
+        until the exact hint is known.
+        """
+        key = (layout.key, position)
+        if key in self._estimates:
+            return self._estimates[key]
+        if key not in self._estimate_jobs:
+            # Estimates for other positions that haven't started yet are no longer needed.
+            for job in self._estimate_jobs.values():
+                job.cancel()
+            if self._estimate_executor is None:
+                self._estimate_executor = ProcessPoolExecutor(max_workers=1, mp_context=self._context)
+            self._estimate_jobs[key] = self._estimate_executor.submit(_estimate, layout, self._target, position,
+                                                                      self._estimate_time_budget)
+        return None
+
+    def close(self) -> None:
+        """Cancels the running request and starts stopping the worker processes, without waiting for them."""
+        self._generation.value += 1
+        for executor in (self._executor, self._estimate_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._closing_executors.append(executor)
+        self._executor = self._estimate_executor = None
+
+    def join(self) -> None:
+        """
+        Waits for the worker processes that close() is stopping; they stop as soon as they see the cancellation.
+        Exiting without calling it waits for them as well, but on Python 3.11 the worker pools' own exit handler can
+        then race their shutdown, and fail with "Bad file descriptor".
+        """
+        for executor in self._closing_executors:
+            executor.shutdown(wait=True)
+        self._closing_executors = []
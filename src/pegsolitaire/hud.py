@@ -0,0 +1,111 @@
+import pygame
+from typing import Optional
+from .profiler import PHASES, FrameProfiler
+
+# The text is rendered again after every this many frames, so that the overlay itself costs little and stays readable.
+REFRESH_INTERVAL = 15
+# Opacity of the overlay's background, so that what's under it can still be seen.
+BACKGROUND_ALPHA = 160
+# Labels of the phases in the overlay.
+PHASE_LABELS = {
+    "events": "events",
+    "process_input": "input",
+    "draw_board": "board",
+    "buttons": "buttons",
+    "other": "other",
+    "upscale": "upscale",
+    "display_update": "update",
+    "idle": "idle",
+}
+
+
+class PerformanceHud:
+    """
+    An overlay that shows the frame rate, frame time percentiles and the average time of each phase of a frame, as
+    measured by its FrameProfiler. Drawn in the top right corner of the target surface, on a see-through background,
+    so that it hides none of the buttons and the board can still be seen under it.
+
+    The overlay keeps a copy of what it covers, as drawn without it, and puts that back before drawing itself again, so
+    it never blends over itself. It is only drawn again when its text changes or something was drawn under it, and
+    never gets smaller.
+    """
+    def __init__(self,
+                 surface: pygame.surface.Surface,
+                 font: pygame.font.Font,
+                 clock: pygame.time.Clock):
+        """
+        :param surface: The surface the overlay will be drawn on.
+        :param font: Font used to render the text.
+        :param clock: The game's clock, which measures the frame rate.
+        """
+        self._surface = surface
+        self._font = font
+        self._clock = clock
+        self.profiler = FrameProfiler()
+        self.is_on = False
+        self._panel = None
+        self._panel_size = (0, 0)
+        self._frames_until_refresh = 0
+        # The rect the overlay was last drawn in, and what the target surface has in it without the overlay.
+        self._rect = None
+        self._covered = None
+
+    def toggle(self) -> None:
+        """Shows the overlay if it's hidden, and hides it otherwise. Timing starts over when it's shown."""
+        self.is_on = not self.is_on
+        if self.is_on:
+            self.profiler.reset()
+            self._frames_until_refresh = 0
+            self._panel_size = (0, 0)
+            self._rect = self._covered = None
+
+    def _render_panel(self) -> pygame.Surface:
+        """Returns a surface with the current measurements, on a dark, see-through background."""
+        lines = [
+            f"FPS {self._clock.get_fps():.1f}",
+            f"frame p50 {self.profiler.percentile(0.5) * 1000:.1f} ms",
+            f"p95 {self.profiler.percentile(0.95) * 1000:.1f} p99 {self.profiler.percentile(0.99) * 1000:.1f}",
+        ]
+        lines += [f"{PHASE_LABELS[phase]} {self.profiler.phase_average(phase) * 1000:.2f} ms" for phase in PHASES]
+        rendered = [self._font.render(line, False, "#EEEEEE") for line in lines]
+        line_height = self._font.get_linesize()
+        self._panel_size = (max(self._panel_size[0], max(line.get_width() for line in rendered) + 4),
+                            max(self._panel_size[1], len(rendered) * line_height + 2))
+        panel = pygame.Surface(self._panel_size, pygame.SRCALPHA)
+        panel.fill((16, 16, 16, BACKGROUND_ALPHA))
+        for number, line in enumerate(rendered):
+            panel.blit(line, (2, 1 + number * line_height))
+        return panel
+
+    def draw(self, redraw: bool = True, dirty_rects: list = ()) -> Optional[pygame.Rect]:
+        """
+        Draws the overlay, if it's shown, rendering the text again every REFRESH_INTERVAL frames. Unless told to redraw
+        it, it's only drawn when its text changed, or when one of the dirty rects (the parts of the target surface drawn
+        on during the frame) overlaps it. Returns the rect it was drawn in, if it was.
+        """
+        if not self.is_on:
+            return None
+        self._frames_until_refresh -= 1
+        if self._frames_until_refresh <= 0:
+            self._panel = self._render_panel()
+            self._frames_until_refresh = REFRESH_INTERVAL
+            redraw = True
+        if self._rect is not None:
+            # What was drawn under the overlay during the frame is what it covers now.
+            for dirty_rect in dirty_rects:
+                covered_rect = self._rect.clip(dirty_rect)
+                if covered_rect:
+                    self._covered.blit(self._surface, covered_rect.move(-self._rect.x, -self._rect.y), covered_rect)
+                    redraw = True
+        rect = self._panel.get_rect(topright=(self._surface.get_width(), 0))
+        if rect != self._rect:
+            # The overlay is new or has grown: puts back what it covered, and copies what the whole new area has.
+            if self._covered is not None:
+                self._surface.blit(self._covered, self._rect)
+            self._covered = self._surface.subsurface(rect).copy()
+            self._rect = rect
+            redraw = True
+        if not redraw:
+            return None
+        self._surface.blit(self._covered, rect)
+        return self._surface.blit(self._panel, rect)
@@ -4,6 +4,9 @@ layout_german = {"en": "German", "pl": "Niemiecki"}
 layout_french = {"en": "French", "pl": "Francuski"}
 layout_diamond = {"en": "Diamond", "pl": "Diament"}
 layout_asymmetrical = {"en": "Asymmetrical", "pl": "Asymetryczny"}
+puzzle_easy = {"en": "Easy", "pl": "Łatwy"}
+puzzle_medium = {"en": "Medium", "pl": "Średni"}
+puzzle_hard = {"en": "Hard", "pl": "Trudny"}
 
 # Main menu
 play = {"en": "PLAY", "pl": "GRAJ"}
@@ -32,13 +35,19 @@ restart_required = {"en": "(Requires restart)", "pl": "(Wymaga ponownego uruchom
 
 # In-game buttons
 undo = {"en": "Undo", "pl": "Cofnij"}
+redo = {"en": "Redo", "pl": "Ponów"}
 restart = {"en": "Restart", "pl": "Od nowa"}
 exit_game = {"en": "Exit", "pl": "Zakończ"}
+hint = {"en": "Hint", "pl": "Rada"}
 
 # In-game labels
 move = {"en": "Move: ", "pl": "Ruch: "}
 victory = {"en": "You win!", "pl": "Sukces!"}
 defeat = {"en": "You lose!", "pl": "Fiasko!"}
+hint_thinking = {"en": "Thinking...", "pl": "Myślę..."}
+hint_solvable = {"en": "Solvable", "pl": "Do wygrania"}
+hint_unsolvable = {"en": "Unsolvable", "pl": "Bez szans"}
+target_unreachable = {"en": "Target lost", "pl": "Cel stracony"}
 
 # Dialog window text
 really_quit = {"en": "Really quit?", "pl": "Zakończyć grę?"}
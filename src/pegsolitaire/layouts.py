@@ -1,76 +1,112 @@
-# Each layout is a dictionary containing two items. "layout" is a 2d list,
-# where "0" means a smooth tile and "1" means a tile with a hole, where a peg can be placed.
-# "start" contains coordinates of the holed tile that is empty (no peg) when the game starts.
+# Each layout is a dictionary containing three items. "size" is the (width, height) of the board, in tiles.
+# "holes" lists the (x, y) coordinates of the tiles with a hole, where a peg can be placed; all other tiles are smooth.
+# "start" contains coordinates of the hole that is empty (no peg) when the game starts.
+# Only the holes are stored, so the size of a layout is only limited by the size of its board.
 
 layouts = (
     {
-        "layout": (
-            (0, 0, 0, 0, 0, 0, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 1, 1, 1, 1, 1, 1, 1, 0),
-            (0, 1, 1, 1, 1, 1, 1, 1, 0),
-            (0, 1, 1, 1, 1, 1, 1, 1, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 0, 0, 0, 0, 0, 0, 0)
+        "size": (9, 9),
+        "holes": (
+            (1, 3), (1, 4), (1, 5),
+            (2, 3), (2, 4), (2, 5),
+            (3, 1), (3, 2), (3, 3), (3, 4), (3, 5), (3, 6), (3, 7),
+            (4, 1), (4, 2), (4, 3), (4, 4), (4, 5), (4, 6), (4, 7),
+            (5, 1), (5, 2), (5, 3), (5, 4), (5, 5), (5, 6), (5, 7),
+            (6, 3), (6, 4), (6, 5),
+            (7, 3), (7, 4), (7, 5),
         ),
         "start": (4, 4)
     },
     {
-        "layout": (
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (1, 1, 1, 1, 1, 1, 1, 1, 1),
-            (1, 1, 1, 1, 1, 1, 1, 1, 1),
-            (1, 1, 1, 1, 1, 1, 1, 1, 1),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0)
+        "size": (9, 9),
+        "holes": (
+            (0, 3), (0, 4), (0, 5),
+            (1, 3), (1, 4), (1, 5),
+            (2, 3), (2, 4), (2, 5),
+            (3, 0), (3, 1), (3, 2), (3, 3), (3, 4), (3, 5), (3, 6), (3, 7), (3, 8),
+            (4, 0), (4, 1), (4, 2), (4, 3), (4, 4), (4, 5), (4, 6), (4, 7), (4, 8),
+            (5, 0), (5, 1), (5, 2), (5, 3), (5, 4), (5, 5), (5, 6), (5, 7), (5, 8),
+            (6, 3), (6, 4), (6, 5),
+            (7, 3), (7, 4), (7, 5),
+            (8, 3), (8, 4), (8, 5),
         ),
         "start": (4, 4)
     },
     {
-        "layout": (
-            (0, 0, 0, 0, 0, 0, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 1, 1, 1, 1, 1, 0, 0),
-            (0, 1, 1, 1, 1, 1, 1, 1, 0),
-            (0, 1, 1, 1, 1, 1, 1, 1, 0),
-            (0, 1, 1, 1, 1, 1, 1, 1, 0),
-            (0, 0, 1, 1, 1, 1, 1, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 0, 0, 0, 0, 0, 0, 0)
+        "size": (9, 9),
+        "holes": (
+            (1, 3), (1, 4), (1, 5),
+            (2, 2), (2, 3), (2, 4), (2, 5), (2, 6),
+            (3, 1), (3, 2), (3, 3), (3, 4), (3, 5), (3, 6), (3, 7),
+            (4, 1), (4, 2), (4, 3), (4, 4), (4, 5), (4, 6), (4, 7),
+            (5, 1), (5, 2), (5, 3), (5, 4), (5, 5), (5, 6), (5, 7),
+            (6, 2), (6, 3), (6, 4), (6, 5), (6, 6),
+            (7, 3), (7, 4), (7, 5),
         ),
         "start": (4, 4)
     },
     {
-        "layout": (
-            (0, 0, 0, 0, 1, 0, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 1, 1, 1, 1, 1, 0, 0),
-            (0, 1, 1, 1, 1, 1, 1, 1, 0),
-            (1, 1, 1, 1, 1, 1, 1, 1, 1),
-            (0, 1, 1, 1, 1, 1, 1, 1, 0),
-            (0, 0, 1, 1, 1, 1, 1, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 0, 0, 1, 0, 0, 0, 0)
+        "size": (9, 9),
+        "holes": (
+            (0, 4),
+            (1, 3), (1, 4), (1, 5),
+            (2, 2), (2, 3), (2, 4), (2, 5), (2, 6),
+            (3, 1), (3, 2), (3, 3), (3, 4), (3, 5), (3, 6), (3, 7),
+            (4, 0), (4, 1), (4, 2), (4, 3), (4, 4), (4, 5), (4, 6), (4, 7), (4, 8),
+            (5, 1), (5, 2), (5, 3), (5, 4), (5, 5), (5, 6), (5, 7),
+            (6, 2), (6, 3), (6, 4), (6, 5), (6, 6),
+            (7, 3), (7, 4), (7, 5),
+            (8, 4),
         ),
         "start": (4, 4)
     },
     {
-        "layout": (
-            (0, 0, 0, 0, 0, 0, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (1, 1, 1, 1, 1, 1, 1, 1, 0),
-            (1, 1, 1, 1, 1, 1, 1, 1, 0),
-            (1, 1, 1, 1, 1, 1, 1, 1, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0),
-            (0, 0, 0, 1, 1, 1, 0, 0, 0)
+        "size": (9, 9),
+        "holes": (
+            (1, 3), (1, 4), (1, 5),
+            (2, 3), (2, 4), (2, 5),
+            (3, 0), (3, 1), (3, 2), (3, 3), (3, 4), (3, 5), (3, 6), (3, 7),
+            (4, 0), (4, 1), (4, 2), (4, 3), (4, 4), (4, 5), (4, 6), (4, 7),
+            (5, 0), (5, 1), (5, 2), (5, 3), (5, 4), (5, 5), (5, 6), (5, 7),
+            (6, 3), (6, 4), (6, 5),
+            (7, 3), (7, 4), (7, 5),
+            (8, 3), (8, 4), (8, 5),
         ),
         "start": (4, 4)
     }
 )
+
+
+def layout_size(layout: dict) -> tuple[int, int]:
+    """Returns the (width, height) of the layout's board, in tiles; if not given, just large enough for the holes."""
+    if "size" in layout:
+        return tuple(layout["size"])
+    return max(x for x, _ in layout["holes"]) + 1, max(y for _, y in layout["holes"]) + 1
+
+
+def layout_from_grid(grid, start: tuple[int, int]) -> dict:
+    """
+    Returns a layout made from a dense grid, indexed as grid[x][y], where 0 means a smooth tile and 1 means a tile
+    with a hole.
+    """
+    return {
+        "size": (len(grid), len(grid[0])),
+        "holes": tuple((x, y) for x in range(len(grid)) for y in range(len(grid[x])) if grid[x][y]),
+        "start": tuple(start)
+    }
+
+
+def cross_layout(size: int, arm_width: int) -> dict:
+    """
+    Returns a cross-shaped layout like the English board, but of any size, with the centre hole empty: a square board
+    with sides of size holes, with the corners cut off so that arms arm_width holes wide are left. Both must be odd.
+    Used to stress test the engine and solvers on large boards.
+    """
+    if size % 2 == 0 or arm_width % 2 == 0 or not 0 < arm_width <= size:
+        raise ValueError("size and arm_width must be odd, with 0 < arm_width <= size")
+    low, high = (size - arm_width) // 2, (size + arm_width) // 2
+    return {
+        "size": (size, size),
+        "holes": tuple((x, y) for x in range(size) for y in range(size) if low <= x < high or low <= y < high),
+        "start": (size // 2, size // 2)
+    }
@@ -0,0 +1,165 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+from .batch_moves import BatchMoveGenerator, np
+from .compiled_layout import CompiledLayout
+from .rules_engine import RulesEngine
+from .simulation import POLICIES, play_out
+
+# Default time budget for ranking the moves of a position, in seconds.
+DEFAULT_TIME_BUDGET = 0.05
+# Vectorized playouts run in batches, all moves together. The first batch is small, and times how many playouts fit in
+# the rest of the budget; each later batch is sized to fill the time that is left, up to a limit that bounds memory.
+CALIBRATION_BATCH_SIZE = 64
+MAX_VECTOR_BATCH_SIZE = 1 << 16
+
+
+class MoveScore(NamedTuple):
+    """How well random playouts starting with a jump went."""
+    jump: int
+    playouts: int
+    # Average number of pegs left at the end of the playouts.
+    expected_pegs: float
+    # Share of the playouts that ended with a single peg. Above zero only if the jump really can win.
+    win_probability: float
+
+
+def _tally_to_scores(jumps: list, tally: list) -> list:
+    """Turns per-jump [playouts, peg sum, wins] tallies into MoveScores, best first."""
+    scores = [MoveScore(jump, playouts, pegs / max(playouts, 1), wins / max(playouts, 1))
+              for jump, (playouts, pegs, wins) in zip(jumps, tally)]
+    # Jumps that the time budget didn't leave time to play out come last.
+    scores.sort(key=lambda score: (score.playouts == 0, -score.win_probability, score.expected_pegs))
+    return scores
+
+
+def _engine_playouts(layout: CompiledLayout, children: list, deadline: float, policy, rng: random.Random) -> list:
+    """
+    Plays out the children in turn, one playout each, on the rules engine until the deadline; the clock is checked
+    after every playout. Returns the tallies.
+    """
+    engine = RulesEngine(layout)
+    tally = [[0, 0, 0] for _ in children]
+    while True:
+        for child, child_tally in zip(children, tally):
+            engine.set_position(child)
+            pegs = play_out(engine, policy, rng)
+            child_tally[0] += 1
+            child_tally[1] += pegs
+            child_tally[2] += pegs == 1
+            if time.perf_counter() >= deadline:
+                return tally
+
+
+def _vector_playouts(layout: CompiledLayout, children: list, deadline: float, seed) -> list:
+    """
+    Plays out all the children at once, as rows of 64-bit bitboards, picking a random legal jump in every row at each
+    step, in batches sized to fit the time left (see CALIBRATION_BATCH_SIZE). The clock is checked at every step, and
+    a batch that would end after the deadline is dropped, unless it is the first. Returns the tallies.
+    """
+    generator = BatchMoveGenerator(layout)
+    jump_masks = np.array(layout.jump_masks, dtype=np.uint64)
+    rng = np.random.default_rng(seed)
+    children = np.array(children, dtype=np.uint64)
+    tally = np.zeros((len(children), 3), dtype=np.int64)
+    per_child = max(1, CALIBRATION_BATCH_SIZE // len(children))
+    first_batch = True
+    while True:
+        batch_start = time.perf_counter()
+        boards = np.repeat(children, per_child)
+        owners = np.repeat(np.arange(len(children)), per_child)
+        # Rows of the games that haven't ended yet.
+        active = np.arange(len(boards))
+        while len(active):
+            if not first_batch and time.perf_counter() >= deadline:
+                return tally.tolist()
+            mask = generator.bitboard_legal_mask(boards[active])
+            movable = mask.any(axis=1)
+            active, mask = active[movable], mask[movable]
+            # Random scores, zeroed for illegal jumps: the highest one is a uniformly random legal jump.
+            choices = (rng.random(mask.shape) * mask).argmax(axis=1)
+            boards[active] ^= jump_masks[choices]
+        pegs = np.unpackbits(boards.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        tally[:, 0] += per_child
+        tally[:, 1] += np.bincount(owners, weights=pegs, minlength=len(children)).astype(np.int64)
+        tally[:, 2] += np.bincount(owners, weights=pegs == 1, minlength=len(children)).astype(np.int64)
+        first_batch = False
+        # Sizes the next batch to fill the time left, at the speed of this one.
+        now = time.perf_counter()
+        batch_size = min(MAX_VECTOR_BATCH_SIZE, len(boards) * (deadline - now) / max(now - batch_start, 1e-9))
+        per_child = int(batch_size // len(children))
+        if per_child < 1:
+            return tally.tolist()
+
+
+def run_playouts(layout: CompiledLayout, position: int, time_budget: float, policy="random", seed=None) -> list:
+    """
+    Plays out every legal jump of the position in turn until the time budget (in seconds) runs out. Returns the
+    per-jump [playouts, peg sum, wins] tallies, in the order of RulesEngine.legal_jumps().
+
+    Random playouts on layouts with up to 64 holes are vectorized with NumPy when it is installed; other playouts run
+    on the rules engine.
+    """
+    deadline = time.perf_counter() + time_budget
+    engine = RulesEngine(layout)
+    engine.set_position(position)
+    children = [position ^ layout.jump_masks[jump] for jump in engine.legal_jumps()]
+    if not children:
+        return []
+    if policy == "random" and np is not None and layout.hole_count <= 64:
+        return _vector_playouts(layout, children, deadline, seed)
+    policy = POLICIES[policy] if isinstance(policy, str) else policy
+    return _engine_playouts(layout, children, deadline, policy, random.Random(seed))
+
+
+def rank_moves(layout: CompiledLayout, position: int, time_budget: float = DEFAULT_TIME_BUDGET, policy="random",
+               seed=None) -> list:
+    """
+    Scores each legal jump of the position by random playouts, in a single process. Returns a list of MoveScores,
+    best first: by estimated win probability, then by expected number of pegs left.
+
+    :param layout: Compiled layout the position belongs to.
+    :param position: Position to rank the jumps of.
+    :param time_budget: Time to spend on playouts, in seconds.
+    :param policy: Name of one of simulation.POLICIES, or a policy function, to pick the jumps of the playouts.
+    :param seed: Seed for the random number generator; optional.
+    """
+    engine = RulesEngine(layout)
+    engine.set_position(position)
+    return _tally_to_scores(engine.legal_jumps(), run_playouts(layout, position, time_budget, policy, seed))
+
+
+class MonteCarloRanker:
+    """
+    Scores the legal jumps of a position by random playouts spread over several processes, which are started once and
+    then kept for later positions. Each process plays out every jump until the time budget runs out, so the number of
+    playouts within a budget grows with the number of processes.
+    """
+    def __init__(self, workers: int = None, policy="random"):
+        """
+        :param workers: Number of worker processes; defaults to the number of CPUs.
+        :param policy: Name of one of simulation.POLICIES to pick the jumps of the playouts.
+        """
+        self.workers = workers or os.cpu_count()
+        self.policy = policy
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def rank_moves(self, layout: CompiledLayout, position: int, time_budget: float = DEFAULT_TIME_BUDGET) -> list:
+        """Returns the legal jumps of the position as MoveScores, best first. See rank_moves()."""
+        engine = RulesEngine(layout)
+        engine.set_position(position)
+        jumps = engine.legal_jumps()
+        futures = [self._executor.submit(run_playouts, layout, position, time_budget, self.policy,
+                                         random.getrandbits(64)) for _ in range(self.workers)]
+        tally = [[0, 0, 0] for _ in jumps]
+        for future in futures:
+            for total, part in zip(tally, future.result()):
+                for index in range(3):
+                    total[index] += part[index]
+        return _tally_to_scores(jumps, tally)
+
+    def close(self) -> None:
+        """Stops the worker processes."""
+        self._executor.shutdown(cancel_futures=True)
@@ -0,0 +1,106 @@
+from array import array
+from .compiled_layout import CompiledLayout
+
+# A position is saved after every this many moves.
+CHECKPOINT_INTERVAL = 16
+
+
+class MoveLog:
+    """
+    The moves of a game, stored compactly as one jump number per move in an array, with redo: moves that were undone
+    are kept until a different move is made.
+
+    The position after every CHECKPOINT_INTERVAL moves is saved as well, so the position after any move can be worked
+    out from the nearest checkpoint with fewer than CHECKPOINT_INTERVAL jumps, however long the game. That makes
+    jumping to any move, or scrubbing through a game, take about the same time wherever it goes.
+
+    The length of the log is the number of moves made so far (not counting the ones that were undone), so an empty log
+    is falsy.
+    """
+    def __init__(self, layout: CompiledLayout, checkpoint_interval: int = CHECKPOINT_INTERVAL):
+        """
+        :param layout: Compiled layout the moves are made on.
+        :param checkpoint_interval: Number of moves between saved positions.
+        """
+        self._checkpoint_interval = checkpoint_interval
+        self.clear(layout)
+
+    def clear(self, layout: CompiledLayout = None, start_position: int = None) -> None:
+        """
+        Removes all moves, starting a new game. By default, the game is on the same layout and from the same position
+        as before; a new layout starts from its starting position unless another one is given.
+        """
+        if layout is not None:
+            self._layout = layout
+            self._start_position = layout.start_position
+        if start_position is not None:
+            self._start_position = start_position
+        # Two bytes per move is enough for all but the largest layouts.
+        self._jumps = array("H" if len(self._layout.jumps) <= 0xFFFF else "L")
+        # Positions after moves 0, checkpoint_interval, 2 * checkpoint_interval...
+        self._checkpoints = [self._start_position]
+        # Number of moves made; the moves after it have been undone, and can be redone.
+        self._current = 0
+
+    def __len__(self) -> int:
+        return self._current
+
+    @property
+    def total(self) -> int:
+        """Returns the number of moves in the log, including the ones that were undone."""
+        return len(self._jumps)
+
+    @property
+    def jumps(self) -> list:
+        """Returns the jumps made so far, in order."""
+        return self._jumps[:self._current].tolist()
+
+    def can_redo(self) -> bool:
+        """Returns True if there is an undone move to redo."""
+        return self._current < len(self._jumps)
+
+    def record(self, jump: int, position: int) -> None:
+        """
+        Adds a move, given the jump and the position it led to. Any moves that were undone are forgotten, unless the
+        move is the same as the next of them, in which case it is simply redone.
+        """
+        if self.can_redo() and self._jumps[self._current] == jump:
+            self._current += 1
+            return
+        del self._jumps[self._current:]
+        del self._checkpoints[self._current // self._checkpoint_interval + 1:]
+        self._jumps.append(jump)
+        self._current += 1
+        if self._current % self._checkpoint_interval == 0:
+            self._checkpoints.append(position)
+
+    def undo(self):
+        """Steps back one move. Returns the jump to revert, or None if no move has been made."""
+        if not self._current:
+            return None
+        self._current -= 1
+        return self._jumps[self._current]
+
+    def redo(self):
+        """Steps forward one move. Returns the jump to make again, or None if there is no undone move."""
+        if not self.can_redo():
+            return None
+        self._current += 1
+        return self._jumps[self._current - 1]
+
+    def position_at(self, move: int) -> int:
+        """Returns the position after the given number of moves, replayed from the nearest checkpoint."""
+        if not 0 <= move <= len(self._jumps):
+            raise IndexError("move out of range")
+        checkpoint = move // self._checkpoint_interval
+        position = self._checkpoints[checkpoint]
+        jump_masks = self._layout.jump_masks
+        for jump in self._jumps[checkpoint * self._checkpoint_interval:move]:
+            position ^= jump_masks[jump]
+        return position
+
+    def go_to(self, move: int) -> int:
+        """Makes the given number of moves the current one, keeping the rest for redo. Returns the position after it."""
+        position = self.position_at(move)
+        self._current = move
+        return position
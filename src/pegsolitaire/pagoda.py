@@ -0,0 +1,278 @@
+import os
+import pickle
+import random
+from pathlib import Path
+from .compiled_layout import CompiledLayout
+from .rules_engine import RulesEngine
+from .user_data import get_user_data_path
+
+# Bumped whenever the way pagoda functions are chosen changes, so that stale files in the on-disk cache are not loaded.
+FORMAT_VERSION = 1
+
+# At most this many pagoda functions are used for one layout and target.
+MAX_PAGODAS = 6
+# Number of random games whose positions are used to choose the pagoda functions.
+SAMPLE_GAMES = 50
+# Number of random seed weightings that are repaired into pagoda functions.
+SEEDS = 4000
+# Candidates are scored on this many sampled positions first; only this many of the best are scored on all of them.
+SHORTLIST_SAMPLES = 256
+SHORTLIST_SIZE = 200
+# Repairs made to a seed weighting before giving up on turning it into a pagoda function.
+MAX_REPAIRS = 200
+
+# Pruners made during this session, by layout key and target hole.
+_pruners = {}
+
+
+def is_pagoda(layout: CompiledLayout, weights: tuple) -> bool:
+    """
+    Returns True if the weights make a pagoda function, i.e. no jump can increase the weighted sum of the pegs: for
+    every jump, the weight of the hole it ends on is at most the weights of the two holes it empties put together.
+    """
+    return all(weights[to] <= weights[src] + weights[over] for src, over, to in layout.jumps)
+
+
+def _fibonacci_pagodas(layout: CompiledLayout) -> list:
+    """
+    Returns the Fibonacci pagoda functions rooted at each hole: the weight of a hole is the Fibonacci number of how much
+    closer it is to the root than the farthest hole. Distance is measured along both axes, along x only or along y
+    only. Moving towards the root, a jump then trades weights F(n) + F(n + 1) for F(n + 2), which is no gain.
+    """
+    metrics = (lambda dx, dy: abs(dx) + abs(dy), lambda dx, dy: abs(dx), lambda dx, dy: abs(dy))
+    candidates = []
+    for root_x, root_y in layout.holes:
+        for metric in metrics:
+            distances = [metric(x - root_x, y - root_y) for x, y in layout.holes]
+            farthest = max(distances)
+            fibonacci = [1, 1]
+            while len(fibonacci) <= farthest:
+                fibonacci.append(fibonacci[-1] + fibonacci[-2])
+            candidates.append(tuple(fibonacci[farthest - distance] for distance in distances))
+    return candidates
+
+
+def _repair(layout: CompiledLayout, weights: list, rng: random.Random):
+    """
+    Turns a weighting of the holes with weights -1, 0 or 1 into a pagoda function, by fixing one jump that breaks the
+    rule at a time: either the hole it ends on is made lighter, or one of the holes it empties heavier. Returns the
+    weights as a tuple, or None if they couldn't be repaired.
+    """
+    jumps = layout.jumps
+    broken = {jump for jump, (src, over, to) in enumerate(jumps) if weights[to] > weights[src] + weights[over]}
+    for _ in range(MAX_REPAIRS):
+        if not broken:
+            return tuple(weights)
+        src, over, to = jumps[rng.choice(sorted(broken))]
+        fixes = [(hole, change) for hole, change in ((to, -1), (src, 1), (over, 1))
+                 if -1 <= weights[hole] + change <= 1]
+        hole, change = rng.choice(fixes)
+        weights[hole] += change
+        # Only the jumps through the changed hole can have been fixed or broken.
+        for jump in layout.jumps_by_hole[hole]:
+            src, over, to = jumps[jump]
+            if weights[to] > weights[src] + weights[over]:
+                broken.add(jump)
+            else:
+                broken.discard(jump)
+    return None
+
+
+def _repaired_seeds(layout: CompiledLayout, rng: random.Random) -> list:
+    """
+    Returns pagoda functions with weights -1, 0 and 1, repaired from random seed weightings. Unlike the Fibonacci
+    ones, these can give pegs in awkward holes (such as corners) a negative weight.
+    """
+    candidates = []
+    for _ in range(SEEDS):
+        weights = _repair(layout, [rng.choice((-1, 0, 0, 1)) for _ in layout.holes], rng)
+        if weights is not None:
+            candidates.append(weights)
+    return candidates
+
+
+def candidate_pagodas(layout: CompiledLayout, rng: random.Random) -> list:
+    """Returns the pagoda functions derived automatically for the layout, without repeats."""
+    candidates = {}
+    for weights in _fibonacci_pagodas(layout) + _repaired_seeds(layout, rng):
+        if any(weights) and is_pagoda(layout, weights):
+            candidates[weights] = None
+    return list(candidates)
+
+
+def _sample_positions(layout: CompiledLayout, rng: random.Random) -> list:
+    """Returns the positions met in a number of random games from the layout's starting position."""
+    engine = RulesEngine(layout)
+    positions = []
+    for _ in range(SAMPLE_GAMES):
+        engine.reset()
+        legal_jumps = engine.legal_jumps()
+        while legal_jumps:
+            engine.apply(rng.choice(legal_jumps))
+            positions.append(engine.position)
+            legal_jumps = engine.legal_jumps()
+    return positions
+
+
+def pagoda_tables(weights: tuple) -> tuple:
+    """Returns lookup tables that give the weighted sum of each byte of a bitboard, a byte at a time."""
+    tables = []
+    for first_hole in range(0, len(weights), 8):
+        byte_weights = weights[first_hole:first_hole + 8]
+        tables.append(tuple(sum(weight for bit, weight in enumerate(byte_weights) if byte >> bit & 1)
+                            for byte in range(256)))
+    return tuple(tables)
+
+
+def pagoda_value(tables: tuple, position: int) -> int:
+    """Returns the weighted sum of the pegs of a position, using tables made by pagoda_tables()."""
+    value = 0
+    for table in tables:
+        value += table[position & 0xFF]
+        position >>= 8
+    return value
+
+
+def _weight_masks(weights: tuple) -> list:
+    """Returns the holes of each non-zero weight, as (weight, mask) pairs."""
+    masks = {}
+    for hole, weight in enumerate(weights):
+        if weight:
+            masks[weight] = masks.get(weight, 0) | 1 << hole
+    return list(masks.items())
+
+
+def _threshold(weights: tuple, target) -> int:
+    """Returns the weighted sum of the final position: one peg, in the target hole if there is one."""
+    return weights[target] if target is not None else min(weights)
+
+
+def _pruned_samples(weights: tuple, target, samples: list) -> int:
+    """Returns a bitmask of the sample positions that the pagoda function proves unsolvable."""
+    masks, threshold = _weight_masks(weights), _threshold(weights, target)
+    pruned_mask = 0
+    for index, position in enumerate(samples):
+        value = 0
+        for weight, mask in masks:
+            value += weight * bin(position & mask).count("1")
+        if value < threshold:
+            pruned_mask |= 1 << index
+    return pruned_mask
+
+
+def select_pagodas(layout: CompiledLayout, target=None) -> list:
+    """
+    Returns the pagoda functions worth checking for the layout and target. The candidates are the Fibonacci pagoda
+    functions and random weightings repaired into pagoda functions; positions from random games are used as samples,
+    and the candidate that proves the most samples unsolvable that the ones already picked don't is picked each time.
+    """
+    rng = random.Random(f"{layout.key}/{target}")
+    samples = sorted(set(_sample_positions(layout, rng)))
+    rng.shuffle(samples)
+    candidates = candidate_pagodas(layout, rng)
+    # Candidates are first tried on a few of the samples; only the best of them are tried on all of them.
+    first_counts = {weights: bin(_pruned_samples(weights, target, samples[:SHORTLIST_SAMPLES])).count("1")
+                    for weights in candidates}
+    shortlist = sorted(candidates, key=lambda weights: -first_counts[weights])[:SHORTLIST_SIZE]
+    # For each candidate, the sampled positions it proves unsolvable, as a bitmask over the samples.
+    pruned = {}
+    for weights in shortlist:
+        pruned_mask = _pruned_samples(weights, target, samples)
+        if pruned_mask:
+            pruned[weights] = pruned_mask
+    selected = []
+    remaining = (1 << len(samples)) - 1
+    while remaining and pruned and len(selected) < MAX_PAGODAS:
+        best = max(pruned, key=lambda weights: bin(pruned[weights] & remaining).count("1"))
+        if not pruned[best] & remaining:
+            break
+        selected.append(best)
+        remaining &= ~pruned.pop(best)
+    return selected
+
+
+class PagodaPruner:
+    """
+    Proves positions unsolvable with pagoda functions: weightings of the holes that no jump can increase. If the
+    weighted sum of a position's pegs is already lower than that of the final position, the final position can't be
+    reached from it.
+
+    Search code keeps the sums of all the pagoda functions in one integer, one field per function, and updates it with
+    one subtraction per jump. Each field holds the function's sum minus its final value, plus a guard bit; the field
+    dips below its guard bit exactly when the position is dead, and it never goes below zero, so fields never borrow
+    from each other.
+    """
+    def __init__(self, layout: CompiledLayout, target=None, pagodas: list = None):
+        """
+        :param layout: Compiled layout to prune positions of.
+        :param target: Number of the hole the last peg must end up in; if None, it can end up in any hole.
+        :param pagodas: Pagoda functions to use, as tuples of weights per hole; by default, chosen by select_pagodas().
+        """
+        self.layout = layout
+        self.target = target
+        self.pagodas = pagodas if pagodas is not None else select_pagodas(layout, target)
+        self._tables = [pagoda_tables(weights) for weights in self.pagodas]
+        self._thresholds = [_threshold(weights, target) for weights in self.pagodas]
+        # The guard bit must be above the largest possible margin, and above what a single jump can take away.
+        largest = max([sum(weight for weight in weights if weight > 0) - threshold
+                       for weights, threshold in zip(self.pagodas, self._thresholds)] +
+                      [weights[src] + weights[over] - weights[to]
+                       for weights in self.pagodas for src, over, to in layout.jumps] + [0])
+        guard = 1 << largest.bit_length()
+        self._field_width = guard.bit_length() + 1
+        self._guard = guard
+        self.guard_mask = sum(guard << (index * self._field_width) for index in range(len(self.pagodas)))
+        # For each jump, what it takes away from each pagoda sum, packed into fields like the sums.
+        self.jump_deltas = tuple(
+            sum((weights[src] + weights[over] - weights[to]) << (index * self._field_width)
+                for index, weights in enumerate(self.pagodas))
+            for src, over, to in layout.jumps)
+
+    def pack(self, position: int) -> int:
+        """Returns the packed pagoda sums of a position, or -1 if the position is already proven dead."""
+        packed = 0
+        for index, (tables, threshold) in enumerate(zip(self._tables, self._thresholds)):
+            margin = pagoda_value(tables, position) - threshold
+            if margin < 0:
+                return -1
+            packed |= (self._guard + margin) << (index * self._field_width)
+        return packed
+
+    def is_dead(self, packed: int) -> bool:
+        """Returns True if the packed pagoda sums prove the position unsolvable."""
+        return packed & self.guard_mask != self.guard_mask
+
+
+def _cache_file_path(layout: CompiledLayout, target) -> Path:
+    """Returns the path of the file the pagoda functions chosen for the layout and target are cached in."""
+    return (get_user_data_path() / "layouts" /
+            f"{layout.key}_pagodas_{FORMAT_VERSION}_{'any' if target is None else target}.dat")
+
+
+def pagoda_pruner(layout: CompiledLayout, target=None) -> PagodaPruner:
+    """
+    Returns the PagodaPruner for the layout and target hole. Choosing the pagoda functions takes a few seconds, so
+    they are cached in memory and on disk, in the user data directory, and only ever chosen once.
+    """
+    key = (layout.key, target)
+    if key in _pruners:
+        return _pruners[key]
+    cache_file_path = _cache_file_path(layout, target)
+    try:
+        with cache_file_path.open("rb") as in_file:
+            pagodas = pickle.load(in_file)
+        if not isinstance(pagodas, list) or not all(is_pagoda(layout, weights) for weights in pagodas):
+            raise pickle.UnpicklingError
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError, IndexError):
+        pagodas = select_pagodas(layout, target)
+        try:
+            cache_file_path.parent.mkdir(parents=True, exist_ok=True)
+            # Writes to a temporary file first, so that other processes never read a half-written file.
+            temp_file_path = cache_file_path.with_suffix(f".{os.getpid()}.tmp")
+            with temp_file_path.open("wb") as out_file:
+                pickle.dump(pagodas, out_file)
+            os.replace(temp_file_path, cache_file_path)
+        except (OSError, pickle.PicklingError):
+            pass
+    _pruners[key] = PagodaPruner(layout, target, pagodas)
+    return _pruners[key]
@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from .compiled_layout import CompiledLayout
+from .solver import SearchCancelled, Solver
+
+# Default number of slots in the shared table of dead positions (8 bytes each).
+DEFAULT_TABLE_SLOTS = 1 << 22
+
+# State of each worker process, set up once by _init_worker().
+_worker = {}
+
+
+class SharedDeadSet:
+    """
+    Lossy hash set of dead positions in shared memory, used by several solver processes at once.
+
+    Each slot holds one position key plus one (0 marks an empty slot), so it only works for layouts with fewer than 64
+    holes. When both slots a key can go in are taken, the older entry is overwritten: the set may forget positions, but
+    it never claims a position is dead when it isn't, because slots are written whole and every key that is ever
+    written is a dead position.
+    """
+    def __init__(self, slots: int = DEFAULT_TABLE_SLOTS, context=None):
+        """
+        :param slots: Number of slots in the table; rounded up to a power of two.
+        :param context: Multiprocessing context to allocate the shared memory with; optional.
+        """
+        self._bits = max(1, (slots - 1).bit_length())
+        context = context if context is not None else multiprocessing.get_context()
+        self._array = context.RawArray("Q", 1 << self._bits)
+        self._slots = memoryview(self._array).cast("B").cast("Q")
+
+    def __getstate__(self) -> dict:
+        # Only the shared array is passed on to other processes; the view on it is recreated there.
+        return {"bits": self._bits, "array": self._array}
+
+    def __setstate__(self, state: dict) -> None:
+        self._bits = state["bits"]
+        self._array = state["array"]
+        self._slots = memoryview(self._array).cast("B").cast("Q")
+
+    def _slot(self, key: int) -> int:
+        """Returns the first of the two slots the key can be stored in."""
+        return ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - self._bits)
+
+    def __contains__(self, key: int) -> bool:
+        slot, stored = self._slot(key), key + 1
+        return self._slots[slot] == stored or self._slots[slot ^ 1] == stored
+
+    def add(self, key: int) -> None:
+        slot, stored = self._slot(key), key + 1
+        if self._slots[slot] in (0, stored):
+            self._slots[slot] = stored
+        else:
+            self._slots[slot ^ 1] = stored
+
+
+def _init_worker(layout: CompiledLayout, target, shared_dead, stop_event) -> None:
+    """Sets up a worker process: one solver per process, so its own transposition table is kept between subtrees."""
+    _worker["solver"] = Solver(layout, target, shared_dead=shared_dead, stop_event=stop_event)
+    _worker["stop_event"] = stop_event
+
+
+def _solve_subtree(position: int):
+    """Solves one subtree in a worker process. Returns its solution, None if unsolvable, or False if cancelled."""
+    if _worker["stop_event"].is_set():
+        return False
+    try:
+        return _worker["solver"].solve(position)
+    except SearchCancelled:
+        return False
+
+
+def split_tree(solver: Solver, position: int, depth: int) -> list:
+    """
+    Expands the search tree of the given position down to the given depth. Returns the (path, position) pairs at that
+    depth, in the order the solver would search them, with positions that are symmetric to an earlier one left out.
+    A position solved before reaching that depth is returned with the path that solves it.
+    """
+    frontier = [([], position)]
+    for _ in range(depth):
+        next_frontier = []
+        seen = set()
+        for path, pegs in frontier:
+            if solver.is_solved(pegs):
+                return [(path, pegs)]
+            for jump in solver.legal_jumps(pegs, solver.transpose(pegs)):
+                child = pegs ^ solver.layout.jump_masks[jump]
+                key = solver.canonical(child)
+                if key not in seen:
+                    seen.add(key)
+                    next_frontier.append((path + [jump], child))
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    return frontier
+
+
+def solve_parallel(layout: CompiledLayout,
+                   position: int,
+                   target=None,
+                   split_depth: int = 4,
+                   workers: int = None,
+                   table_slots: int = DEFAULT_TABLE_SLOTS):
+    """
+    Solves a position using a pool of worker processes. The search tree is split at split_depth and each subtree is
+    handed to a worker; the workers share the dead positions they find, and all of them stop as soon as one finds
+    a solution. Returns a list of jumps that solves the position, or None if it can't be solved.
+
+    :param layout: Compiled board layout to solve.
+    :param position: Position to solve.
+    :param target: Number of the hole the last peg must end up in; if None, it can end up in any hole.
+    :param split_depth: How many jumps deep to split the search tree.
+    :param workers: Number of worker processes; defaults to the number of CPUs.
+    :param table_slots: Size of the shared table of dead positions.
+    """
+    splitter = Solver(layout, target)
+    frontier = split_tree(splitter, position, split_depth)
+    if len(frontier) == 1 and splitter.is_solved(frontier[0][1]):
+        return frontier[0][0]
+    context = multiprocessing.get_context()
+    stop_event = context.Event()
+    # Keys of layouts with 64 holes or more don't fit in the shared table; each worker then keeps its own.
+    shared_dead = SharedDeadSet(table_slots, context) if layout.hole_count < 64 else None
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=context, initializer=_init_worker,
+                             initargs=(layout, target, shared_dead, stop_event)) as executor:
+        pending = {executor.submit(_solve_subtree, child): path for path, child in frontier}
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    solution = future.result()
+                    if isinstance(solution, list):
+                        return path + solution
+        finally:
+            # Stops the running searches and drops the subtrees that haven't been started.
+            stop_event.set()
+            for future in pending:
+                future.cancel()
+    return None
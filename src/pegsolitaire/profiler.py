@@ -0,0 +1,98 @@
+from collections import deque
+from time import perf_counter
+
+# Parts of a frame that are timed, in the order the game loop goes through them. "other" is the rest of the game state
+# method (backgrounds, labels, hints...), and "idle" is the time spent waiting for the next frame.
+PHASES = ("events", "process_input", "draw_board", "buttons", "other", "upscale", "display_update", "idle")
+# Number of frames the averages and percentiles are taken over: two seconds at 60 FPS.
+HISTORY = 120
+
+
+class NullProfiler:
+    """Takes the place of a FrameProfiler while frames are not being timed. All of its methods do nothing."""
+    def start_frame(self, label: str = "") -> None:
+        pass
+
+    def mark(self, phase: str) -> None:
+        pass
+
+    def end_frame(self) -> None:
+        pass
+
+
+# The game loop calls these on every frame, so one shared instance is used.
+NULL_PROFILER = NullProfiler()
+
+
+class FrameProfiler:
+    """
+    Times the phases of each frame, keeping the times of the last few frames.
+
+    The game loop calls start_frame() first, with the name of the game state, then mark() at the end of each phase,
+    and end_frame() last. Each mark() adds the time since the previous call to the given phase, so a frame is timed
+    with one clock reading per phase, and a phase can be marked several times in a frame.
+    """
+    def __init__(self, history: int = HISTORY):
+        """
+        :param history: Number of frames to keep the times of.
+        """
+        self.frame_times = deque(maxlen=history)
+        self.phase_times = {phase: deque(maxlen=history) for phase in PHASES}
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets the times of all frames so far and starts timing a new one."""
+        self.frame_times.clear()
+        for times in self.phase_times.values():
+            times.clear()
+        self.start_frame()
+
+    def start_frame(self, label: str = "") -> None:
+        """Starts timing a frame. The label (the game state) is not used; averages are taken over all frames."""
+        self._frame_start = self._last_mark = perf_counter()
+        self._frame = dict.fromkeys(PHASES, 0.0)
+
+    def mark(self, phase: str) -> None:
+        """Adds the time since the previous mark (or the start of the frame) to the given phase."""
+        now = perf_counter()
+        self._frame[phase] += now - self._last_mark
+        self._last_mark = now
+
+    def end_frame(self) -> None:
+        """Stores the times of the frame."""
+        self.frame_times.append(self._last_mark - self._frame_start)
+        for phase, time in self._frame.items():
+            self.phase_times[phase].append(time)
+
+    def percentile(self, share: float) -> float:
+        """Returns the given share (e.g. 0.95) percentile of the kept frame times, in seconds; 0 before any frame."""
+        if not self.frame_times:
+            return 0.0
+        times = sorted(self.frame_times)
+        return times[min(len(times) - 1, int(share * len(times)))]
+
+    def phase_average(self, phase: str) -> float:
+        """Returns the average time spent in the given phase per frame, in seconds; 0 before any frame."""
+        times = self.phase_times[phase]
+        return sum(times) / len(times) if times else 0.0
+
+
+class ProfilerGroup:
+    """Passes the calls of the game loop on to several profilers, such as the overlay's and a trace recorder."""
+    def __init__(self, profilers: list):
+        """
+        :param profilers: Profilers to pass the calls on to.
+        """
+        self._profilers = profilers
+
+    def start_frame(self, label: str = "") -> None:
+        for profiler in self._profilers:
+            profiler.start_frame(label)
+
+    def mark(self, phase: str) -> None:
+        for profiler in self._profilers:
+            profiler.mark(phase)
+
+    def end_frame(self) -> None:
+        for profiler in self._profilers:
+            profiler.end_frame()
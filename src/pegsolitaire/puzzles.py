@@ -0,0 +1,155 @@
+import argparse
+import os
+import random
+import time
+from pathlib import Path
+from . import layouts
+from .batch_moves import BatchMoveGenerator, np
+from .compiled_layout import CompiledLayout, compile_layout
+from .rules_engine import RulesEngine
+from .user_data import get_user_data_path
+
+# Number of puzzles generated when the game asks for one and the layout has no puzzle file yet.
+ON_DEMAND_COUNT = 500
+# Number of reverse games played at a time; generation stops once a whole batch brings no new puzzle.
+BATCH_SIZE = 1024
+
+
+def puzzle_file_path(layout: CompiledLayout) -> Path:
+    """Returns the path of the file the puzzles of the layout are kept in, in the user data directory."""
+    return get_user_data_path() / "puzzles" / f"{layout.key}.txt"
+
+
+def _engine_reverse_games(layout: CompiledLayout, pegs: int, count: int, rng: random.Random) -> list:
+    """
+    Plays reverse games on the rules engine. A reverse jump is only possible where a jump is possible on the complement
+    of the position (two empty holes and a peg, in a line), so the engine finds them.
+    """
+    engine = RulesEngine(layout)
+    full_mask = layout.full_mask
+    positions = []
+    for _ in range(count):
+        position = 1 << rng.randrange(layout.hole_count)
+        for _ in range(pegs - 1):
+            engine.set_position(full_mask ^ position)
+            legal_jumps = engine.legal_jumps()
+            if not legal_jumps:
+                break
+            position ^= layout.jump_masks[rng.choice(legal_jumps)]
+        else:
+            positions.append(position)
+    return positions
+
+
+def _vector_reverse_games(layout: CompiledLayout, pegs: int, count: int, rng: random.Random) -> list:
+    """Plays reverse games all at once, as rows of 64-bit bitboards of the complements of the positions."""
+    generator = BatchMoveGenerator(layout)
+    jump_masks = np.array(layout.jump_masks, dtype=np.uint64)
+    np_rng = np.random.default_rng(rng.getrandbits(64))
+    finishes = np_rng.integers(layout.hole_count, size=count).astype(np.uint64)
+    complements = np.uint64(layout.full_mask) ^ (np.uint64(1) << finishes)
+    for _ in range(pegs - 1):
+        mask = generator.bitboard_legal_mask(complements)
+        # Games with no reverse jump left are dropped.
+        movable = mask.any(axis=1)
+        complements, mask = complements[movable], mask[movable]
+        # Random scores, zeroed for illegal jumps: the highest one is a uniformly random legal jump.
+        complements ^= jump_masks[(np_rng.random(mask.shape) * mask).argmax(axis=1)]
+    return [layout.full_mask ^ complement for complement in complements.tolist()]
+
+
+def generate_puzzles(layout: CompiledLayout, count: int, pegs: int = None, seed=None, known=()) -> list:
+    """
+    Returns up to count new starting positions that are sure to be solvable, found by playing random reverse jumps
+    back from a single peg: every reverse jump can be made forwards again, back to the single peg. Positions that are
+    the same as each other, or as a known one, up to the symmetries of the layout are left out. Fewer are returned only
+    if new ones stop turning up.
+
+    :param layout: Compiled layout to make puzzles for.
+    :param count: Number of puzzles to make.
+    :param pegs: Number of pegs of the puzzles; by default, half the number of holes.
+    :param seed: Seed for the random number generator; optional.
+    :param known: Puzzles made before, which won't be made again.
+    """
+    pegs = pegs or layout.hole_count // 2
+    rng = random.Random(seed)
+    reverse_games = _vector_reverse_games if np is not None and layout.hole_count <= 64 else _engine_reverse_games
+    seen = {layout.canonical(position) for position in known}
+    puzzles = []
+    while len(puzzles) < count:
+        found = 0
+        for position in reverse_games(layout, pegs, BATCH_SIZE, rng):
+            canonical = layout.canonical(position)
+            if canonical not in seen:
+                seen.add(canonical)
+                puzzles.append(position)
+                found += 1
+        if not found:
+            break
+    return puzzles[:count]
+
+
+def load_puzzles(layout: CompiledLayout, path: Path = None) -> list:
+    """
+    Returns the puzzles in the layout's puzzle file (or the given file), or an empty list if there is none. The file
+    holds one position per line, in hexadecimal; lines starting with # are comments.
+    """
+    try:
+        with Path(path or puzzle_file_path(layout)).open() as in_file:
+            return [int(line, 16) for line in in_file if line.strip() and not line.startswith("#")]
+    except (OSError, ValueError):
+        return []
+
+
+def save_puzzles(layout: CompiledLayout, puzzles: list, path: Path = None) -> None:
+    """Writes puzzles to the layout's puzzle file (or the given file), replacing its contents."""
+    path = Path(path or puzzle_file_path(layout))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Writes to a temporary file first, so that the game never reads a half-written file.
+    temp_file_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with temp_file_path.open("w") as out_file:
+        out_file.write(f"# Puzzles for layout {layout.key}\n")
+        out_file.writelines(f"{position:x}\n" for position in puzzles)
+    os.replace(temp_file_path, path)
+
+
+def random_puzzle(layout: CompiledLayout, rng=random) -> int:
+    """
+    Returns one of the layout's puzzles at random, from its puzzle file. If there is no file yet, a few hundred
+    puzzles are made and saved first, which takes a fraction of a second.
+    """
+    puzzles = load_puzzles(layout)
+    if not puzzles:
+        puzzles = generate_puzzles(layout, ON_DEMAND_COUNT)
+        try:
+            save_puzzles(layout, puzzles)
+        except OSError:
+            pass
+    return rng.choice(puzzles)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Makes solvable puzzles for a layout and adds them to its puzzle file.")
+    parser.add_argument("-l", "--layout", type=int, choices=range(len(layouts.layouts)), default=0,
+                        help="Number of the layout to make puzzles for (0 is the English board).")
+    parser.add_argument("-n", "--count", type=int, default=10000, help="Number of puzzles to make.")
+    parser.add_argument("-p", "--pegs", type=int, default=None,
+                        help="Number of pegs of the puzzles; by default, half the number of holes.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the random number generator.")
+    parser.add_argument("-o", "--output", type=Path, default=None,
+                        help="File to add the puzzles to; by default, the layout's puzzle file in the user data "
+                             "directory, which the game picks its puzzles from.")
+    args = parser.parse_args()
+    layout = compile_layout(layouts.layouts[args.layout])
+    known = load_puzzles(layout, args.output)
+    start_time = time.perf_counter()
+    puzzles = generate_puzzles(layout, args.count, args.pegs, args.seed, known)
+    seconds = time.perf_counter() - start_time
+    save_puzzles(layout, known + puzzles, args.output)
+    print(f"Made {len(puzzles)} puzzles in {seconds:.2f} s ({len(puzzles) / max(seconds, 1e-9):.0f} puzzles/s); "
+          f"{len(known) + len(puzzles)} in {args.output or puzzle_file_path(layout)}")
+
+
+if __name__ == "__main__":
+    main()
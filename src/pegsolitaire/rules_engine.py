@@ -0,0 +1,202 @@
+from .compiled_layout import CompiledLayout
+
+
+class RulesEngine:
+    """
+    Pure-Python Peg Solitaire rules engine, independent of pygame.
+
+    A position is an integer bitboard over the layout's holes: bit i is set when hole i holds a peg. Holes are numbered
+    in (x, y) order, so holes that are neighbours along the y axis are also neighbours in the bitboard, and jumps along
+    that axis can be generated for all pegs at once with shifts and masks. The engine also keeps a second bitboard of
+    the same position with the holes numbered in (y, x) order, which does the same for jumps along the x axis.
+    Applying or reverting a jump is a pair of XORs. All geometry comes precomputed from the compiled layout.
+
+    The engine also knows the class of its position (see CompiledLayout.position_class()), which tells which holes the
+    last peg can't end up in. No jump changes it, so it only has to be worked out when the position is set.
+    """
+    def __init__(self, layout: CompiledLayout):
+        """:param layout: Compiled board layout to use."""
+        self.layout = layout
+        self.holes = layout.holes
+        self.hole_index = layout.hole_index
+        self.jumps = layout.jumps
+        self.full_mask = layout.full_mask
+        self.start_position = layout.start_position
+        self._transposed_index = layout.transposed_index
+        self._jumps_by_ends = layout.jumps_by_ends
+        self._jumps_from = layout.jumps_from
+        self._jump_starts = layout.jump_starts
+        self._jump_at = layout.jump_at
+        self._from_over_masks = layout.from_over_masks
+        self._to_masks = layout.to_masks
+        self._jump_masks = layout.jump_masks
+        self._transposed_jump_masks = layout.transposed_jump_masks
+        self.position = self.start_position
+        self._transposed = self._transpose(self.position)
+        self.position_class = layout.position_class(self.position)
+
+    def _transpose(self, position: int) -> int:
+        """Returns the given position renumbered in (y, x) order."""
+        transposed = 0
+        for index, transposed_index in enumerate(self._transposed_index):
+            if position >> index & 1:
+                transposed |= 1 << transposed_index
+        return transposed
+
+    def set_position(self, position: int) -> None:
+        """Sets the engine to an arbitrary position."""
+        self.position = position
+        self._transposed = self._transpose(position)
+        self.position_class = self.layout.position_class(position)
+
+    def reset(self) -> None:
+        """Sets the engine to the layout's starting position."""
+        self.set_position(self.start_position)
+
+    def is_hole(self, coords: tuple[int, int]) -> bool:
+        """Returns True if the tile at the given coordinates is a hole."""
+        return coords in self.hole_index
+
+    def is_occupied(self, coords: tuple[int, int]) -> bool:
+        """Returns True if there is a peg at the given coordinates."""
+        index = self.hole_index.get(coords)
+        return index is not None and bool(self.position >> index & 1)
+
+    @property
+    def peg_count(self) -> int:
+        """Returns the number of pegs on the board."""
+        return bin(self.position).count("1")
+
+    def pegs(self) -> list[tuple[int, int]]:
+        """Returns the coordinates of all pegs on the board."""
+        return [coords for index, coords in enumerate(self.holes) if self.position >> index & 1]
+
+    def find_jump(self, from_coords: tuple[int, int], to_coords: tuple[int, int]):
+        """Returns the jump between the given coordinates, or None if the layout has no such jump."""
+        src, to = self.hole_index.get(from_coords), self.hole_index.get(to_coords)
+        return self._jumps_by_ends.get((src, to))
+
+    def jump_coords(self, jump: int) -> tuple[tuple[int, int], tuple[int, int], tuple[int, int]]:
+        """Returns the (from, over, to) coordinates of the given jump."""
+        src, over, to = self.jumps[jump]
+        return self.holes[src], self.holes[over], self.holes[to]
+
+    def is_legal(self, jump: int) -> bool:
+        """Returns True if the jump can be made in the current position."""
+        from_over = self._from_over_masks[jump]
+        return self.position & from_over == from_over and not self.position & self._to_masks[jump]
+
+    def _movable(self) -> tuple[int, int, int, int]:
+        """
+        For each jump direction (+y, -y, +x, -x), returns a mask of the holes from which a legal jump in that
+        direction starts. The +x and -x masks are numbered in (y, x) order.
+        """
+        pegs, transposed = self.position, self._transposed
+        empty, transposed_empty = self.full_mask ^ pegs, self.full_mask ^ transposed
+        starts = self._jump_starts
+        return (pegs & (pegs >> 1) & (empty >> 2) & starts[0],
+                pegs & (pegs << 1) & (empty << 2) & starts[1],
+                transposed & (transposed >> 1) & (transposed_empty >> 2) & starts[2],
+                transposed & (transposed << 1) & (transposed_empty << 2) & starts[3])
+
+    def legal_jumps(self) -> list[int]:
+        """Returns all jumps that can be made in the current position."""
+        legal = []
+        for movable, jump_at in zip(self._movable(), self._jump_at):
+            while movable:
+                lowest = movable & -movable
+                legal.append(jump_at[lowest.bit_length() - 1])
+                movable ^= lowest
+        return legal
+
+    def has_legal_jump(self) -> bool:
+        """Returns True if at least one jump can be made in the current position."""
+        return any(self._movable())
+
+    def legal_jumps_from(self, coords: tuple[int, int]) -> list[int]:
+        """Returns the jumps that the peg at the given coordinates can make."""
+        index = self.hole_index.get(coords)
+        if index is None:
+            return []
+        return [jump for jump in self._jumps_from[index] if self.is_legal(jump)]
+
+    def can_finish_in(self, hole: int) -> bool:
+        """Returns False if the last peg can no longer end up in the given hole, whatever jumps are made."""
+        return self.position_class == self.layout.hole_classes[hole]
+
+    def apply(self, jump: int) -> None:
+        """Makes the jump. The jump is assumed to be legal."""
+        self.position ^= self._jump_masks[jump]
+        self._transposed ^= self._transposed_jump_masks[jump]
+
+    def revert(self, jump: int) -> None:
+        """Takes back the jump, which must have been the last one made."""
+        self.position ^= self._jump_masks[jump]
+        self._transposed ^= self._transposed_jump_masks[jump]
+
+
+class IncrementalRulesEngine(RulesEngine):
+    """
+    Rules engine that keeps a live peg count and a live set of legal jumps, for callers that ask about the position
+    after every move (like the Board). Making or taking back a jump only rechecks the jumps that share a hole with it,
+    so checking for victory or defeat and finding the jumps from a hole are lookups.
+    """
+    def __init__(self, layout: CompiledLayout):
+        """:param layout: Compiled board layout to use."""
+        self._peg_count = 0
+        self._legal = set()
+        super().__init__(layout)
+        self._affected_jumps = layout.affected_jumps
+        self.set_position(self.position)
+
+    def set_position(self, position: int) -> None:
+        """Sets the position, and counts its pegs and finds its legal jumps from scratch."""
+        super().set_position(position)
+        self._peg_count = bin(position).count("1")
+        self._legal = set(super().legal_jumps())
+
+    @property
+    def peg_count(self) -> int:
+        """Returns the live peg count, kept up to date by apply() and revert()."""
+        return self._peg_count
+
+    def legal_jumps(self) -> list[int]:
+        """Returns the live set of legal jumps as a list; nothing is generated."""
+        return list(self._legal)
+
+    def has_legal_jump(self) -> bool:
+        """Returns True if the live set of legal jumps isn't empty."""
+        return bool(self._legal)
+
+    def is_legal(self, jump: int) -> bool:
+        """Returns True if the jump is in the live set of legal jumps."""
+        return jump in self._legal
+
+    def legal_jumps_from(self, coords: tuple[int, int]) -> list[int]:
+        """Returns the jumps starting at the given hole that are in the live set of legal jumps."""
+        index = self.hole_index.get(coords)
+        if index is None:
+            return []
+        return [jump for jump in self._jumps_from[index] if jump in self._legal]
+
+    def _update_legal_jumps(self, jump: int) -> None:
+        """Rechecks the jumps that share a hole with the given one."""
+        position, from_over_masks, to_masks = self.position, self._from_over_masks, self._to_masks
+        for affected in self._affected_jumps[jump]:
+            from_over = from_over_masks[affected]
+            if position & from_over == from_over and not position & to_masks[affected]:
+                self._legal.add(affected)
+            else:
+                self._legal.discard(affected)
+
+    def apply(self, jump: int) -> None:
+        """Makes the jump, and updates the legal jumps from the jump's neighbourhood only."""
+        super().apply(jump)
+        self._peg_count -= 1
+        self._update_legal_jumps(jump)
+
+    def revert(self, jump: int) -> None:
+        """Takes the jump back, and updates the legal jumps from the jump's neighbourhood only."""
+        super().revert(jump)
+        self._peg_count += 1
+        self._update_legal_jumps(jump)
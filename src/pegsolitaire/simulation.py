@@ -0,0 +1,90 @@
+import random
+import time
+from collections import Counter
+from typing import NamedTuple
+from .compiled_layout import CompiledLayout
+from .rules_engine import RulesEngine
+
+
+def random_policy(engine: RulesEngine, legal_jumps: list, rng: random.Random) -> int:
+    """Picks one of the legal jumps at random."""
+    return rng.choice(legal_jumps)
+
+
+def first_policy(engine: RulesEngine, legal_jumps: list, rng: random.Random) -> int:
+    """Always picks the first legal jump the engine finds; the same game every time."""
+    return legal_jumps[0]
+
+
+# Policies that can be chosen by name from the command line. A policy gets the engine, the legal jumps in its current
+# position and a random number generator, and returns the jump to make.
+POLICIES = {
+    "random": random_policy,
+    "first": first_policy,
+}
+
+
+class SimulationResult(NamedTuple):
+    """Outcome of a batch of simulated games."""
+    games: int
+    seconds: float
+    # Number of games that ended with each number of pegs left on the board.
+    final_pegs: Counter
+
+    @property
+    def games_per_second(self) -> float:
+        return self.games / self.seconds if self.seconds else float("inf")
+
+    @property
+    def wins(self) -> int:
+        """Number of games that ended with a single peg left."""
+        return self.final_pegs[1]
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+
+def play_game(engine: RulesEngine, policy, rng: random.Random) -> int:
+    """Plays one game from the layout's starting position until no jump is left. Returns the number of pegs left."""
+    engine.reset()
+    return play_out(engine, policy, rng)
+
+
+def play_out(engine: RulesEngine, policy, rng: random.Random) -> int:
+    """Plays on from the engine's current position until no jump is left. Returns the number of pegs left."""
+    peg_count = engine.peg_count
+    legal_jumps = engine.legal_jumps()
+    while legal_jumps:
+        engine.apply(policy(engine, legal_jumps, rng))
+        peg_count -= 1
+        legal_jumps = engine.legal_jumps()
+    return peg_count
+
+
+def simulate(layout: CompiledLayout, games: int, policy="random", seed: int = None) -> SimulationResult:
+    """
+    Plays a number of games through the rules engine alone, without pygame, and returns their results.
+
+    :param layout: Compiled layout to play on.
+    :param games: Number of games to play.
+    :param policy: Name of one of POLICIES, or a policy function.
+    :param seed: Seed for the random number generator, to make the results repeatable; optional.
+    """
+    policy = POLICIES[policy] if isinstance(policy, str) else policy
+    engine = RulesEngine(layout)
+    rng = random.Random(seed)
+    final_pegs = Counter()
+    start_time = time.perf_counter()
+    for _ in range(games):
+        final_pegs[play_game(engine, policy, rng)] += 1
+    return SimulationResult(games, time.perf_counter() - start_time, final_pegs)
+
+
+def print_report(result: SimulationResult) -> None:
+    """Prints the results of a simulation."""
+    print(f"Games: {result.games} in {result.seconds:.2f} s ({result.games_per_second:.0f} games/s)")
+    print(f"Win rate: {result.win_rate:.4%} ({result.wins} games)")
+    print("Pegs left  Games")
+    for pegs in sorted(result.final_pegs):
+        print(f"{pegs:>9}  {result.final_pegs[pegs]}")
@@ -0,0 +1,206 @@
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import NamedTuple, Optional
+from .compiled_layout import CompiledLayout
+from .user_data import get_user_data_path
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; writers are then not locked against each other.
+    fcntl = None
+
+MAGIC = b"PSDB"
+VERSION = 1
+# File header: magic, version, key size in bytes, number of slots, number of entries.
+_HEADER = struct.Struct("<4sHHQQ")
+HEADER_SIZE = 32
+# Each slot: status (0: empty, 1: win, 2: loss), distance to a win, then the canonical position.
+_SLOT_HEADER = struct.Struct("<BH")
+_EMPTY, _WIN, _LOSS = 0, 1, 2
+INITIAL_SLOTS = 1 << 16
+# The table is doubled in size when it gets fuller than this.
+MAX_LOAD = 0.5
+
+
+class Entry(NamedTuple):
+    """What is known about a position: whether it can be won, and in how many jumps (0 for lost positions)."""
+    winnable: bool
+    distance: int
+
+
+def database_path(layout: CompiledLayout, target=None) -> Path:
+    """Returns the path of the database file for the given layout and target hole, in the user data directory."""
+    return get_user_data_path() / f"solved_{layout.key}_{'any' if target is None else target}.db"
+
+
+class SolvabilityDatabase:
+    """
+    Persistent table of solved positions for one layout and target hole, stored in a memory-mapped file.
+
+    The file is an open-addressing hash table keyed by canonical position, so a lookup only touches the few pages it
+    needs and never loads the whole file. Any number of processes can read the same file at once; writes are made in
+    place (and so are seen by readers straight away), under a file lock. When the table has to grow, it is rewritten
+    to a new file that replaces the old one; readers pick it up the next time a lookup misses.
+    """
+    def __init__(self, layout: CompiledLayout, target=None, path: Path = None, writable: bool = True):
+        """
+        :param layout: Compiled layout the positions belong to.
+        :param target: Number of the hole the last peg must end up in; if None, it can end up in any hole.
+        :param path: Path of the database file; by default, a file in the user data directory.
+        :param writable: Whether this object will store results, or only look them up.
+        """
+        self.layout = layout
+        self.target = target
+        self.path = path if path is not None else database_path(layout, target)
+        self._writable = writable
+        self._symmetries = layout.symmetries_fixing(target)[1:]
+        self._key_size = (layout.hole_count + 7) // 8
+        self._slot_size = _SLOT_HEADER.size + self._key_size
+        self._file = None
+        self._map = None
+        self._file_id = None
+        self._slots = 0
+        # Writers lock a separate file, which (unlike the database file) is never replaced.
+        self._lock_file = None
+        if writable:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._lock_file = self.path.with_suffix(".lock").open("a+b")
+        self._open()
+
+    def _open(self) -> None:
+        """Maps the database file, creating it first if necessary."""
+        self._unmap()
+        if not self.path.exists():
+            if not self._writable:
+                return
+            self._create(self.path, INITIAL_SLOTS)
+        self._file = self.path.open("r+b" if self._writable else "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if self._writable else mmap.ACCESS_READ)
+        magic, version, key_size, self._slots, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or key_size != self._key_size:
+            raise ValueError(f"{self.path} is not a solvability database for this layout")
+        stat = os.fstat(self._file.fileno())
+        self._file_id = (stat.st_ino, stat.st_size)
+
+    def _create(self, path: Path, slots: int, entries: list = ()) -> None:
+        """Writes a new database file with the given number of slots, holding the given (key, entry) pairs."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = bytearray(HEADER_SIZE + slots * self._slot_size)
+        _HEADER.pack_into(table, 0, MAGIC, VERSION, self._key_size, slots, len(entries))
+        for key, entry in entries:
+            offset, _ = self._find(table, slots, key)
+            self._write_slot(table, offset, key, entry)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with temp_path.open("wb") as out_file:
+            out_file.write(table)
+        os.replace(temp_path, path)
+
+    def _find(self, table, slots: int, key: int) -> tuple[int, bool]:
+        """Returns the offset of the slot holding the key (True) or of the empty slot where it would go (False)."""
+        key_bytes = key.to_bytes(self._key_size, "little")
+        slot = ((hash(key) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) % slots
+        while True:
+            offset = HEADER_SIZE + slot * self._slot_size
+            if table[offset] == _EMPTY:
+                return offset, False
+            if table[offset + _SLOT_HEADER.size:offset + self._slot_size] == key_bytes:
+                return offset, True
+            slot = (slot + 1) % slots
+
+    def _write_slot(self, table, offset: int, key: int, entry: Entry) -> None:
+        """Writes an entry to the slot at the given offset."""
+        _SLOT_HEADER.pack_into(table, offset, _WIN if entry.winnable else _LOSS, entry.distance)
+        table[offset + _SLOT_HEADER.size:offset + self._slot_size] = key.to_bytes(self._key_size, "little")
+
+    def _read_slot(self, offset: int) -> Entry:
+        """Returns the entry in the slot at the given offset."""
+        status, distance = _SLOT_HEADER.unpack_from(self._map, offset)
+        return Entry(status == _WIN, distance)
+
+    def _reopen_if_replaced(self) -> bool:
+        """Maps the file again if another process has replaced or created it. Returns True if it did."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if (stat.st_ino, stat.st_size) == self._file_id:
+            return False
+        self._open()
+        return True
+
+    def canonical(self, position: int) -> int:
+        """Returns the key the position is stored under."""
+        return self.layout.canonical(position, self._symmetries)
+
+    def get(self, key: int) -> Optional[Entry]:
+        """Returns the entry stored under the given canonical key, or None if the position hasn't been solved."""
+        if self._map is not None:
+            offset, found = self._find(self._map, self._slots, key)
+            if found:
+                return self._read_slot(offset)
+        if self._reopen_if_replaced():
+            return self.get(key)
+        return None
+
+    def lookup(self, position: int) -> Optional[Entry]:
+        """Returns what is known about the given position, or None if it hasn't been solved."""
+        return self.get(self.canonical(position))
+
+    def store_many(self, entries) -> None:
+        """Stores (canonical key, Entry) pairs; keys that are already stored are left as they are."""
+        if not self._writable:
+            raise ValueError("the database was opened read-only")
+        if fcntl is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            self._reopen_if_replaced()
+            count = _HEADER.unpack_from(self._map, 0)[4]
+            for key, entry in entries:
+                if count + 1 > self._slots * MAX_LOAD:
+                    _HEADER.pack_into(self._map, 0, MAGIC, VERSION, self._key_size, self._slots, count)
+                    self._grow()
+                offset, found = self._find(self._map, self._slots, key)
+                if not found:
+                    self._write_slot(self._map, offset, key, entry)
+                    count += 1
+            _HEADER.pack_into(self._map, 0, MAGIC, VERSION, self._key_size, self._slots, count)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def store(self, position: int, winnable: bool, distance: int = 0) -> None:
+        """Stores the result for a position."""
+        self.store_many(((self.canonical(position), Entry(winnable, distance)),))
+
+    def _grow(self) -> None:
+        """Rewrites the table with twice as many slots."""
+        entries = []
+        for slot in range(self._slots):
+            offset = HEADER_SIZE + slot * self._slot_size
+            if self._map[offset] != _EMPTY:
+                key = int.from_bytes(self._map[offset + _SLOT_HEADER.size:offset + self._slot_size], "little")
+                entries.append((key, self._read_slot(offset)))
+        self._create(self.path, self._slots * 2, entries)
+        self._open()
+
+    def __len__(self) -> int:
+        return 0 if self._map is None else _HEADER.unpack_from(self._map, 0)[4]
+
+    def _unmap(self) -> None:
+        """Unmaps and closes the database file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        """Closes the database."""
+        self._unmap()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
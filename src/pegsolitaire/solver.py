@@ -0,0 +1,229 @@
+from .compiled_layout import CompiledLayout, compile_layout
+from .pagoda import pagoda_pruner
+from .solvability_db import Entry
+
+# How many positions the solver visits between checks of its stop event.
+STOP_CHECK_INTERVAL = 4096
+# Positions with fewer pegs than this are neither looked up in the database nor stored in it when found dead. They
+# make up most of a search and take a few milliseconds at most to prove dead again, so looking them all up would
+# cost more than it saves; the in-memory table already catches the repeats within a search.
+DATABASE_MIN_PEGS = 14
+
+
+class SearchCancelled(Exception):
+    """Raised by a Solver whose stop event has been set while it was searching."""
+
+
+class Solver:
+    """
+    Exact Peg Solitaire solver: depth-first search for a sequence of jumps that leaves a single peg on the board.
+
+    Positions proved unsolvable are kept in a transposition table, keyed by their canonical form under the symmetries
+    of the board that keep the target hole in place, so each dead position (and all of its mirror images) is only
+    searched once. The table is kept between calls, so later searches on the same layout get faster. Branches that
+    pagoda functions prove unsolvable are cut without being searched.
+    """
+    def __init__(self, layout: CompiledLayout, target=None, shared_dead=None, stop_event=None, database=None,
+                 use_pagodas: bool = True):
+        """
+        :param layout: Compiled board layout to solve.
+        :param target: Number of the hole the last peg must end up in; if None, it can end up in any hole.
+        :param shared_dead: A set-like object of dead positions shared with other solvers; optional.
+        :param stop_event: When this event (threading or multiprocessing) gets set, the search raises SearchCancelled.
+        :param database: A SolvabilityDatabase for the same layout and target, to look results up in and add them to;
+            optional.
+        :param use_pagodas: Whether to cut branches that pagoda functions prove unsolvable.
+        """
+        self.layout = layout
+        self.target = target
+        self._symmetries = layout.symmetries_fixing(target)[1:]
+        # Canonical forms of positions known to be unsolvable.
+        self.dead = set()
+        self._shared_dead = shared_dead
+        self._stop_event = stop_event
+        self._database = database
+        # Dead positions found since results were last stored in the database.
+        self._unrecorded_dead = []
+        # Number of positions visited by the last call to solve().
+        self.nodes = 0
+        # Jumps are tried outside-in: pegs far from the target hole (or the middle of the board) are moved first.
+        self._jump_rank = self._rank_jumps()
+        # Pagoda sums are updated along the search path, one subtraction per jump (see PagodaPruner).
+        self._pagoda = pagoda_pruner(layout, target) if use_pagodas else None
+
+    def _rank_jumps(self) -> tuple:
+        """
+        Returns the rank of each jump in the order jumps are tried: jumps starting farthest from the target hole (or
+        from the middle of the board) come first.
+        """
+        holes = self.layout.holes
+        if self.target is not None:
+            centre_x, centre_y = holes[self.target]
+        else:
+            centre_x = sum(x for x, _ in holes) / len(holes)
+            centre_y = sum(y for _, y in holes) / len(holes)
+
+        def distance(hole: int) -> float:
+            x, y = holes[hole]
+            return abs(x - centre_x) + abs(y - centre_y)
+
+        order = sorted(range(len(self.layout.jumps)), key=lambda jump: -distance(self.layout.jumps[jump][0]))
+        rank = [0] * len(order)
+        for position, jump in enumerate(order):
+            rank[jump] = position
+        return tuple(rank)
+
+    def is_solved(self, position: int) -> bool:
+        """Returns True if the position has a single peg, in the target hole if there is one."""
+        if self.target is not None:
+            return position == 1 << self.target
+        return position & (position - 1) == 0 and position != 0
+
+    def transpose(self, position: int) -> int:
+        """Returns the given position renumbered in (y, x) order."""
+        transposed = 0
+        for index, transposed_index in enumerate(self.layout.transposed_index):
+            if position >> index & 1:
+                transposed |= 1 << transposed_index
+        return transposed
+
+    def solve(self, position: int):
+        """
+        Returns a list of jumps that solves the given position, or None if it can't be solved.
+        """
+        self.nodes = 0
+        solution = []
+        pagoda = self._pagoda.pack(position) if self._pagoda is not None else 0
+        try:
+            # Positions of the wrong class can't be won, and neither can those the pagoda functions rule out.
+            if not self.class_allows_win(position) or pagoda < 0:
+                return None
+            if self._search(position, self.transpose(position), bin(position).count("1"), pagoda, solution):
+                solution.reverse()
+                return solution
+            return None
+        finally:
+            if self._database is not None:
+                # solution is in play order by now: reversed above on success, and empty otherwise.
+                self._record(position, solution)
+
+    def class_allows_win(self, position: int) -> bool:
+        """Returns False if the position's class shows that it can't end with a single peg (in the target hole)."""
+        if self.target is not None:
+            return self.layout.can_finish_in(position, self.target)
+        return bool(self.layout.possible_targets(position))
+
+    def _record(self, position: int, solution: list) -> None:
+        """
+        Stores the dead positions found so far, and the positions along the solution, in the database. The solution
+        is replayed from the position in play order; raises ValueError if it isn't a legal line that wins, so that
+        positions off the winning line never get stored as winnable.
+        """
+        entries = [(key, Entry(False, 0)) for key in self._unrecorded_dead]
+        self._unrecorded_dead = []
+        peg_count = bin(position).count("1")
+        from_over_masks, to_masks = self.layout.from_over_masks, self.layout.to_masks
+        for jump in solution:
+            if position & from_over_masks[jump] != from_over_masks[jump] or position & to_masks[jump]:
+                raise ValueError(f"jump {jump} of the solution isn't legal when it is played")
+            entries.append((self.canonical(position), Entry(True, peg_count - 1)))
+            position ^= self.layout.jump_masks[jump]
+            peg_count -= 1
+        if solution and not self.is_solved(position):
+            raise ValueError("the solution doesn't end with a single peg in the target hole")
+        self._database.store_many(entries)
+
+    def canonical(self, position: int) -> int:
+        """Returns the key under which the position is stored in the transposition table."""
+        return self.layout.canonical(position, self._symmetries)
+
+    def legal_jumps(self, pegs: int, transposed: int) -> list:
+        """Returns the legal jumps in the given position, in the order they should be tried."""
+        layout = self.layout
+        full = layout.full_mask
+        empty, transposed_empty = full ^ pegs, full ^ transposed
+        starts = layout.jump_starts
+        movable = (pegs & (pegs >> 1) & (empty >> 2) & starts[0],
+                   pegs & (pegs << 1) & (empty << 2) & starts[1],
+                   transposed & (transposed >> 1) & (transposed_empty >> 2) & starts[2],
+                   transposed & (transposed << 1) & (transposed_empty << 2) & starts[3])
+        jumps = []
+        for direction_movable, jump_at in zip(movable, layout.jump_at):
+            while direction_movable:
+                lowest = direction_movable & -direction_movable
+                jumps.append(jump_at[lowest.bit_length() - 1])
+                direction_movable ^= lowest
+        jumps.sort(key=self._jump_rank.__getitem__)
+        return jumps
+
+    def is_known_dead(self, key: int) -> bool:
+        """Returns True if the position with the given key is already known to be unsolvable."""
+        return key in self.dead or (self._shared_dead is not None and key in self._shared_dead)
+
+    def mark_dead(self, key: int, peg_count: int) -> None:
+        """
+        Stores the key of an unsolvable position in the transposition table(s), and in the database if it has enough
+        pegs (see DATABASE_MIN_PEGS).
+        """
+        self.dead.add(key)
+        if self._database is not None and peg_count >= DATABASE_MIN_PEGS:
+            self._unrecorded_dead.append(key)
+        if self._shared_dead is not None:
+            self._shared_dead.add(key)
+
+    def _database_says_winnable(self, position: int) -> bool:
+        """Returns True if the database knows the position can be won."""
+        entry = self._database.get(self.canonical(position))
+        return entry is not None and entry.winnable
+
+    def _search(self, pegs: int, transposed: int, peg_count: int, pagoda: int, solution: list) -> bool:
+        """
+        Depth-first search. pagoda holds the packed pagoda sums of the position. On success, appends the winning jumps
+        to solution, last jump first.
+        """
+        self.nodes += 1
+        if peg_count == 1:
+            return self.is_solved(pegs)
+        if self._stop_event is not None and self.nodes % STOP_CHECK_INTERVAL == 0 and self._stop_event.is_set():
+            raise SearchCancelled
+        key = self.layout.canonical(pegs, self._symmetries)
+        if self.is_known_dead(key):
+            return False
+        jumps = self.legal_jumps(pegs, transposed)
+        jump_masks, transposed_jump_masks = self.layout.jump_masks, self.layout.transposed_jump_masks
+        if self._database is not None and peg_count >= DATABASE_MIN_PEGS:
+            entry = self._database.get(key)
+            if entry is not None and not entry.winnable:
+                self.dead.add(key)
+                return False
+            if entry is not None:
+                # Follows the known win: jumps to positions the database knows can be won are tried first.
+                jumps.sort(key=lambda jump: not self._database_says_winnable(pegs ^ jump_masks[jump]))
+        if self._pagoda is not None:
+            jump_deltas, guard_mask = self._pagoda.jump_deltas, self._pagoda.guard_mask
+        else:
+            jump_deltas, guard_mask = None, 0
+        for jump in jumps:
+            child_pagoda = pagoda - jump_deltas[jump] if jump_deltas is not None else 0
+            if child_pagoda & guard_mask != guard_mask:
+                continue
+            if self._search(pegs ^ jump_masks[jump], transposed ^ transposed_jump_masks[jump], peg_count - 1,
+                            child_pagoda, solution):
+                solution.append(jump)
+                return True
+        self.mark_dead(key, peg_count)
+        return False
+
+
+def solve_position(layout: dict, position: int = None, target=None):
+    """
+    Returns a list of jumps that solves the given position on the given layout (one of layouts.layouts), or None if
+    it can't be solved. By default, solves the layout's starting position.
+    """
+    compiled = compile_layout(layout)
+    return Solver(compiled, target).solve(compiled.start_position if position is None else position)
+
+
+def solve_board(board, target=None):
+    """Returns a list of jumps that solves the current position of a Board object, or None if it can't be solved."""
+    return Solver(board.engine.layout, target).solve(board.engine.position)
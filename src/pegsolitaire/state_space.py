@@ -0,0 +1,206 @@
+import argparse
+import heapq
+import tempfile
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import NamedTuple
+from . import layouts
+from .compiled_layout import CompiledLayout, compile_layout
+from .solver import Solver
+
+# How many positions of a level are expanded at once; the children of each chunk are sorted and written to disk
+# as one run, and the runs are merged into the next level, so memory use doesn't grow with the size of a level.
+CHUNK_SIZE = 1 << 18
+# How many positions are read or written at a time when streaming a level file.
+BUFFER_SIZE = 1 << 16
+
+
+class LevelStats(NamedTuple):
+    """Number of distinct positions (up to symmetry) with a given number of pegs, and how many of them can be won."""
+    pegs: int
+    positions: int
+    winnable: int
+
+
+def _read_positions(path: Path):
+    """Yields the positions stored in a level file, in order."""
+    with path.open("rb") as in_file:
+        while True:
+            buffer = array("Q")
+            try:
+                buffer.fromfile(in_file, BUFFER_SIZE)
+            except EOFError:
+                # The last, partial block has been read into the buffer anyway.
+                pass
+            if not buffer:
+                return
+            yield from buffer
+
+
+def _write_positions(path: Path, positions) -> int:
+    """Writes sorted positions to a level file, leaving out repeats. Returns how many were written."""
+    count = 0
+    previous = None
+    buffer = array("Q")
+    with path.open("wb") as out_file:
+        for position in positions:
+            if position == previous:
+                continue
+            previous = position
+            buffer.append(position)
+            if len(buffer) == BUFFER_SIZE:
+                buffer.tofile(out_file)
+                count += len(buffer)
+                buffer = array("Q")
+        buffer.tofile(out_file)
+        count += len(buffer)
+    return count
+
+
+def _load_positions(path: Path) -> array:
+    """Loads a whole level file into a sorted array."""
+    positions = array("Q")
+    with path.open("rb") as in_file:
+        positions.frombytes(in_file.read())
+    return positions
+
+
+def _contains(positions: array, position: int) -> bool:
+    """Returns True if the position is in the sorted array."""
+    index = bisect_left(positions, position)
+    return index < len(positions) and positions[index] == position
+
+
+class StateSpace:
+    """
+    Breadth-first enumeration of every position that can be reached from a layout's starting position, one level per
+    peg count.
+
+    Each level is kept on disk as a file of sorted canonical positions (64-bit integers, so only layouts with up to 64
+    holes are supported); positions that are symmetric to each other are stored once. The next level is built from
+    sorted runs that are merged on the way to disk, so only one chunk of positions is held in memory at a time.
+    A backward pass then marks, level by level from the single-peg end, which positions can still be won.
+    """
+    def __init__(self, layout: CompiledLayout, directory: Path, target=None):
+        """
+        :param layout: Compiled layout to enumerate.
+        :param directory: Directory to write the level files to.
+        :param target: Number of the hole the last peg must end up in; if None, it can end up in any hole.
+        """
+        if layout.hole_count > 64:
+            raise ValueError("only layouts with up to 64 holes can be enumerated")
+        self.layout = layout
+        self.directory = Path(directory)
+        self.target = target
+        self._solver = Solver(layout, target)
+        # Symmetries that map the starting position, and the target hole if there is one, onto themselves, so that
+        # a position is reachable and winnable exactly when its canonical form is.
+        fixing_start = layout.symmetries_fixing(layout.start)
+        self._symmetries = tuple(symmetry for symmetry in layout.symmetries_fixing(target)[1:]
+                                 if symmetry in fixing_start)
+        self.stats = []
+
+    def level_path(self, pegs: int) -> Path:
+        """Returns the path of the file holding the reachable positions with the given number of pegs."""
+        return self.directory / f"level_{pegs:02d}.bin"
+
+    def winnable_path(self, pegs: int) -> Path:
+        """Returns the path of the file holding the winnable positions with the given number of pegs."""
+        return self.directory / f"winnable_{pegs:02d}.bin"
+
+    def canonical(self, position: int) -> int:
+        """Returns the form the position is stored in."""
+        return self.layout.canonical(position, self._symmetries)
+
+    def children(self, position: int):
+        """Yields the canonical forms of the positions one jump away from the given one."""
+        solver, jump_masks = self._solver, self.layout.jump_masks
+        for jump in solver.legal_jumps(position, solver.transpose(position)):
+            yield self.canonical(position ^ jump_masks[jump])
+
+    def _expand(self, pegs: int) -> int:
+        """Writes the level with one peg less than the given level. Returns its number of positions."""
+        runs = []
+        chunk = set()
+        for position in _read_positions(self.level_path(pegs)):
+            chunk.update(self.children(position))
+            if len(chunk) >= CHUNK_SIZE:
+                runs.append(self._write_run(chunk, len(runs)))
+                chunk = set()
+        if chunk:
+            runs.append(self._write_run(chunk, len(runs)))
+        count = _write_positions(self.level_path(pegs - 1), heapq.merge(*map(_read_positions, runs)))
+        for run in runs:
+            run.unlink()
+        return count
+
+    def _write_run(self, chunk: set, number: int) -> Path:
+        """Writes a sorted run of positions to a temporary file."""
+        path = self.directory / f"run_{number:04d}.bin"
+        _write_positions(path, sorted(chunk))
+        return path
+
+    def _is_winnable(self, position: int) -> bool:
+        """Returns True if a position with one peg is a win."""
+        return self._solver.is_solved(position)
+
+    def enumerate(self, progress=None) -> list:
+        """
+        Enumerates all reachable positions and finds those that can be won. Returns a LevelStats for each peg count,
+        from the starting position down.
+
+        :param progress: Called with the number of pegs and the number of positions after each level is written;
+            optional.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        pegs = self.layout.hole_count - 1
+        counts = {pegs: _write_positions(self.level_path(pegs), [self.canonical(self.layout.start_position)])}
+        if progress is not None:
+            progress(pegs, counts[pegs])
+        while pegs > 1:
+            count = self._expand(pegs)
+            if not count:
+                # No jump is left in any position of this level, so there is no level below it.
+                self.level_path(pegs - 1).unlink()
+                break
+            pegs -= 1
+            counts[pegs] = count
+            if progress is not None:
+                progress(pegs, count)
+        # Backward pass: a position can be won if one of its children can.
+        winnable = {pegs: _write_positions(self.winnable_path(pegs),
+                                           filter(self._is_winnable, _read_positions(self.level_path(pegs))))}
+        while pegs < self.layout.hole_count - 1:
+            children_winnable = _load_positions(self.winnable_path(pegs))
+            pegs += 1
+            winnable[pegs] = _write_positions(
+                self.winnable_path(pegs),
+                (position for position in _read_positions(self.level_path(pegs))
+                 if any(_contains(children_winnable, child) for child in self.children(position))))
+        self.stats = [LevelStats(pegs, counts[pegs], winnable[pegs]) for pegs in sorted(counts, reverse=True)]
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Counts the positions reachable on a layout, by number of pegs.")
+    parser.add_argument("-l", "--layout", type=int, choices=range(len(layouts.layouts)), default=0,
+                        help="Number of the layout to enumerate (0 is the English board).")
+    parser.add_argument("-t", "--target", type=int, default=None,
+                        help="Number of the hole the last peg must end up in; by default, any hole.")
+    parser.add_argument("-d", "--directory", type=Path, default=None,
+                        help="Directory to keep the level files in; by default, a temporary directory.")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        state_space = StateSpace(compile_layout(layouts.layouts[args.layout]),
+                                 args.directory or temporary_directory, args.target)
+        state_space.enumerate(progress=lambda pegs, count: print(f"{pegs} pegs: {count} positions", flush=True))
+        print(f"{'Pegs':>4} {'Positions':>12} {'Winnable':>12}")
+        for level in state_space.stats:
+            print(f"{level.pegs:>4} {level.positions:>12} {level.winnable:>12}")
+        print(f"{'All':>4} {sum(level.positions for level in state_space.stats):>12} "
+              f"{sum(level.winnable for level in state_space.stats):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import pygame
+from typing import Optional
 from .options import Options
 
 
@@ -43,6 +44,8 @@ class Toggle(pygame.sprite.Sprite):
         self.is_on = is_on
         self._is_radio = is_radio
         self._command = command
+        # Whether the toggle was on when it was last drawn, or None if it has to be drawn again anyway.
+        self._drawn_state = None
 
     def is_mouseover(self) -> bool:
         """Returns True if the mouse cursor is above the object."""
@@ -65,8 +68,15 @@ class Toggle(pygame.sprite.Sprite):
         """Blits the toggle on the target surface."""
         self._target_surface.blit(self._gfx_toggle[self.is_on], self._rect)
 
-    def update(self, events) -> None:
-        """Flips state when clicked, and draws on display."""
+    def invalidate(self) -> None:
+        """Makes the next update() draw the toggle, e.g. after something else was drawn over it."""
+        self._drawn_state = None
+
+    def update(self, events) -> Optional[pygame.Rect]:
+        """
+        Flips state when clicked, and draws on display if the state changed since the toggle was last drawn. Returns
+        the toggle's rect if it was drawn.
+        """
         for event in events:
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if self.is_mouseover():
@@ -76,4 +86,8 @@ class Toggle(pygame.sprite.Sprite):
                         self.execute_command()
                         self.play_sound()
 
+        if self.is_on == self._drawn_state:
+            return None
+        self._drawn_state = self.is_on
         self.display()
+        return self._rect
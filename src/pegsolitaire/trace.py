@@ -0,0 +1,102 @@
+import json
+import os
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+
+# With memory tracing on, the lines of code whose allocations grew the most are recorded every this many frames.
+SNAPSHOT_INTERVAL = 600
+# Number of lines of code recorded with each snapshot.
+SNAPSHOT_TOP_LINES = 10
+
+
+class TraceRecorder:
+    """
+    Records the frames of a session as a trace in Chrome's trace event format, which chrome://tracing and Perfetto
+    open: a span for each frame, named after the game state it was drawn in, holding a span for each phase of it.
+
+    It's used as a profiler by the game loop (see profiler.py), so the phases are the ones the FrameProfiler times.
+    Events are written to the file as they happen, in the format's array form, whose closing bracket is optional: the
+    trace of a session that crashed can still be opened.
+
+    With memory tracing on, tracemalloc runs for the whole session. Every frame records the memory allocated and its
+    peak as counters, and every SNAPSHOT_INTERVAL frames, the lines of code whose allocations grew the most since the
+    previous snapshot are recorded as an instant event.
+    """
+    def __init__(self, path: Path, memory: bool = False):
+        """
+        :param path: File to write the trace to. It's replaced if it exists.
+        :param memory: Whether to trace memory allocations as well. Python runs noticeably slower while it does.
+        """
+        self._file = Path(path).open("w")
+        self._file.write("[\n")
+        self._pid = os.getpid()
+        self._origin = perf_counter()
+        self._memory = memory
+        self._frames = 0
+        self._snapshot = None
+        if memory:
+            tracemalloc.start()
+            self._snapshot = tracemalloc.take_snapshot()
+        self._write({"name": "process_name", "ph": "M", "pid": self._pid, "args": {"name": "Peg Solitaire"}})
+        self.start_frame()
+
+    def _write(self, event: dict) -> None:
+        """Writes an event to the trace file."""
+        self._file.write(json.dumps(event, separators=(",", ":")))
+        self._file.write(",\n")
+
+    def _timestamp(self, time: float) -> float:
+        """Converts a perf_counter() time to a trace timestamp: microseconds since the recorder was made."""
+        return (time - self._origin) * 1e6
+
+    def _span(self, name: str, start: float, end: float, args: dict = None) -> None:
+        """Writes a complete event lasting from start to end."""
+        event = {"name": name, "ph": "X", "pid": self._pid, "tid": 0,
+                 "ts": self._timestamp(start), "dur": (end - start) * 1e6}
+        if args:
+            event["args"] = args
+        self._write(event)
+
+    def start_frame(self, label: str = "") -> None:
+        """Starts a frame, labelled with the game state it's drawn in."""
+        self._frame_start = self._last_mark = perf_counter()
+        self._label = label
+
+    def mark(self, phase: str) -> None:
+        """Records the time since the previous mark (or the start of the frame) as a span of the given phase."""
+        now = perf_counter()
+        self._span(phase, self._last_mark, now)
+        self._last_mark = now
+
+    def end_frame(self) -> None:
+        """Records the frame's span, and the memory counters if memory is being traced."""
+        self._span(self._label or "frame", self._frame_start, self._last_mark, {"frame": self._frames})
+        if self._memory:
+            current, peak = tracemalloc.get_traced_memory()
+            self._write({"name": "memory", "ph": "C", "pid": self._pid, "ts": self._timestamp(self._last_mark),
+                         "args": {"current": current, "peak": peak}})
+            if self._frames % SNAPSHOT_INTERVAL == SNAPSHOT_INTERVAL - 1:
+                self._record_growth()
+        self._frames += 1
+
+    def _record_growth(self) -> None:
+        """Records the lines of code whose allocations grew the most since the previous snapshot."""
+        snapshot = tracemalloc.take_snapshot()
+        growth = [stat for stat in snapshot.compare_to(self._snapshot, "lineno") if stat.size_diff > 0]
+        self._snapshot = snapshot
+        self._write({"name": "memory growth", "ph": "i", "s": "p", "pid": self._pid, "tid": 0,
+                     "ts": self._timestamp(perf_counter()),
+                     "args": {str(stat.traceback): stat.size_diff for stat in growth[:SNAPSHOT_TOP_LINES]}})
+
+    def close(self) -> None:
+        """Finishes the trace file and stops tracing memory."""
+        if self._file.closed:
+            return
+        # The last event has no comma after it, so that the finished file is valid JSON.
+        self._file.write(json.dumps({"name": "trace_end", "ph": "i", "s": "g", "pid": self._pid, "tid": 0,
+                                     "ts": self._timestamp(perf_counter())}))
+        self._file.write("\n]\n")
+        self._file.close()
+        if self._memory:
+            tracemalloc.stop()
@@ -91,12 +91,36 @@ class InitializeButtons:
                 "btn_y_pos": 165,
                 "text": langs.layout_asymmetrical
             },
+            "puzzle_easy": {
+                "command": self.btn_methods["puzzle_easy"]["method"],
+                "args": self.btn_methods["puzzle_easy"]["args"],
+                "btn_gfx": self.gfx.puzzle_btn,
+                "btn_x_pos": 80,
+                "btn_y_pos": 190,
+                "text": langs.puzzle_easy
+            },
+            "puzzle_medium": {
+                "command": self.btn_methods["puzzle_medium"]["method"],
+                "args": self.btn_methods["puzzle_medium"]["args"],
+                "btn_gfx": self.gfx.puzzle_btn,
+                "btn_x_pos": 136,
+                "btn_y_pos": 190,
+                "text": langs.puzzle_medium
+            },
+            "puzzle_hard": {
+                "command": self.btn_methods["puzzle_hard"]["method"],
+                "args": self.btn_methods["puzzle_hard"]["args"],
+                "btn_gfx": self.gfx.puzzle_btn,
+                "btn_x_pos": 192,
+                "btn_y_pos": 190,
+                "text": langs.puzzle_hard
+            },
             "layout_back": {
                 "command": self.btn_methods["layout_back"]["method"],
                 "args": self.btn_methods["layout_back"]["args"],
                 "btn_gfx": self.gfx.back_btn,
                 "btn_x_pos": 95,
-                "btn_y_pos": 203,
+                "btn_y_pos": 215,
                 "text": langs.back_button
             }
         }
@@ -112,6 +136,23 @@ class InitializeButtons:
                 "text": langs.undo,
                 "active_condition": self.btn_methods["undo"]["active_condition"]
             },
+            "redo": {
+                "command": self.btn_methods["redo"]["method"],
+                "args": self.btn_methods["redo"]["args"],
+                "btn_gfx": self.gfx.in_game_btn,
+                "btn_x_pos": 12,
+                "btn_y_pos": 36,
+                "text": langs.redo,
+                "active_condition": self.btn_methods["redo"]["active_condition"]
+            },
+            "hint": {
+                "command": self.btn_methods["hint"]["method"],
+                "args": self.btn_methods["hint"]["args"],
+                "btn_gfx": self.gfx.in_game_btn,
+                "btn_x_pos": 12,
+                "btn_y_pos": 80,
+                "text": langs.hint
+            },
             "restart": {
                 "command": self.btn_methods["restart"]["method"],
                 "args": self.btn_methods["restart"]["args"],
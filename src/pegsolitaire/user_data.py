@@ -0,0 +1,9 @@
+from pathlib import Path
+from platformdirs import user_data_dir
+
+APP_NAME = "pegsolitaire"
+
+
+def get_user_data_path() -> Path:
+    """Returns the path to the directory where the game keeps its user data (options, caches etc.)."""
+    return Path(user_data_dir(APP_NAME))